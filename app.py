@@ -1,15 +1,95 @@
+import logging
+import os
+
 from dash import Dash, html, dcc, page_container
 import dash_bootstrap_components as dbc
+from flask import jsonify
+
+# Load the datasets before the pages import them, so a preloaded gunicorn
+# master parses the CSVs once and workers share them copy-on-write.
+from core.data import data_status, is_ready, refresh_if_changed
+from core.jobs import background_callback_manager
+from core.api import api_v1
+from core.fleet import fleet_api
+from core.vehicle_pages import vehicle_pages
+from core.http import finalize_response, serve_cached_dash_response
+from core.admission import admission_report
+from core.llm import llm
+from core.memo import memo_report
+from core.memory import install as install_memory_tracking
+from core.prompts import usage_report
+from core.routing import routing_report
+
+# core.* modules log through the standard library (e.g. LLM routing decisions).
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 
 # Initialize app
 app = Dash(
     __name__,
     use_pages=True,
     external_stylesheets=[dbc.themes.FLATLY],
-    suppress_callback_exceptions=True
+    suppress_callback_exceptions=True,
+    background_callback_manager=background_callback_manager,
 )
 app.title = "Car Intelligence Hub"
 
+# WSGI entry point (gunicorn wsgi:server)
+server = app.server
+# Opt-in (MEMORY_TRACKING=1): tracemalloc per request plus /debug/memory.
+install_memory_tracking(app)
+server.register_blueprint(fleet_api)
+server.register_blueprint(api_v1)
+server.register_blueprint(vehicle_pages)
+
+# ---------------------------
+# HTTP CACHING / COMPRESSION
+# ---------------------------
+# Page styles live in assets/ (served with long-lived immutable caching).
+# Layout and dependency payloads are rendered once and served from memory;
+# JSON, JS and CSS responses are gzip/brotli-compressed.
+server.before_request(serve_cached_dash_response)
+server.after_request(finalize_response)
+
+# ---------------------------
+# LIVE DATA REFRESH
+# ---------------------------
+@server.before_request
+def pick_up_data_refresh():
+    # Applies published dataset deltas in place (throttled to a stat() every few seconds).
+    refresh_if_changed()
+
+
+# ---------------------------
+# HEALTH / READINESS
+# ---------------------------
+@server.route("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok"})
+
+
+@server.route("/readyz")
+def readyz():
+    """Readiness: only report ready once every dataset is loaded."""
+    status = data_status()
+    return jsonify(status), (200 if is_ready() else 503)
+
+@server.route("/metrics/llm")
+def llm_metrics():
+    """
+    Per-prompt LLM metrics for every worker and background job sharing the job cache:
+    token usage (including the share served from the provider's prompt cache),
+    model-routing decisions, cost and latency, backend health and admission control.
+    """
+    return jsonify({"prompts": usage_report(), "routing": routing_report(), "backends": llm().health_report(),
+                    "admission": admission_report()})
+
+
+@server.route("/metrics/memo")
+def memo_metrics():
+    """Memoized callbacks: hits per layer (process LRU, shared cache), misses and compute time, all workers."""
+    return jsonify(memo_report())
+
 # ---------------------------
 # NAVIGATION BAR
 # ---------------------------
@@ -30,7 +110,8 @@ navbar = html.Div(
                 dcc.Link("Home", href="/", className="nav-link"),
                 dcc.Link("Car Search", href="/car-search", className="nav-link"),
                 dcc.Link("Industry Leaders", href="/rankings", className="nav-link"),
-                # dcc.Link("Market Analysis", href="/market-analysis", className="nav-link"),
+                dcc.Link("Market Analysis", href="/market-analysis", className="nav-link"),
+                dcc.Link("Fleet Calculator", href="/fleet", className="nav-link"),
                 dcc.Link("Find Your Car", href="/myCar", className="nav-link"),
             ],
             style={
@@ -81,46 +162,7 @@ app.layout = html.Div(
 )
 
 # ---------------------------
-# CUSTOM CSS STYLES
-# ---------------------------
-app.index_string = """
-<!DOCTYPE html>
-<html>
-    <head>
-        {%metas%}
-        <title>{%title%}</title>
-        {%favicon%}
-        {%css%}
-        <style>
-            .nav-link {
-                text-decoration: none;
-                font-weight: 600;
-                color: #007BFF;
-                transition: color 0.2s ease, border-bottom 0.2s ease;
-            }
-            .nav-link:hover {
-                color: #0056b3;
-                border-bottom: 2px solid #007BFF;
-            }
-            .nav-link.active {
-                color: #2c3e50;
-                border-bottom: 3px solid #2c3e50;
-            }
-        </style>
-    </head>
-    <body>
-        {%app_entry%}
-        <footer>
-            {%config%}
-            {%scripts%}
-            {%renderer%}
-        </footer>
-    </body>
-</html>
-"""
-
-# ---------------------------
-# RUN
+# RUN (development server; production uses gunicorn, see gunicorn.conf.py)
 # ---------------------------
 if __name__ == "__main__":
     import os
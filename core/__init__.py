@@ -0,0 +1,3 @@
+"""
+Shared, page-independent building blocks for the Car Intelligence Hub.
+"""
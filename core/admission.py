@@ -0,0 +1,156 @@
+"""
+Admission control for LLM work: shed or downgrade requests under overload.
+
+Each Car Search "Generate" and each chat message takes a ticket before its
+LLM calls. A ticket is admitted while both stay under budget:
+
+    in flight   LLM requests currently running across all workers and jobs
+                (ADMISSION_MAX_INFLIGHT)
+    latency     moving average of recent upstream call times
+                (ADMISSION_MAX_LATENCY seconds)
+
+Kinds of work get different shares of that budget (PRIORITY_SHARE). A chat
+turn is one call and the user is waiting on it. A Generate is three calls,
+so it is downgraded first. Dropdown and chart callbacks never take a ticket,
+and downgraded requests return at once instead of holding a job process.
+
+A downgraded request makes no upstream call. Each task is served from a
+previous LLM answer in the shared cache when there is one, and otherwise
+from the data-derived template backend (core.llm). The ticket records which
+tasks were served this way, so the page can say so.
+
+Latency samples older than ADMISSION_LATENCY_WINDOW are ignored. After a
+quiet spell, traffic is admitted again to probe the upstream. Slots left by
+killed jobs (a cancelled Generate) expire after JOB_LOCK_TTL.
+
+State lives in the shared job cache, like the rest of the LLM metrics.
+"""
+
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from core.jobs import JOB_LOCK_TTL, job_cache
+
+logger = logging.getLogger(__name__)
+
+# ---------- Config ----------
+ADMISSION_MAX_INFLIGHT = int(os.environ.get("ADMISSION_MAX_INFLIGHT", 8))
+ADMISSION_MAX_LATENCY = float(os.environ.get("ADMISSION_MAX_LATENCY", 10))         # seconds
+ADMISSION_LATENCY_WINDOW = float(os.environ.get("ADMISSION_LATENCY_WINDOW", 30))   # seconds a sample counts
+LATENCY_ALPHA = 0.3            # weight of the newest sample in the moving average
+
+# Share of the in-flight and latency budgets each kind of request may use.
+PRIORITY_SHARE = {"chat": 1.0, "generate": 0.6}
+
+ADMISSION_KEY = "admission:state"
+SERVED_LABELS = {"cached": "a saved answer", "offline": "the NRCan data"}
+
+
+def _default_state() -> dict:
+    return {"slots": {}, "latency": 0.0, "latency_at": 0.0, "admitted": {}, "shed": {}}
+
+
+def _prune(state: dict, now: float) -> None:
+    state["slots"] = {k: v for k, v in state["slots"].items() if now - v["start"] < JOB_LOCK_TTL}
+
+
+def _recent_latency(state: dict, now: float) -> float:
+    return state["latency"] if now - state["latency_at"] < ADMISSION_LATENCY_WINDOW else 0.0
+
+
+# ---------- Tickets ----------
+class Ticket:
+    """One request's admission decision, plus how each of its tasks was served when shed."""
+
+    def __init__(self, kind: str, admitted: bool, reason: Optional[str] = None):
+        self.kind = kind
+        self.admitted = admitted
+        self.reason = reason
+        self.slot = uuid.uuid4().hex if admitted else None
+        self.served: Dict[str, str] = {}      # task -> "cached" | "offline"
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.served)
+
+    def notice(self) -> str:
+        """One line for the page, or "" when every task went to the LLM."""
+        if not self.served:
+            return ""
+        sources = sorted({SERVED_LABELS[how] for how in self.served.values()})
+        return f"High demand right now: this answer comes from {' and '.join(sources)} instead of a live AI call."
+
+
+def _acquire(kind: str) -> Ticket:
+    share = PRIORITY_SHARE.get(kind, 1.0)
+    now = time.time()
+    with job_cache.transact():
+        state = job_cache.get(ADMISSION_KEY, _default_state())
+        _prune(state, now)
+        inflight, latency = len(state["slots"]), _recent_latency(state, now)
+        reason = None
+        if inflight >= max(1, int(ADMISSION_MAX_INFLIGHT * share)):
+            reason = f"{inflight} LLM requests in flight"
+        elif latency > ADMISSION_MAX_LATENCY * share:
+            reason = f"upstream latency {latency:.1f}s"
+        ticket = Ticket(kind, reason is None, reason)
+        counts = state["admitted"] if ticket.admitted else state["shed"]
+        counts[kind] = counts.get(kind, 0) + 1
+        if ticket.admitted:
+            state["slots"][ticket.slot] = {"kind": kind, "start": now}
+        job_cache.set(ADMISSION_KEY, state)
+    if not ticket.admitted:
+        logger.warning("shedding %s request (%s)", kind, reason)
+    return ticket
+
+
+def _release(ticket: Ticket) -> None:
+    if ticket.slot is None:
+        return
+    with job_cache.transact():
+        state = job_cache.get(ADMISSION_KEY, _default_state())
+        state["slots"].pop(ticket.slot, None)
+        job_cache.set(ADMISSION_KEY, state)
+
+
+@contextmanager
+def admit(kind: str):
+    """Ticket for one request's LLM work; holds an in-flight slot while admitted."""
+    ticket = _acquire(kind)
+    try:
+        yield ticket
+    finally:
+        _release(ticket)
+
+
+def record_latency(elapsed: float) -> None:
+    """Feed one upstream call time (seconds) into the moving average."""
+    now = time.time()
+    with job_cache.transact():
+        state = job_cache.get(ADMISSION_KEY, _default_state())
+        previous = _recent_latency(state, now)
+        state["latency"] = elapsed if not previous else (1 - LATENCY_ALPHA) * previous + LATENCY_ALPHA * elapsed
+        state["latency_at"] = now
+        job_cache.set(ADMISSION_KEY, state)
+
+
+def admission_report() -> dict:
+    """Current load and admit/shed totals per kind, across all workers."""
+    now = time.time()
+    state = job_cache.get(ADMISSION_KEY, _default_state())
+    _prune(state, now)
+    inflight = {}
+    for slot in state["slots"].values():
+        inflight[slot["kind"]] = inflight.get(slot["kind"], 0) + 1
+    return {
+        "inflight": inflight,
+        "latency_s": round(_recent_latency(state, now), 2),
+        "max_inflight": ADMISSION_MAX_INFLIGHT,
+        "max_latency_s": ADMISSION_MAX_LATENCY,
+        "admitted": state["admitted"],
+        "shed": state["shed"],
+    }
@@ -0,0 +1,253 @@
+"""
+Versioned JSON REST API, mounted on the Dash Flask server under /api/v1.
+
+    GET  /api/v1/vehicles                  search/filter the catalog (cursor pagination)
+    GET  /api/v1/vehicles/<vehicle_key>    one vehicle, every dataset column
+    GET  /api/v1/vehicles/<key>/similar    nearest neighbours on specs (mode=like|cheaper|greener)
+    GET  /api/v1/vehicles/by-id/<_id>      all rows sharing an NRCan `_id`
+    POST /api/v1/vehicles/batch            {"keys": [...]} -> many vehicles in one call
+    POST /api/v1/costs/batch               annual cost and CO₂ for many vehicles
+    GET  /api/v1/rankings                  Industry Leaders, filter by year/category (+ matched vehicle_key)
+    GET  /api/v1/rankings/years
+
+GET responses carry an ETag and Cache-Control and honour If-None-Match.
+Bodies over 1 KB are gzip- or brotli-compressed when the client accepts it.
+"""
+
+import base64
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, request
+
+from core.awards import award_matches
+from core.catalog import catalog_index
+from core.costs import DEFAULT_ELECTRICITY_PRICE, DEFAULT_FUEL_PRICE
+from core.data import last_updated, load_rankings
+from core.fleet import estimate_chunk
+from core.http import json_response
+from core.records import vehicle_registry
+from core.similar import SIMILAR_MODES, similar_to
+
+API_VERSION = "v1"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+MAX_BATCH = 500
+CATALOG_MAX_AGE = 300     # seconds; data changes at most a few times a day
+
+COST_FIELDS = ["vehicle_key", "vehicle_type", "display_name", "matched", "match_note", "annual_km", "city_ratio",
+               "consumption_per_100km", "energy_unit", "annual_energy", "annual_cost_cad", "annual_co2_kg"]
+
+RANKINGS = load_rankings()
+
+api_v1 = Blueprint("api_v1", __name__, url_prefix=f"/api/{API_VERSION}")
+
+
+# ---------- Helpers ----------
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+@api_v1.errorhandler(ApiError)
+def _api_error(err: ApiError):
+    return json_response({"error": err.message}, status=err.status)
+
+
+def encode_cursor(key: int) -> str:
+    return base64.urlsafe_b64encode(str(int(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise ApiError(400, "Invalid cursor.")
+
+
+def _int_arg(name: str, default=None, minimum=None, maximum=None):
+    raw = request.args.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer.")
+    if minimum is not None and value < minimum:
+        raise ApiError(400, f"'{name}' must be >= {minimum}.")
+    if maximum is not None:
+        value = min(value, maximum)
+    return value
+
+
+def _json_body() -> dict:
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        raise ApiError(400, "Expected a JSON object body.")
+    return body
+
+
+def _summary(registry, position: int) -> dict:
+    vehicle = registry.at(position)
+    return {
+        "vehicle_key": vehicle.key,
+        "vehicle_type": vehicle.vehicle_type,
+        "_id": vehicle.nrcan_id,
+        "model_year": vehicle.year,
+        "make": vehicle.make,
+        "model": vehicle.model,
+        "vehicle_class": vehicle.vehicle_class,
+        "display_name": vehicle.display_name,
+    }
+
+
+def _clean(value):
+    if isinstance(value, (np.generic,)):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+# ---------- Catalog ----------
+@api_v1.route("/vehicles")
+def list_vehicles():
+    index = catalog_index()
+    limit = _int_arg("limit", DEFAULT_PAGE_SIZE, minimum=1, maximum=MAX_PAGE_SIZE)
+    cursor = request.args.get("cursor")
+    positions = index.search(
+        q=request.args.get("q"),
+        vehicle_type=request.args.get("vehicle_type"),
+        year=_int_arg("year"),
+        make=request.args.get("make"),
+        vehicle_class=request.args.get("vehicle_class"),
+        after_key=decode_cursor(cursor) if cursor else None,
+    )
+    page = positions[:limit]
+    registry = vehicle_registry()
+    data = [_summary(registry, p) for p in page]
+    next_cursor = encode_cursor(data[-1]["vehicle_key"]) if len(positions) > limit else None
+    return json_response(
+        {"data": data, "next_cursor": next_cursor, "data_version": last_updated()},
+        max_age=CATALOG_MAX_AGE,
+    )
+
+
+@api_v1.route("/vehicles/<int:vehicle_key>")
+def get_vehicle(vehicle_key: int):
+    index = catalog_index()
+    position = int(index.positions_for_keys([vehicle_key])[0])
+    if position < 0:
+        raise ApiError(404, f"No vehicle with key {vehicle_key}.")
+    return json_response({"data": index.record(position)}, max_age=CATALOG_MAX_AGE)
+
+
+@api_v1.route("/vehicles/<int:vehicle_key>/similar")
+def get_similar_vehicles(vehicle_key: int):
+    index = catalog_index()
+    position = int(index.positions_for_keys([vehicle_key])[0])
+    if position < 0:
+        raise ApiError(404, f"No vehicle with key {vehicle_key}.")
+    mode = request.args.get("mode", "like")
+    if mode not in SIMILAR_MODES:
+        raise ApiError(400, f"'mode' must be one of {', '.join(SIMILAR_MODES)}.")
+    k = _int_arg("k", 5, minimum=1, maximum=50)
+    registry = vehicle_registry()
+    data = [_summary(registry, int(p)) for p in similar_to(position, k=k, mode=mode)]
+    return json_response({"data": data}, max_age=CATALOG_MAX_AGE)
+
+
+@api_v1.route("/vehicles/by-id/<int:nrcan_id>")
+def get_vehicles_by_id(nrcan_id: int):
+    """`_id` is not unique across model years and datasets, so this returns a list."""
+    index = catalog_index()
+    positions = index.search(nrcan_id=nrcan_id, year=_int_arg("year"))
+    if not len(positions):
+        raise ApiError(404, f"No vehicle with _id {nrcan_id}.")
+    return json_response({"data": [index.record(p) for p in positions]}, max_age=CATALOG_MAX_AGE)
+
+
+@api_v1.route("/vehicles/batch", methods=["POST"])
+def batch_vehicles():
+    keys = _json_body().get("keys")
+    if not isinstance(keys, list) or not keys:
+        raise ApiError(400, "'keys' must be a non-empty list of vehicle keys.")
+    if len(keys) > MAX_BATCH:
+        raise ApiError(413, f"At most {MAX_BATCH} keys per request.")
+    try:
+        keys = [int(k) for k in keys]
+    except (TypeError, ValueError):
+        raise ApiError(400, "'keys' must contain integers.")
+
+    index = catalog_index()
+    positions = index.positions_for_keys(keys)
+    data = [index.record(int(p)) for p in positions if p >= 0]
+    missing = [k for k, p in zip(keys, positions) if p < 0]
+    return json_response({"data": data, "missing": missing}, max_age=CATALOG_MAX_AGE)
+
+
+# ---------- Costs ----------
+@api_v1.route("/costs/batch", methods=["POST"])
+def batch_costs():
+    """
+    Body: {"vehicles": [{"vehicle_key" | "_id" [+ "year"] | "year"+"make"+"model",
+                         "annual_km"?, "city_ratio"?}, ...],
+           "fuel_price"?: CAD/L, "electricity_price"?: CAD/kWh}
+    """
+    body = _json_body()
+    vehicles = body.get("vehicles")
+    if not isinstance(vehicles, list) or not vehicles:
+        raise ApiError(400, "'vehicles' must be a non-empty list.")
+    if len(vehicles) > MAX_BATCH:
+        raise ApiError(413, f"At most {MAX_BATCH} vehicles per request.")
+    try:
+        fuel_price = float(body.get("fuel_price", DEFAULT_FUEL_PRICE))
+        electricity_price = float(body.get("electricity_price", DEFAULT_ELECTRICITY_PRICE))
+    except (TypeError, ValueError):
+        raise ApiError(400, "Prices must be numbers.")
+    for i, vehicle in enumerate(vehicles):
+        fields = set(vehicle) if isinstance(vehicle, dict) else set()
+        if not ("vehicle_key" in fields or "_id" in fields or {"year", "make", "model"} <= fields):
+            raise ApiError(400, f"vehicles[{i}] must be an object with 'vehicle_key', '_id' "
+                                f"or 'year', 'make' and 'model'.")
+
+    result = estimate_chunk(pd.DataFrame.from_records(vehicles), fuel_price, electricity_price)
+    data = [
+        {field: _clean(value) for field, value in zip(COST_FIELDS, values)}
+        for values in result[COST_FIELDS].itertuples(index=False, name=None)
+    ]
+    return json_response(
+        {"data": data, "fuel_price": fuel_price, "electricity_price": electricity_price},
+        max_age=0, private=True,
+    )
+
+
+# ---------- Rankings ----------
+@api_v1.route("/rankings")
+def list_rankings():
+    rankings = RANKINGS
+    year = _int_arg("year")
+    category = request.args.get("category")
+    if year is not None:
+        rankings = rankings[rankings["year"] == year]
+    if category:
+        rankings = rankings[rankings["category"].str.lower() == category.lower()]
+    rankings = rankings.sort_values(["year", "category", "rank"], ascending=[False, True, True])
+    matches = award_matches()
+    data = [{k: _clean(v) for k, v in row.items()} for row in rankings.to_dict("records")]
+    for row in data:
+        match = matches.get((row["year"], row["manufacturer"], row["model"]))
+        row["vehicle_key"] = match.vehicle_key if match else None
+        row["match_score"] = match.score if match else None
+        row["match_method"] = match.method if match else None
+    return json_response({"data": data}, max_age=CATALOG_MAX_AGE)
+
+
+@api_v1.route("/rankings/years")
+def ranking_years():
+    years = sorted(RANKINGS["year"].unique().tolist(), reverse=True)
+    categories = sorted(RANKINGS["category"].unique().tolist())
+    return json_response({"years": years, "categories": categories}, max_age=CATALOG_MAX_AGE)
@@ -0,0 +1,242 @@
+"""
+Offline entity resolution: Industry Leaders awards -> NRCan catalog vehicles.
+
+`data/car_rankings.csv` names winners in free text ("Hyundai Palisade
+Calligraphy Night Edition"). `build` links each one to a catalog row and
+writes `data/award_matches.csv`, which the Industry Leaders page and the
+REST API load once to show real consumption, CO₂ and running cost.
+
+    python -m core.awards build      # rewrite data/award_matches.csv
+    python -m core.awards report     # print every match with its score
+
+Matching, per award:
+  1. Blocking: catalog rows of the same make and model year.
+  2. Gate: the row's model must start with the award's first two model words
+     ("Model 3", "Santa Fe", "Bolt EV"), or its first word when no row does
+     ("Civic EX" -> "Civic"). Words compare without punctuation, so "CX-5",
+     "ID.4" and "F-150" meet the catalog spelling.
+  3. Score: 0.5 for the model, plus 0.5 x the share of the remaining trim
+     words (IDF-weighted, counting only words the block uses) found in the
+     row, scaled down for a powertrain mismatch (Best Electric Vehicle ->
+     BEV, "PHEV"/"4xe"/"Prime" -> PHEV, "Hybrid" -> the table's hybrid
+     flag). Extra trim words in the row break ties, so the base trim wins.
+  4. Adjacent years: when no award-year row scores EXACT_SCORE, the rows of
+     the year before and after are scored too ("adjacent-year"). One is
+     taken when it matches the whole trim, or when no award-year row passed
+     the gate. A "2024 Ioniq 5 N" thus links to the 2025 "IONIQ 5 N" rather
+     than the 2024 "IONIQ 5 Long Range".
+
+Awards scoring under MATCH_THRESHOLD are kept with an empty vehicle key.
+The others keep their score and method; below EXACT_SCORE the trim was not
+found (NRCan rarely lists trims: "Corolla Hybrid SE" -> "Corolla Hybrid"),
+and the ranking card labels the link as the closest match. `report` lists
+every pick so low scores can be reviewed by eye.
+"""
+
+import argparse
+import math
+import os
+import re
+from typing import Dict, NamedTuple, Optional
+
+import pandas as pd
+
+from core.catalog import catalog_index
+from core.data import DATA_DIR, load_rankings
+
+AWARD_MATCHES_PATH = os.path.join(DATA_DIR, "award_matches.csv")
+MATCH_THRESHOLD = 0.5       # the model alone; a powertrain mismatch falls below
+EXACT_SCORE = 1.0           # model and every trim word the catalog uses
+EXTRA_TOKEN_PENALTY = 0.005
+MATCH_COLUMNS = ["year", "manufacturer", "model", "vehicle_key", "_id", "vehicle_type", "model_year",
+                 "catalog_model", "score", "method"]
+
+# Words every catalog name carries (class, transmission, units); they never tell trims apart.
+STRUCTURE_WORDS = {"automatic", "manual", "auto", "gear", "cyl", "kw", "wheels", "charger", "with", "without",
+                   "mode", "door", "sport", "utility", "vehicle", "small", "standard", "pickup", "truck",
+                   "station", "wagon", "mid", "size", "full", "compact", "subcompact", "minicompact",
+                   "two", "seater", "minivan", "van", "passenger", "special", "purpose"}
+PHEV_WORDS = {"phev", "4xe", "prime", "plug", "plugin"}
+BEV_MISMATCH = 0.4      # score factor: non-BEV row for an electric-vehicle award
+PHEV_MISMATCH = 0.7     # score factor: non-PHEV row for a plug-in award
+HYBRID_MISMATCH = 0.5   # score factor: row not flagged hybrid (core.vehicle_table) for a "Hybrid" award
+
+
+# ---------- Tokens ----------
+def words(text: str) -> list:
+    """Lowercase words in order, punctuation inside a word dropped ("CX-5" -> "cx5", "2.0L" -> "20l")."""
+    return [re.sub(r"[-.]", "", w) for w in re.findall(r"[a-z0-9]+(?:[-.][a-z0-9]+)*", str(text).lower())]
+
+
+def tokens(text: str) -> set:
+    """Word set for scoring: joined words plus their hyphen parts ("GT-Line" -> gtline, gt, line)."""
+    out = set(words(text))
+    for chunk in re.findall(r"[a-z]+(?:-[a-z0-9]+)+", str(text).lower()):
+        out.update(chunk.split("-"))
+    return out
+
+
+def _is_structural(token: str) -> bool:
+    return token in STRUCTURE_WORDS or bool(re.fullmatch(r"\d+[a-z]?|\d+(l|kw|gear)", token))
+
+
+def _strip_make(model: str, make: str) -> str:
+    """Drop the leading manufacturer ("Toyota Camry Hybrid" -> "Camry Hybrid"), not a glued one ("Mazda3")."""
+    return re.sub(rf"^\s*{re.escape(make)}\s+", "", str(model), flags=re.IGNORECASE)
+
+
+# ---------- Matching ----------
+def _gate(lead: list, leads: list, block: list) -> tuple:
+    """(n, positions): block rows whose model starts with the first n words of `lead`, trying n = 2, then 1."""
+    for n in (2, 1):
+        if len(lead) >= n:
+            passed = [p for p in block if leads[p][:n] == lead[:n]]
+            if passed:
+                return n, passed
+    return 0, []
+
+
+def _best_in(lead: list, model: str, years: list, same_make, category: str, rows: pd.DataFrame,
+             leads: list, row_tokens: list, adjacent: bool = False) -> Optional[tuple]:
+    """
+    (position, score) of the best gated row of the make in `years`, or None when no row passes the gate.
+    For `adjacent` years a conventional hybrid the award does not name is a mismatch too: the
+    2022 "Tundra Hybrid TRD PRO" is not the 2021 V8 TRD Pro.
+    """
+    block = [int(p) for p in (same_make & rows["model_year"].isin(years).to_numpy()).nonzero()[0]]
+    n, gated = _gate(lead, leads, block)
+    if not gated:
+        return None
+
+    # Trim words the make's catalog for those years never uses ("Calligraphy") cannot count.
+    df = {}
+    for p in block:
+        for t in row_tokens[p]:
+            df[t] = df.get(t, 0) + 1
+    idf = {t: math.log(1 + len(block) / k) for t, k in df.items()}
+    wanted = tokens(model)
+    trim = [t for t in wanted - set(lead[:n]) if t in idf and not _is_structural(t)]
+    total = sum(idf[t] for t in trim)
+
+    wants_bev = category == "Best Electric Vehicle"
+    wants_phev = bool(wanted & PHEV_WORDS)
+    wants_hybrid = "hybrid" in wanted
+    best, best_score, best_rank = None, 0.0, -math.inf
+    for p in gated:
+        have = row_tokens[p]
+        coverage = sum(idf[t] for t in trim if t in have) / total if total else 1.0
+        score = 0.5 + 0.5 * coverage
+        vt = rows["vehicle_type"].iat[p]
+        if wants_bev and vt != "bev":
+            score *= BEV_MISMATCH
+        if wants_phev and vt != "phev":
+            score *= PHEV_MISMATCH
+        if wants_hybrid and not rows["hybrid"].iat[p]:
+            score *= HYBRID_MISMATCH
+        elif adjacent and not wants_hybrid and vt == "conventional" and rows["hybrid"].iat[p]:
+            score *= HYBRID_MISMATCH
+        rank = score - EXTRA_TOKEN_PENALTY * sum(1 for t in have - wanted if not _is_structural(t))
+        if rank > best_rank:
+            best, best_score, best_rank = p, score, rank
+    return best, round(best_score, 3)
+
+
+def match_award(award_model: str, make: str, year: int, category: str, rows: pd.DataFrame,
+                leads: list, row_tokens: list) -> dict:
+    """Best catalog row for one award (see the module docstring); `rows` is the whole catalog."""
+    model = _strip_make(award_model, make)
+    lead = words(model)
+    same_make = (rows["make"].str.lower() == make.lower()).to_numpy()
+
+    found = {"score": 0.0, "method": "no-match"}
+    same_year = _best_in(lead, model, [year], same_make, category, rows, leads, row_tokens)
+    if same_year is not None:
+        found = {"position": same_year[0], "score": same_year[1], "method": "same-year"}
+    if found["score"] < EXACT_SCORE:
+        adjacent = _best_in(lead, model, [year - 1, year + 1], same_make, category, rows, leads, row_tokens,
+                            adjacent=True)
+        # Another year replaces an award-year match only with the whole trim.
+        if adjacent is not None and adjacent[1] > found["score"] and (
+                same_year is None or adjacent[1] >= EXACT_SCORE):
+            found = {"position": adjacent[0], "score": adjacent[1], "method": "adjacent-year"}
+    return found
+
+
+def build(rankings: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Match every distinct award (year, manufacturer, model) and write AWARD_MATCHES_PATH."""
+    rankings = load_rankings() if rankings is None else rankings
+    rows = catalog_index().rows
+    models = rows["model"].tolist()
+    leads = [words(m)[:2] for m in models]
+    row_tokens = [tokens(m) for m in models]
+
+    awards = rankings.drop_duplicates(["year", "manufacturer", "model"])
+    records = []
+    for award in awards.itertuples(index=False):
+        found = match_award(award.model, award.manufacturer, int(award.year), award.category, rows,
+                            leads, row_tokens)
+        record = {"year": int(award.year), "manufacturer": award.manufacturer, "model": award.model,
+                  "score": found["score"], "method": found["method"]}
+        position = found.get("position")
+        if position is not None and found["score"] >= MATCH_THRESHOLD:
+            row = rows.iloc[position]
+            record.update({
+                "vehicle_key": int(row["vehicle_key"]), "_id": int(row["_id"]),
+                "vehicle_type": str(row["vehicle_type"]), "model_year": int(row["model_year"]),
+                "catalog_model": row["model"],
+            })
+        records.append(record)
+
+    matches = pd.DataFrame.from_records(records, columns=MATCH_COLUMNS)
+    for column in ("vehicle_key", "_id", "model_year"):
+        matches[column] = matches[column].astype("Int64")
+    matches.to_csv(AWARD_MATCHES_PATH, index=False)
+    return matches
+
+
+# ---------- Runtime lookup ----------
+class AwardMatch(NamedTuple):
+    vehicle_key: int
+    score: float
+    method: str
+
+    @property
+    def approximate(self) -> bool:
+        """The model matched but not the whole trim."""
+        return self.score < EXACT_SCORE
+
+
+_award_matches: Optional[Dict[tuple, AwardMatch]] = None
+
+
+def award_matches() -> Dict[tuple, AwardMatch]:
+    """(year, manufacturer, model) -> matched catalog vehicle, from the persisted match table."""
+    global _award_matches
+    if _award_matches is None:
+        found = {}
+        if os.path.exists(AWARD_MATCHES_PATH):
+            matches = pd.read_csv(AWARD_MATCHES_PATH, dtype={"vehicle_key": "Int64"})
+            matches = matches[matches["vehicle_key"].notna()]
+            found = {(int(y), m, n): AwardMatch(int(k), float(score), method) for y, m, n, k, score, method in
+                     matches[["year", "manufacturer", "model", "vehicle_key", "score", "method"]]
+                     .itertuples(index=False)}
+        _award_matches = found
+    return _award_matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link Industry Leaders awards to NRCan catalog vehicles.")
+    parser.add_argument("command", choices=["build", "report"])
+    args = parser.parse_args()
+    matches = build() if args.command == "build" else pd.read_csv(AWARD_MATCHES_PATH)
+    if args.command == "report":
+        with pd.option_context("display.width", 200, "display.max_rows", None, "display.max_colwidth", 60):
+            print(matches[["year", "model", "catalog_model", "score", "method"]].to_string(index=False))
+    matched = matches["vehicle_key"].notna()
+    exact = matched & (matches["score"] >= EXACT_SCORE)
+    print(f"{int(matched.sum())}/{len(matches)} awards matched (threshold {MATCH_THRESHOLD}), "
+          f"{int(exact.sum())} with the full trim; {AWARD_MATCHES_PATH}")
+
+
+if __name__ == "__main__":
+    main()
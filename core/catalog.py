@@ -0,0 +1,185 @@
+"""
+Catalog-wide vehicle index across the three datasets.
+
+`CatalogIndex` keeps one row per catalog vehicle, as the normalized table
+of `core.vehicle_table` (in dataset order, with a key-sorted view for
+pagination), plus hashed lookup indexes: vehicle key, `_id` + year, `_id`,
+and normalized year/make/model. Each lookup is a `pd.Index` of 64-bit
+hashes and resolves a whole column of queries with one `get_indexer` call.
+The fleet calculator, the REST API and the Car Search dropdowns use it.
+
+The index is built lazily from a snapshot of `CACHED_DATA` and dropped when
+a data refresh lands, so positions always refer to the frames it was built
+from.
+"""
+
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.data import CACHED_DATA, on_change
+from core.vehicle_table import build_vehicle_table
+
+
+AMBIGUOUS = -2      # `resolve` result for an `_id` given without the model year that tells its rows apart
+
+
+# ---------- Hashing ----------
+def _name_hash(year: pd.Series, make: pd.Series, model: pd.Series) -> np.ndarray:
+    frame = pd.DataFrame({
+        "year": pd.to_numeric(year, errors="coerce").fillna(-1).astype("int64").to_numpy(),
+        "make": make.astype(str).str.strip().str.lower().to_numpy(),
+        "model": model.astype(str).str.strip().str.lower().to_numpy(),
+    })
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _id_year_hash(_id: pd.Series, year: pd.Series) -> np.ndarray:
+    frame = pd.DataFrame({
+        "_id": pd.to_numeric(_id, errors="coerce").fillna(-1).astype("int64").to_numpy(),
+        "year": pd.to_numeric(year, errors="coerce").fillna(-1).astype("int64").to_numpy(),
+    })
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+# ---------- Index ----------
+class CatalogIndex:
+    """Column arrays for every catalog vehicle plus hashed lookup indexes."""
+
+    def __init__(self):
+        self.frames = dict(CACHED_DATA)
+        # Dataset order, so "first match" means what `.iloc[0]` meant in the UI.
+        self.rows = build_vehicle_table(self.frames)
+        self.is_bev = (self.rows["vehicle_type"] == "bev").to_numpy()
+
+        self.by_key = pd.Index(self.rows["vehicle_key"].to_numpy())
+        self.by_name, self._name_rows = self._first_only(
+            _name_hash(self.rows["model_year"], self.rows["make"], self.rows["model"]))
+        self.by_id_year, self._id_year_rows = self._first_only(
+            _id_year_hash(self.rows["_id"], self.rows["model_year"]))
+        self.by_id, self._id_rows = self._first_only(self.rows["_id"].to_numpy())
+        # `_id` repeats across model years and datasets; such an id alone names no single vehicle.
+        self._id_repeated = pd.Index(self.rows["_id"].to_numpy()).duplicated(keep=False)
+
+        # Key order for cursor pagination, and lowercase columns for search.
+        self.key_order = np.argsort(self.rows["vehicle_key"].to_numpy(), kind="stable")
+        self.sorted_keys = self.rows["vehicle_key"].to_numpy()[self.key_order]
+        self.search_text = self.rows["display_name"].astype(str).str.lower().to_numpy(dtype=str)
+        self.make_lower = self.rows["make"].astype(str).str.lower().to_numpy()
+        self.class_lower = self.rows["vehicle_class"].astype(str).str.lower().to_numpy()
+
+    @staticmethod
+    def _first_only(hashes):
+        index = pd.Index(hashes)
+        first = ~index.duplicated()
+        return index[first], np.flatnonzero(first)
+
+    @staticmethod
+    def _lookup(index: pd.Index, rows: Optional[np.ndarray], values) -> np.ndarray:
+        positions = index.get_indexer(values)
+        if rows is None:
+            return positions
+        return np.where(positions >= 0, rows[np.maximum(positions, 0)], -1)
+
+    def resolve(self, fleet: pd.DataFrame) -> np.ndarray:
+        """
+        Catalog row position for every fleet row: -1 when unmatched, AMBIGUOUS
+        when the row gives only an `_id` that several catalog rows share.
+        """
+        found = np.full(len(fleet), -1, dtype="int64")
+        ambiguous = np.zeros(len(fleet), dtype=bool)
+        if "vehicle_key" in fleet:
+            keys = pd.to_numeric(fleet["vehicle_key"], errors="coerce").fillna(-1).astype("int64").to_numpy()
+            found = self._lookup(self.by_key, None, keys)
+        if "_id" in fleet:
+            todo = found < 0
+            if "year" in fleet:
+                hashes = _id_year_hash(fleet["_id"], fleet["year"])
+                found[todo] = self._lookup(self.by_id_year, self._id_year_rows, hashes[todo])
+                todo = found < 0
+            ids = pd.to_numeric(fleet["_id"], errors="coerce").fillna(-1).astype("int64").to_numpy()
+            by_id = self._lookup(self.by_id, self._id_rows, ids[todo])
+            repeated = (by_id >= 0) & self._id_repeated[np.maximum(by_id, 0)]
+            found[todo] = np.where(repeated, -1, by_id)
+            ambiguous[todo] = repeated
+        if {"year", "make", "model"} <= set(fleet.columns):
+            todo = found < 0
+            hashes = _name_hash(fleet["year"], fleet["make"], fleet["model"])
+            found[todo] = self._lookup(self.by_name, self._name_rows, hashes[todo])
+        found[ambiguous & (found < 0)] = AMBIGUOUS
+        return found
+
+    def positions_for_keys(self, keys) -> np.ndarray:
+        return self._lookup(self.by_key, None, np.asarray(keys, dtype="int64"))
+
+    def record(self, position: int) -> dict:
+        """Full dataset row for a catalog position, JSON-ready (NaN -> None)."""
+        row = self.rows.iloc[position]
+        source = self.frames[row["vehicle_type"]].iloc[int(row["source_row"])]
+        record = {"vehicle_key": int(row["vehicle_key"]), "vehicle_type": str(row["vehicle_type"])}
+        for col, value in source.items():
+            record[col] = None if pd.isna(value) else (value.item() if hasattr(value, "item") else value)
+        return record
+
+    def search(self, q: str = None, vehicle_type: str = None, year=None, make: str = None,
+               vehicle_class: str = None, nrcan_id=None, after_key: int = None) -> np.ndarray:
+        """Catalog positions matching every given filter, in vehicle key order, after `after_key`."""
+        order = self.key_order
+        if after_key is not None:
+            order = order[np.searchsorted(self.sorted_keys, after_key, side="right"):]
+        mask = np.ones(len(order), dtype=bool)
+        rows = self.rows
+        if vehicle_type:
+            mask &= (rows["vehicle_type"].to_numpy()[order] == vehicle_type)
+        if year is not None:
+            mask &= (rows["model_year"].to_numpy()[order] == int(year))
+        if nrcan_id is not None:
+            mask &= (rows["_id"].to_numpy()[order] == int(nrcan_id))
+        if make:
+            mask &= (self.make_lower[order] == make.lower())
+        if vehicle_class:
+            mask &= (self.class_lower[order] == vehicle_class.lower())
+        if q:
+            text = self.search_text[order]
+            for token in q.lower().split():
+                mask &= np.char.find(text, token) >= 0
+        return order[mask]
+
+    def distinct(self, column: str, vehicle_type: str = None, year=None, make: str = None,
+                 vehicle_class: str = None) -> list:
+        """Sorted distinct values of `column` over the vehicles matching every given filter."""
+        rows = self.rows
+        mask = np.ones(len(rows), dtype=bool)
+        if vehicle_type:
+            mask &= (rows["vehicle_type"] == vehicle_type).to_numpy()
+        if year is not None:
+            try:
+                mask &= rows["model_year"].to_numpy() == int(year)
+            except (TypeError, ValueError):
+                return []
+        if make:
+            mask &= (rows["make"] == make).to_numpy()
+        if vehicle_class:
+            mask &= (rows["vehicle_class"] == vehicle_class).to_numpy()
+        return sorted(rows[column][mask].dropna().unique().tolist())
+
+
+_index_lock = threading.Lock()
+_catalog_index: Optional[CatalogIndex] = None
+
+
+def catalog_index() -> CatalogIndex:
+    global _catalog_index
+    with _index_lock:
+        if _catalog_index is None:
+            _catalog_index = CatalogIndex()
+        return _catalog_index
+
+
+@on_change
+def _drop_catalog_index(changed):
+    global _catalog_index
+    with _index_lock:
+        _catalog_index = None
@@ -0,0 +1,78 @@
+"""
+Annual energy cost helpers.
+
+The formula is the one the Car Search estimator has always used:
+
+    annual_cost = distance / 100 * (city_ratio * city + (1 - city_ratio) * highway) * price
+
+where `city`/`highway` are L/100 km (fuel) or kWh/100 km (BEV), as in the
+columns of `core.vehicle_table`. The functions below broadcast over NumPy
+arrays so the same code prices one vehicle or a whole fleet.
+"""
+
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.data import VEHICLE_TYPES, on_change
+
+# Defaults for every estimate: the Car Search form, the fleet calculator, the API,
+# similar-vehicle costs, TCO and the static vehicle pages.
+DEFAULT_ANNUAL_KM = 15000
+DEFAULT_CITY_RATIO = 80             # city share in percent
+DEFAULT_FUEL_PRICE = 1.80           # CAD/L
+DEFAULT_ELECTRICITY_PRICE = 0.14    # CAD/kWh, national average
+
+# (vehicle_type, year, make, model) -> coefficients; entries are dropped when
+# a data refresh touches that vehicle.
+_COEFFICIENT_CACHE = {}
+_COEFFICIENT_LOCK = threading.Lock()
+
+
+def vehicle_coefficients(vehicle_type: str, year, make: str, model: str) -> Optional[dict]:
+    """City/highway consumption of the selected vehicle (first matching row), or None. Memoized."""
+    try:
+        cache_key = (vehicle_type, int(year), make, model)
+    except (TypeError, ValueError):
+        return None
+    with _COEFFICIENT_LOCK:
+        if cache_key in _COEFFICIENT_CACHE:
+            return _COEFFICIENT_CACHE[cache_key]
+    coefficients = _lookup_coefficients(*cache_key)
+    with _COEFFICIENT_LOCK:
+        _COEFFICIENT_CACHE[cache_key] = coefficients
+    return coefficients
+
+
+@on_change
+def _invalidate_coefficients(changed: pd.DataFrame):
+    with _COEFFICIENT_LOCK:
+        for vt, year, make, model in changed[["vehicle_type", "model_year", "make", "model"]].itertuples(index=False):
+            _COEFFICIENT_CACHE.pop((vt, int(year), make, model), None)
+
+
+def _lookup_coefficients(vehicle_type: str, year: int, make: str, model: str) -> Optional[dict]:
+    from core.records import vehicle_registry   # core.records -> core.catalog -> core.vehicle_table imports this module
+
+    if vehicle_type not in VEHICLE_TYPES:
+        return None
+    vehicle = vehicle_registry().find(vehicle_type, year, make, model)
+    if vehicle is None or np.isnan(vehicle.city) or np.isnan(vehicle.highway):
+        return None
+    return {"city": vehicle.city, "highway": vehicle.highway, "unit": vehicle.unit}
+
+
+def annual_energy_cost(city, highway, city_ratio, energy_price, annual_distance):
+    """
+    Vectorized annual energy cost in CAD.
+
+    `city_ratio` is a fraction (0–1). Every argument may be a scalar or an
+    array; they broadcast against each other.
+    """
+    city = np.asarray(city, dtype=float)
+    highway = np.asarray(highway, dtype=float)
+    city_ratio = np.asarray(city_ratio, dtype=float)
+    per_100km = city_ratio * city + (1.0 - city_ratio) * highway
+    return np.asarray(annual_distance, dtype=float) / 100.0 * per_100km * np.asarray(energy_price, dtype=float)
@@ -0,0 +1,152 @@
+"""
+Precomputed aggregate cube for market trend analytics.
+
+Dimensions: model year × make × vehicle class × fuel type. Every one of
+the 16 grouping sets (the SQL CUBE operator) is computed once, at data-load
+time, with vectorized groupbys. Percentiles therefore stay exact on
+roll-ups too. Chart callbacks call `slice_cube`, which only filters a small
+precomputed frame and never touches the raw tables.
+
+Measures per cell:
+    count, co2_mean, co2_p10, co2_p50, co2_p90   (g/km)
+    consumption_mean                             (L or Le per 100 km)
+    bev_share, phev_share                        (fraction of vehicles)
+
+Consumption is litres per 100 km for fuel vehicles and PHEVs (fuel-only
+mode), and litre-equivalents per 100 km for BEVs. The fact table is a
+column projection of the catalog's normalized vehicle table
+(`core.vehicle_table`).
+"""
+
+import threading
+import time
+from itertools import combinations
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.catalog import catalog_index
+from core.data import on_change
+
+DIMENSIONS = ("model_year", "make", "vehicle_class", "fuel_type")
+MEASURES = ("count", "co2_mean", "co2_p10", "co2_p50", "co2_p90", "consumption_mean", "bev_share", "phev_share")
+
+FUEL_LABELS = {
+    "X": "Regular gasoline",
+    "Z": "Premium gasoline",
+    "D": "Diesel",
+    "E": "E85",
+    "N": "Natural gas",
+    "B": "Electricity",
+    "B/X": "Electricity + regular gasoline",
+    "B/Z": "Electricity + premium gasoline",
+}
+
+
+# ---------- Fact table ----------
+def build_fact_table() -> pd.DataFrame:
+    """One compact row per catalog vehicle with the cube's dimensions and raw measures."""
+    rows = catalog_index().rows
+    facts = rows[list(DIMENSIONS) + ["co2", "consumption"]].copy()
+    facts["co2"] = facts["co2"].astype("float32")
+    facts["consumption"] = facts["consumption"].astype("float32")
+    facts["is_bev"] = (rows["vehicle_type"] == "bev").astype("int32")
+    facts["is_phev"] = (rows["vehicle_type"] == "phev").astype("int32")
+    return facts
+
+
+# ---------- Cube ----------
+def _aggregate(facts: pd.DataFrame, dims: Tuple[str, ...]) -> pd.DataFrame:
+    if dims:
+        grouped = facts.groupby(list(dims), observed=True, sort=True)
+    else:
+        grouped = facts.groupby(np.zeros(len(facts), dtype="int8"))
+    cells = grouped.agg(
+        count=("co2", "size"),
+        co2_mean=("co2", "mean"),
+        consumption_mean=("consumption", "mean"),
+        n_bev=("is_bev", "sum"),
+        n_phev=("is_phev", "sum"),
+    )
+    quantiles = grouped["co2"].quantile([0.1, 0.5, 0.9]).unstack()
+    cells["co2_p10"] = quantiles[0.1]
+    cells["co2_p50"] = quantiles[0.5]
+    cells["co2_p90"] = quantiles[0.9]
+    cells["bev_share"] = cells["n_bev"] / cells["count"]
+    cells["phev_share"] = cells["n_phev"] / cells["count"]
+
+    cells = cells[list(MEASURES)].astype("float32")
+    cells["count"] = cells["count"].astype("int32")
+    if not dims:
+        return cells.reset_index(drop=True)
+    return cells.reset_index()
+
+
+def build_cube(facts: Optional[pd.DataFrame] = None) -> Dict[Tuple[str, ...], pd.DataFrame]:
+    """All 2^4 grouping sets, keyed by the (ordered) tuple of dimensions they group by."""
+    facts = build_fact_table() if facts is None else facts
+    cube = {}
+    for r in range(len(DIMENSIONS) + 1):
+        for dims in combinations(DIMENSIONS, r):
+            cube[dims] = _aggregate(facts, dims)
+    return cube
+
+
+def _build():
+    started = time.perf_counter()
+    facts = build_fact_table()
+    cube = build_cube(facts)
+    info = {
+        "build_ms": (time.perf_counter() - started) * 1000,
+        "cells": sum(len(c) for c in cube.values()),
+        "bytes": int(sum(c.memory_usage(deep=True).sum() for c in cube.values())),
+        "dimension_values": {
+            "model_year": sorted(facts["model_year"].unique().tolist()),
+            "make": sorted(facts["make"].cat.categories.tolist()),
+            "vehicle_class": sorted(facts["vehicle_class"].cat.categories.tolist()),
+            "fuel_type": sorted(facts["fuel_type"].cat.categories.tolist()),
+        },
+    }
+    return cube, info
+
+
+_cube_lock = threading.Lock()
+CUBE, CUBE_INFO = _build()
+
+
+@on_change
+def _rebuild_cube(changed):
+    # The cube is small and cheap to rebuild; swap both references at once.
+    global CUBE, CUBE_INFO
+    cube, info = _build()
+    with _cube_lock:
+        CUBE, CUBE_INFO = cube, info
+
+
+def dimension_values(dim: str) -> list:
+    return CUBE_INFO["dimension_values"][dim]
+
+
+def slice_cube(group_by: Iterable[str] = (), filters: Optional[dict] = None) -> pd.DataFrame:
+    """
+    Cells grouped by `group_by`, restricted to `filters` ({dim: value or [values]}).
+
+    Reads the precomputed cuboid whose dimensions are exactly
+    group_by ∪ filtered dims, so no aggregation happens per request.
+    """
+    filters = {k: v for k, v in (filters or {}).items() if v not in (None, "", [])}
+    wanted = set(group_by) | set(filters)
+    unknown = wanted - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown cube dimensions: {sorted(unknown)}")
+    dims = tuple(d for d in DIMENSIONS if d in wanted)
+
+    cells = CUBE[dims]
+    if filters:
+        mask = np.ones(len(cells), dtype=bool)
+        for dim, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            mask &= cells[dim].isin(values).to_numpy()
+        cells = cells[mask]
+    return cells
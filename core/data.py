@@ -0,0 +1,184 @@
+"""
+Dataset loading shared by every page and by the production server.
+
+The CSVs are parsed once at import time. Under gunicorn with `preload_app`
+this happens in the master process, so forked workers share the frames
+copy-on-write instead of each re-parsing them.
+
+Refreshes (see core/ingest.py) are published as small delta files next to
+the CSVs. Running workers notice the new `last_updated.txt`, apply only the
+changed rows and swap the affected frames in `CACHED_DATA` atomically.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from typing import Callable, List
+
+import pandas as pd
+
+# ---------- Config ----------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+VEHICLE_TYPES = ["conventional", "phev", "bev"]
+LAST_UPDATED_PATH = os.path.join(DATA_DIR, "last_updated.txt")
+DELTA_DIR = os.path.join(DATA_DIR, "deltas")
+REFRESH_INTERVAL = float(os.environ.get("DATA_REFRESH_INTERVAL", 5))   # seconds between freshness checks
+
+POWERTRAIN_CODES = {"conventional": 1, "phev": 2, "bev": 3}
+
+
+# ---------- Load local datasets ----------
+def load_vehicle_dataframe(vehicle_type: str) -> pd.DataFrame:
+    path = os.path.join(DATA_DIR, f"{vehicle_type}.csv")
+    return pd.read_csv(path)
+
+
+def load_rankings() -> pd.DataFrame:
+    """Industry Leaders award winners (data/car_rankings.csv)."""
+    return pd.read_csv(os.path.join(DATA_DIR, "car_rankings.csv"))
+
+
+def read_last_updated() -> str:
+    if os.path.exists(LAST_UPDATED_PATH):
+        with open(LAST_UPDATED_PATH, "r") as f:
+            return f.read().strip()
+    return "Data Last updated: Unknown"
+
+
+def vehicle_keys(vehicle_type: str, df: pd.DataFrame) -> pd.Series:
+    """
+    Stable integer key per row.
+
+    `_id` alone is not unique: conventional.csv reuses ids across model
+    years and phev.csv overlaps conventional.csv, so the key combines the
+    powertrain, the model year and `_id`.
+    """
+    return (
+        POWERTRAIN_CODES[vehicle_type] * 10**10
+        + df["model_year"].astype("int64") * 10**6
+        + df["_id"].astype("int64")
+    )
+
+
+CACHED_DATA = {vt: load_vehicle_dataframe(vt) for vt in VEHICLE_TYPES}
+LAST_UPDATED = read_last_updated()
+
+
+def last_updated() -> str:
+    return LAST_UPDATED
+
+
+# ---------- Readiness ----------
+def is_ready() -> bool:
+    """True once every dataset is loaded and non-empty."""
+    return all(vt in CACHED_DATA and not CACHED_DATA[vt].empty for vt in VEHICLE_TYPES)
+
+
+def data_status() -> dict:
+    return {
+        "ready": is_ready(),
+        "rows": {vt: int(len(CACHED_DATA.get(vt, ()))) for vt in VEHICLE_TYPES},
+        "last_updated": LAST_UPDATED,
+    }
+
+
+# ---------- Change listeners ----------
+_listeners: List[Callable[[pd.DataFrame], None]] = []
+
+
+def on_change(fn: Callable[[pd.DataFrame], None]):
+    """
+    Register `fn(changed)` to run after a delta is applied.
+
+    `changed` has one row per touched vehicle (old and new versions) with
+    `vehicle_type`, `key`, `model_year`, `make` and `model`, so caches can
+    drop exactly the affected entries.
+    """
+    _listeners.append(fn)
+    return fn
+
+
+# ---------- Incremental refresh ----------
+def list_deltas() -> List[str]:
+    return sorted(glob.glob(os.path.join(DELTA_DIR, "*.json")))
+
+
+def apply_delta(delta: dict) -> pd.DataFrame:
+    """
+    Apply one delta ({"changes": {vehicle_type: {"upsert": [records],
+    "delete": [keys]}}}) to `CACHED_DATA`. Each frame is rebuilt off to the side and swapped in
+    with a single assignment, so readers see either the old or the new frame.
+    Applying the same delta twice is a no-op.
+    """
+    touched = []
+    for vt, change in delta.get("changes", {}).items():
+        current = CACHED_DATA[vt]
+        upserts = pd.DataFrame.from_records(change.get("upsert", []), columns=current.columns)
+        deleted = pd.Index(change.get("delete", []), dtype="int64")
+
+        indexed = current.set_index(vehicle_keys(vt, current), drop=False)
+        if not upserts.empty:
+            upserts = upserts.set_index(vehicle_keys(vt, upserts), drop=False)
+            existing = upserts.index.intersection(indexed.index)
+            touched.append(indexed.loc[existing].assign(vehicle_type=vt))
+            indexed.loc[existing, :] = upserts.loc[existing, indexed.columns]
+            added = upserts.index.difference(indexed.index)
+            indexed = pd.concat([indexed, upserts.loc[added]])
+            touched.append(upserts.assign(vehicle_type=vt))
+        removed = deleted.intersection(indexed.index)
+        if len(removed):
+            touched.append(indexed.loc[removed].assign(vehicle_type=vt))
+            indexed = indexed.drop(index=removed)
+
+        CACHED_DATA[vt] = indexed.reset_index(drop=True)
+
+    if not touched:
+        return pd.DataFrame(columns=["vehicle_type", "key", "model_year", "make", "model"])
+    changed = pd.concat(touched)
+    changed = changed.assign(key=changed.index)[["vehicle_type", "key", "model_year", "make", "model"]]
+    changed = changed.reset_index(drop=True)
+    for fn in _listeners:
+        fn(changed)
+    return changed
+
+
+_refresh_lock = threading.Lock()
+_refresh_state = {
+    "checked": time.monotonic(),
+    "mtime": os.path.getmtime(LAST_UPDATED_PATH) if os.path.exists(LAST_UPDATED_PATH) else 0.0,
+    # The CSVs on disk already contain every published delta.
+    "applied": (list_deltas() or [""])[-1],
+}
+
+
+def refresh_if_changed(force: bool = False) -> bool:
+    """
+    Cheap per-request hook: at most every REFRESH_INTERVAL seconds, stat
+    `last_updated.txt`; if it moved, apply the deltas published since.
+    Returns True when new data was swapped in.
+    """
+    global LAST_UPDATED
+    now = time.monotonic()
+    if not force and now - _refresh_state["checked"] < REFRESH_INTERVAL:
+        return False
+    if not _refresh_lock.acquire(blocking=False):
+        return False     # another thread is already refreshing
+    try:
+        _refresh_state["checked"] = now
+        mtime = os.path.getmtime(LAST_UPDATED_PATH) if os.path.exists(LAST_UPDATED_PATH) else 0.0
+        if mtime == _refresh_state["mtime"] and not force:
+            return False
+
+        pending = [p for p in list_deltas() if p > _refresh_state["applied"]]
+        for path in pending:
+            with open(path, "r") as f:
+                apply_delta(json.load(f))
+            _refresh_state["applied"] = path
+        _refresh_state["mtime"] = mtime
+        LAST_UPDATED = read_last_updated()
+        return bool(pending)
+    finally:
+        _refresh_lock.release()
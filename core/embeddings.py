@@ -0,0 +1,377 @@
+"""
+Semantic vehicle index for natural-language queries, built offline.
+
+    python -m core.embeddings build                       # local hashing embedder (no network)
+    python -m core.embeddings build --provider openai     # text-embedding-3-small
+    python -m core.embeddings search "family SUV with great mileage"
+
+`build` describes every catalog vehicle (its `display_name` plus derived
+descriptors such as "fuel efficient", "plug-in hybrid", "family suv",
+"all-wheel drive") and embeds the text with a pluggable provider. The
+L2-normalized vectors are stored as a float16 matrix in
+`data/embeddings/`, next to the vehicle keys and a small metadata file that
+records the provider.
+
+At runtime the matrix is memory-mapped, so workers share the pages through
+the OS page cache. Queries are embedded with the same provider and ranked
+by cosine similarity in row blocks (`EmbeddingIndex.search`), one matmul per
+block for a whole batch of queries.
+
+Rows are tied to vehicles by the stable vehicle key, so a data refresh
+never mis-maps them. Vehicles added after the last build are just not
+retrievable until `build` is run again.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.catalog import catalog_index
+from core.data import DATA_DIR, last_updated
+from core.similar import candidates_for_text, powertrain_mask, preference_mask, similarity_index, text_preferences
+
+EMBEDDING_DIR = os.path.join(DATA_DIR, "embeddings")
+MATRIX_FILE = "vehicles.f16.npy"
+KEYS_FILE = "vehicle_keys.npy"
+META_FILE = "meta.json"
+HASHING_DIM = 512
+OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+OPENAI_EMBEDDING_DIM = 512
+SEARCH_BLOCK_ROWS = 4096
+RRF_K = 60                  # reciprocal-rank-fusion damping for chat candidates
+
+
+# ---------- Providers ----------
+class HashingEmbedder:
+    """
+    Dependency-free embedder: signed feature hashing of words, 5-letter
+    prefixes and word bigrams, weighted by per-bucket IDF learned at build
+    time. Lexical rather than truly semantic; the derived descriptors carry
+    the synonyms ("mileage", "economical", "efficient", ...).
+    """
+
+    name = "hashing"
+    STOPWORDS = {"a", "an", "the", "and", "or", "with", "for", "of", "to", "in", "on", "my", "i", "me", "want",
+                 "need", "looking", "car", "vehicle", "something", "is", "that", "some", "very", "really"}
+
+    def __init__(self, dim: int = HASHING_DIM):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _features(self, text: str) -> List[str]:
+        words = [w for w in re.findall(r"[a-z0-9]+(?:[-.][a-z0-9]+)*", text.lower()) if w not in self.STOPWORDS]
+        features = list(words)
+        features += [w[:5] + "~" for w in words if len(w) > 5]
+        features += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return features
+
+    def _buckets(self, features: List[str]):
+        for f in features:
+            h = int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), "little")
+            yield h % self.dim, (1.0 if (h >> 63) & 1 else -1.0)
+
+    def _counts(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for bucket, sign in self._buckets(self._features(text)):
+                out[i, bucket] += sign
+        return out
+
+    def fit(self, texts: List[str]) -> None:
+        present = (self._counts(texts) != 0).sum(axis=0)
+        self.idf = (np.log((1 + len(texts)) / (1 + present)) + 1).astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        counts = self._counts(texts)
+        vectors = np.sign(counts) * np.log1p(np.abs(counts)) * self.idf
+        return _normalize(vectors)
+
+    def save(self, directory: str) -> dict:
+        np.save(os.path.join(directory, "hashing_idf.npy"), self.idf)
+        return {"dim": self.dim}
+
+    def load(self, directory: str, meta: dict) -> None:
+        self.dim = meta["dim"]
+        self.idf = np.load(os.path.join(directory, "hashing_idf.npy"))
+
+
+class OpenAIEmbedder:
+    """OpenAI embeddings API (needs OPENAI_API_KEY at build and query time)."""
+
+    name = "openai"
+    BATCH = 512
+
+    def __init__(self, model: str = OPENAI_EMBEDDING_MODEL, dim: int = OPENAI_EMBEDDING_DIM):
+        self.model = model
+        self.dim = dim
+        self._client = None
+
+    def fit(self, texts: List[str]) -> None:
+        pass
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        out = []
+        for start in range(0, len(texts), self.BATCH):
+            response = self._client.embeddings.create(
+                model=self.model, input=texts[start:start + self.BATCH], dimensions=self.dim
+            )
+            out.extend(item.embedding for item in response.data)
+        return _normalize(np.asarray(out, dtype=np.float32))
+
+    def save(self, directory: str) -> dict:
+        return {"dim": self.dim, "model": self.model}
+
+    def load(self, directory: str, meta: dict) -> None:
+        self.dim = meta["dim"]
+        self.model = meta["model"]
+
+
+PROVIDERS = {"hashing": HashingEmbedder, "openai": OpenAIEmbedder}
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+# ---------- Descriptions ----------
+CLASS_DESCRIPTORS = {
+    "Sport utility vehicle: Small": "suv crossover compact suv small suv",
+    "Sport utility vehicle: Standard": "suv large suv family suv three-row roomy",
+    "Pickup truck: Small": "pickup truck compact truck",
+    "Pickup truck: Standard": "pickup truck full-size truck towing hauling work truck",
+    "Minivan": "minivan family van seven seats roomy",
+    "Van: Passenger": "passenger van large van many seats",
+    "Special purpose vehicle": "special purpose vehicle",
+    "Station wagon: Small": "wagon estate hatchback practical",
+    "Station wagon: Mid-size": "wagon estate practical roomy",
+    "Two-seater": "sports car two-seater coupe roadster convertible",
+    "Minicompact": "small car city car coupe",
+    "Subcompact": "small car city car hatchback subcompact",
+    "Compact": "compact car sedan hatchback commuter",
+    "Mid-size": "mid-size sedan family car",
+    "Full-size": "full-size sedan large car luxury",
+}
+FUEL_DESCRIPTORS = {"X": "gasoline regular gas", "Z": "gasoline premium gas", "D": "diesel",
+                    "E": "flex fuel e85 ethanol", "N": "natural gas"}
+
+
+def describe_vehicles() -> pd.DataFrame:
+    """One text per catalog vehicle: display name plus derived descriptors."""
+    index = similarity_index()
+    rows, raw = index.catalog.rows, index.raw
+    vt = rows["vehicle_type"].astype(str).to_numpy()
+    model = rows["model"].astype(str).str.lower()
+
+    # The fuel burned: "B/Z" (a PHEV on premium) -> "Z".
+    fuel = rows["fuel_type"].astype(str).str.split("/").str[-1].to_numpy()
+    # Efficiency tiers are relative to the same powertrain and class ("efficient
+    # for a gas SUV"); power tiers to the same powertrain.
+    tiers = pd.DataFrame({"vt": vt, "class": rows["vehicle_class"].astype(str).to_numpy(),
+                          "consumption": raw["consumption"], "co2": raw["co2"],
+                          "power": np.where(vt == "conventional", raw["engine_size"], raw["motor_kw"])})
+    pct = tiers.groupby(["vt", "class"])[["consumption", "co2"]].rank(pct=True)
+    pct["power"] = tiers.groupby("vt")["power"].rank(pct=True)
+
+    texts = []
+    for i in range(len(rows)):
+        parts = [str(rows["display_name"].iat[i]), CLASS_DESCRIPTORS.get(str(rows["vehicle_class"].iat[i]), "")]
+        if vt[i] == "bev":
+            parts.append(f"electric ev battery electric zero emission no gas range {raw['electric_range'].iat[i]:.0f} km")
+        elif vt[i] == "phev":
+            parts.append(f"plug-in hybrid phev electric range {raw['electric_range'].iat[i]:.0f} km "
+                         + FUEL_DESCRIPTORS.get(fuel[i], ""))
+        else:
+            parts.append(FUEL_DESCRIPTORS.get(fuel[i], ""))
+            if "hybrid" in model.iat[i]:
+                parts.append("hybrid gas-electric")
+        if pct["consumption"].iat[i] <= 0.25:
+            parts.append("efficient great mileage economical")
+        elif pct["consumption"].iat[i] >= 0.85:
+            parts.append("thirsty")
+        if pct["co2"].iat[i] <= 0.25 or vt[i] == "bev":
+            parts.append("eco-friendly green")
+        if pct["power"].iat[i] >= 0.8:
+            parts.append("powerful fast performance")
+        if re.search(r"\b(awd|4wd|4x4|4matic|xdrive|quattro|all4)\b", model.iat[i]):
+            parts.append("awd winter")
+        if "manual" in model.iat[i]:
+            parts.append("manual stick shift")
+        texts.append(" ".join(p for p in parts if p))
+    return pd.DataFrame({"vehicle_key": rows["vehicle_key"].to_numpy(), "text": texts})
+
+
+# ---------- Build ----------
+def _atomic_save(path: str, array: np.ndarray) -> None:
+    tmp = path + ".tmp.npy"
+    np.save(tmp, array)
+    os.replace(tmp, path)
+
+
+def build(provider: str = "hashing", directory: str = EMBEDDING_DIR) -> dict:
+    """Embed every catalog vehicle and write the float16 matrix, keys and metadata."""
+    started = time.perf_counter()
+    described = describe_vehicles()
+    texts = described["text"].tolist()
+    embedder = PROVIDERS[provider]()
+    embedder.fit(texts)
+    matrix = embedder.embed(texts).astype(np.float16)
+
+    os.makedirs(directory, exist_ok=True)
+    meta = {"provider": provider, "rows": len(texts), "data_version": last_updated(), **embedder.save(directory)}
+    # Metadata last: readers reload when it changes.
+    _atomic_save(os.path.join(directory, MATRIX_FILE), matrix)
+    _atomic_save(os.path.join(directory, KEYS_FILE), described["vehicle_key"].to_numpy(dtype="int64"))
+    tmp = os.path.join(directory, META_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(directory, META_FILE))
+    return {**meta, "seconds": round(time.perf_counter() - started, 2), "bytes": int(matrix.nbytes)}
+
+
+# ---------- Search ----------
+class EmbeddingIndex:
+    """Memory-mapped float16 vehicle embeddings plus the provider that made them."""
+
+    def __init__(self, directory: str = EMBEDDING_DIR):
+        with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.matrix = np.load(os.path.join(directory, MATRIX_FILE), mmap_mode="r")
+        self.keys = np.load(os.path.join(directory, KEYS_FILE))
+        self.embedder = PROVIDERS[self.meta["provider"]]()
+        self.embedder.load(directory, self.meta)
+        self._catalog = None
+        self._positions = None
+
+    def catalog_positions(self) -> np.ndarray:
+        """Catalog position of every embedding row (-1 for vehicles no longer in the catalog)."""
+        catalog = catalog_index()
+        if self._catalog is not catalog:
+            self._positions = catalog.positions_for_keys(self.keys)
+            self._catalog = catalog
+        return self._positions
+
+    def search(self, queries: np.ndarray, k: int = 10, row_mask: Optional[np.ndarray] = None):
+        """
+        Cosine top-k for a batch of normalized query vectors, scanning the
+        matrix in blocks. Returns (rows, scores), both shaped (batch, k), best first.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        batch, n = len(queries), len(self.matrix)
+        k = min(k, n)
+        best_rows = np.empty((batch, 0), dtype="int64")
+        best_scores = np.empty((batch, 0), dtype=np.float32)
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, n)
+            scores = queries @ np.asarray(self.matrix[start:stop], dtype=np.float32).T
+            if row_mask is not None:
+                scores[:, ~row_mask[start:stop]] = -np.inf
+            rows = np.broadcast_to(np.arange(start, stop), scores.shape)
+            all_scores = np.hstack([best_scores, scores])
+            all_rows = np.hstack([best_rows, rows])
+            keep = np.argpartition(-all_scores, k - 1, axis=1)[:, :k] if all_scores.shape[1] > k \
+                else np.broadcast_to(np.arange(all_scores.shape[1]), all_scores.shape)
+            best_scores = np.take_along_axis(all_scores, keep, axis=1)
+            best_rows = np.take_along_axis(all_rows, keep, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+    def query(self, texts: List[str], k: int = 10, catalog_mask: Optional[np.ndarray] = None):
+        """Embed `texts` and return, per text, catalog positions of the top-k vehicles."""
+        positions = self.catalog_positions()
+        row_mask = positions >= 0
+        if catalog_mask is not None:
+            row_mask &= catalog_mask[np.maximum(positions, 0)]
+        rows, scores = self.search(self.embedder.embed(texts), k, row_mask)
+        return [positions[r[np.isfinite(s)]] for r, s in zip(rows, scores)]
+
+
+_index_lock = threading.Lock()
+_embedding_index: Optional[EmbeddingIndex] = None
+_embedding_mtime = None
+
+
+def embedding_index() -> Optional[EmbeddingIndex]:
+    """The on-disk index (reloaded after a rebuild), or None when it has not been built."""
+    global _embedding_index, _embedding_mtime
+    try:
+        mtime = os.path.getmtime(os.path.join(EMBEDDING_DIR, META_FILE))
+    except OSError:
+        return None
+    with _index_lock:
+        if _embedding_index is None or mtime != _embedding_mtime:
+            _embedding_index = EmbeddingIndex()
+            _embedding_mtime = mtime
+        return _embedding_index
+
+
+def semantic_search(text: str, k: int = 10, catalog_mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Top-k catalog positions for `text`. Without a `catalog_mask`, the powertrain
+    named in the text is a hard filter: the hashing embedder is lexical, and
+    "electric hatchback" otherwise ranks gasoline hatchbacks first.
+    """
+    index = embedding_index()
+    if index is None or not text:
+        return np.array([], dtype="int64")
+    if catalog_mask is None:
+        catalog_mask = powertrain_mask(catalog_index().rows, text_preferences(text))
+    return index.query([text], k, catalog_mask)[0]
+
+
+# ---------- Chat retrieval ----------
+def chat_candidates(text: str, k: int = 10) -> np.ndarray:
+    """
+    Catalog positions to show the LLM for a free-text request: spec-vector
+    neighbours (core.similar) and embedding hits under the same hard filters,
+    merged by reciprocal rank fusion and kept to one row per model family.
+    """
+    similar = similarity_index()
+    mask = preference_mask(similar, text_preferences(text))
+    ranked = [candidates_for_text(text, k=k * 2), semantic_search(text, k=k * 4, catalog_mask=mask)]
+    scores = {}
+    for positions in ranked:
+        for rank, p in enumerate(positions):
+            scores[int(p)] = scores.get(int(p), 0.0) + 1.0 / (RRF_K + rank)
+    merged, families = [], set()
+    for p in sorted(scores, key=scores.get, reverse=True):
+        family = similar.family_codes[p]
+        if family not in families:
+            families.add(family)
+            merged.append(p)
+    return np.array(merged[:k], dtype="int64")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the vehicle embedding index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="Embed every catalog vehicle into data/embeddings/")
+    build_cmd.add_argument("--provider", choices=sorted(PROVIDERS), default=os.environ.get("EMBEDDING_PROVIDER", "hashing"))
+    search_cmd = sub.add_parser("search", help="Print the top matches for a query")
+    search_cmd.add_argument("query")
+    search_cmd.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(build(args.provider), indent=2))
+        return
+    if embedding_index() is None:
+        raise SystemExit("No embedding index; run `python -m core.embeddings build` first.")
+    rows = catalog_index().rows
+    for p in semantic_search(args.query, args.k):
+        print(rows["display_name"].iat[p])
+
+
+if __name__ == "__main__":
+    main()
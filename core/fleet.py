@@ -0,0 +1,176 @@
+"""
+Bulk (fleet) annual energy cost and CO₂ estimation.
+
+Uploaded fleets are joined against the catalog through the hashed key
+indexes in `core.catalog`, then priced in one vectorized pass per chunk with `core.costs.annual_energy_cost`.
+Input is read in chunks of FLEET_CHUNK_ROWS, so memory stays bounded no
+matter how large the fleet is.
+
+Accepted columns (case-insensitive; any one way of identifying a vehicle):
+    vehicle_key                     stable key (see core.data.vehicle_keys)
+    _id [+ year]                    NRCan id; ids are reused across years, so an
+                                    `_id` without its year only matches when unique
+    year, make, model               exact catalog names
+    annual_km                       optional, default 15,000
+    city_ratio                      optional, city share in percent, default 80
+"""
+
+import io
+import itertools
+import os
+from typing import Iterator
+
+import numpy as np
+import pandas as pd
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from core.catalog import AMBIGUOUS, catalog_index
+from core.costs import (DEFAULT_ANNUAL_KM, DEFAULT_CITY_RATIO, DEFAULT_ELECTRICITY_PRICE, DEFAULT_FUEL_PRICE,
+                        annual_energy_cost)
+from core.vehicle_table import energy_price
+
+FLEET_CHUNK_ROWS = int(os.environ.get("FLEET_CHUNK_ROWS", 20000))
+
+COLUMN_ALIASES = {
+    "model_year": "year",
+    "id": "_id",
+    "annual_distance": "annual_km",
+    "km": "annual_km",
+    "annual_distance_km": "annual_km",
+}
+
+
+# ---------- Estimation ----------
+def normalize_columns(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = chunk.rename(columns=lambda c: str(c).strip().lower())
+    return chunk.rename(columns={k: v for k, v in COLUMN_ALIASES.items() if k in chunk.columns})
+
+
+def estimate_chunk(chunk: pd.DataFrame, fuel_price: float = DEFAULT_FUEL_PRICE,
+                   electricity_price: float = DEFAULT_ELECTRICITY_PRICE) -> pd.DataFrame:
+    """Annual cost and CO₂ for one chunk of fleet rows; input columns are kept in front."""
+    chunk = normalize_columns(chunk)
+    index = catalog_index()
+    positions = index.resolve(chunk)
+    matched = positions >= 0
+    take = np.maximum(positions, 0)
+
+    annual_km = pd.to_numeric(chunk.get("annual_km", DEFAULT_ANNUAL_KM), errors="coerce")
+    annual_km = np.broadcast_to(np.asarray(annual_km, dtype=float), (len(chunk),))
+    annual_km = np.where(np.isnan(annual_km), DEFAULT_ANNUAL_KM, annual_km)
+    city_ratio = pd.to_numeric(chunk.get("city_ratio", DEFAULT_CITY_RATIO), errors="coerce")
+    city_ratio = np.broadcast_to(np.asarray(city_ratio, dtype=float), (len(chunk),))
+    city_ratio = np.clip(np.where(np.isnan(city_ratio), DEFAULT_CITY_RATIO, city_ratio), 0, 100)
+
+    rows = index.rows
+    city = np.where(matched, rows["city"].to_numpy()[take], np.nan)
+    highway = np.where(matched, rows["highway"].to_numpy()[take], np.nan)
+    price = energy_price(rows, fuel_price, electricity_price)[take]
+    ratio = city_ratio / 100.0
+
+    per_100km = ratio * city + (1.0 - ratio) * highway
+    result = chunk.copy()
+    result["matched"] = matched
+    result["match_note"] = np.select([matched, positions == AMBIGUOUS], ["", "ambiguous _id: add the year"],
+                                     "not in catalog")
+    result["vehicle_type"] = np.where(matched, rows["vehicle_type"].astype(str).to_numpy()[take], "")
+    result["vehicle_key"] = np.where(matched, rows["vehicle_key"].to_numpy()[take], -1)
+    result["display_name"] = np.where(matched, rows["display_name"].to_numpy()[take], "")
+    result["annual_km"] = annual_km
+    result["city_ratio"] = city_ratio
+    result["consumption_per_100km"] = per_100km.round(2)
+    result["energy_unit"] = np.where(matched, rows["energy_unit"].astype(str).to_numpy()[take], "")
+    result["annual_energy"] = (annual_km / 100.0 * per_100km).round(1)
+    result["annual_cost_cad"] = annual_energy_cost(city, highway, ratio, price, annual_km).round(2)
+    result["annual_co2_kg"] = (np.where(matched, rows["co2"].to_numpy()[take], np.nan) * annual_km / 1000.0).round(1)
+    return result
+
+
+class FleetFileError(ValueError):
+    """The fleet CSV cannot be read or does not identify its vehicles."""
+
+
+def read_fleet(source, chunk_rows: int = FLEET_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Chunks of a fleet CSV (path or file-like). The first chunk is read and
+    checked here, so a bad file raises FleetFileError before any output is
+    produced; later chunks are read lazily.
+    """
+    try:
+        reader = pd.read_csv(source, chunksize=chunk_rows)
+        first = next(reader)
+    except (pd.errors.EmptyDataError, pd.errors.ParserError, UnicodeDecodeError, StopIteration) as e:
+        raise FleetFileError(f"Not a readable CSV file ({type(e).__name__}).") from e
+    columns = set(normalize_columns(first.head(0)).columns)
+    if not ({"vehicle_key"} <= columns or {"_id"} <= columns or {"year", "make", "model"} <= columns):
+        raise FleetFileError("The CSV needs a vehicle_key column, an _id column (with year), "
+                             "or year, make and model columns.")
+    return itertools.chain([first], reader)
+
+
+def estimate_chunks(chunks, fuel_price: float = DEFAULT_FUEL_PRICE,
+                    electricity_price: float = DEFAULT_ELECTRICITY_PRICE) -> Iterator[pd.DataFrame]:
+    for chunk in chunks:
+        yield estimate_chunk(chunk, fuel_price, electricity_price)
+
+
+def iter_estimates(source, fuel_price: float = DEFAULT_FUEL_PRICE,
+                   electricity_price: float = DEFAULT_ELECTRICITY_PRICE,
+                   chunk_rows: int = FLEET_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Estimate a fleet CSV (path or file-like) chunk by chunk; raises FleetFileError for a bad file."""
+    return estimate_chunks(read_fleet(source, chunk_rows), fuel_price, electricity_price)
+
+
+def iter_csv(chunks, fuel_price: float = DEFAULT_FUEL_PRICE,
+             electricity_price: float = DEFAULT_ELECTRICITY_PRICE) -> Iterator[str]:
+    """Estimates for `read_fleet` chunks as CSV text, one chunk at a time (header only on the first)."""
+    for i, result in enumerate(estimate_chunks(chunks, fuel_price, electricity_price)):
+        yield result.to_csv(index=False, header=(i == 0))
+
+
+def summarize(result: pd.DataFrame) -> dict:
+    matched = result[result["matched"]]
+    return {
+        "vehicles": int(len(result)),
+        "matched": int(len(matched)),
+        "unmatched": int(len(result) - len(matched)),
+        "annual_cost_cad": float(matched["annual_cost_cad"].sum()),
+        "annual_co2_kg": float(matched["annual_co2_kg"].sum()),
+        "annual_km": float(matched["annual_km"].sum()),
+    }
+
+
+def combine_summaries(summaries) -> dict:
+    total = {"vehicles": 0, "matched": 0, "unmatched": 0, "annual_cost_cad": 0.0, "annual_co2_kg": 0.0, "annual_km": 0.0}
+    for s in summaries:
+        for k in total:
+            total[k] += s[k]
+    return total
+
+
+# ---------- Streaming endpoint ----------
+fleet_api = Blueprint("fleet_api", __name__)
+
+
+@fleet_api.route("/fleet/estimate.csv", methods=["POST"])
+def fleet_estimate_csv():
+    """
+    POST a fleet CSV (multipart field `file` or the raw request body) and
+    stream the estimates back as CSV. Optional query parameters:
+    `fuel_price` (CAD/L) and `electricity_price` (CAD/kWh).
+    """
+    fuel_price = request.args.get("fuel_price", DEFAULT_FUEL_PRICE, type=float)
+    electricity_price = request.args.get("electricity_price", DEFAULT_ELECTRICITY_PRICE, type=float)
+    upload = request.files.get("file")
+    source = upload.stream if upload else io.BytesIO(request.get_data())
+    # Check the file before streaming: once the 200 headers are out, errors cannot be reported.
+    try:
+        chunks = read_fleet(source)
+    except FleetFileError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return Response(
+        stream_with_context(iter_csv(chunks, fuel_price, electricity_price)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=fleet_estimates.csv"},
+    )
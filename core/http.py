@@ -0,0 +1,181 @@
+"""
+HTTP helpers: JSON responses with ETag revalidation, Cache-Control and
+content negotiation for gzip or brotli, plus the response middleware the
+Dash server runs behind (see `serve_cached_dash_response` and
+`finalize_response`).
+
+Brotli is used only when the optional `brotli` package is installed and the
+client accepts it; otherwise gzip.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+MIN_COMPRESS_BYTES = 1024
+IMMUTABLE_MAX_AGE = 31536000    # one year; for URLs that change whenever the file does
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "text/javascript",
+    "text/css",
+    "text/html",
+    "text/plain",
+    "image/svg+xml",
+}
+# Dash serves these from structures fixed once the app has started (the
+# layout is not a function and every callback is registered at import).
+STATIC_DASH_PATHS = ("/_dash-layout", "/_dash-dependencies")
+COMPRESSED_CACHE_ENTRIES = 64
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def not_modified(etag: str) -> bool:
+    """True when the request's If-None-Match already names `etag`."""
+    header = request.headers.get("If-None-Match", "")
+    return etag in [t.strip().removeprefix("W/") for t in header.split(",")] or header.strip() == "*"
+
+
+def choose_encoding() -> str:
+    accepted = request.headers.get("Accept-Encoding", "").lower()
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return ""
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def cached_response(body: bytes, mimetype: str, max_age: int = 0, private: bool = False) -> Response:
+    """
+    Response for `body` with a strong ETag (answering 304 when it matches),
+    Cache-Control and on-the-fly compression.
+    """
+    etag = etag_for(body)
+    if max_age:
+        cache_control = f"{'private' if private else 'public'}, max-age={max_age}"
+    else:
+        cache_control = "no-cache"     # always revalidate, but 304s stay cheap
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if not_modified(etag):
+        return Response(status=304, headers=headers)
+
+    encoding = choose_encoding() if len(body) >= MIN_COMPRESS_BYTES else ""
+    if encoding:
+        body = compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+    return Response(body, mimetype=mimetype, headers=headers)
+
+
+def json_response(payload, max_age: int = 0, private: bool = False, status: int = 200) -> Response:
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if status != 200:
+        return Response(body, status=status, mimetype="application/json", headers={"Cache-Control": "no-store"})
+    return cached_response(body, "application/json", max_age=max_age, private=private)
+
+
+# ---------- Dash server middleware ----------
+_lock = threading.Lock()
+_static_dash = {}                # path -> {"etag": str, "bodies": {encoding: bytes}}
+_compressed = OrderedDict()      # (full path, encoding) -> compressed bytes of an immutable file
+
+
+def _static_dash_response(entry: dict) -> Response:
+    headers = {"ETag": entry["etag"], "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if not_modified(entry["etag"]):
+        return Response(status=304, headers=headers)
+    encoding = choose_encoding() if len(entry["bodies"][""]) >= MIN_COMPRESS_BYTES else ""
+    with _lock:
+        body = entry["bodies"].get(encoding)
+        if body is None:
+            body = entry["bodies"][encoding] = compress(entry["bodies"][""], encoding)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+def serve_cached_dash_response():
+    """before_request: answer `_dash-layout` / `_dash-dependencies` from memory once rendered."""
+    if request.method != "GET":
+        return None
+    entry = _static_dash.get(request.path)
+    return _static_dash_response(entry) if entry else None
+
+
+def _compress_in_place(response: Response, encoding: str, immutable: bool) -> None:
+    key = (request.full_path, encoding)
+    with _lock:
+        body = _compressed.get(key) if immutable else None
+        if body is not None:
+            _compressed.move_to_end(key)
+    if body is None:
+        body = compress(response.get_data(), encoding)
+        if immutable:
+            with _lock:
+                _compressed[key] = body
+                while len(_compressed) > COMPRESSED_CACHE_ENTRIES:
+                    _compressed.popitem(last=False)
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)     # the bytes no longer match the strong tag
+
+
+def finalize_response(response: Response) -> Response:
+    """
+    after_request: cache the static Dash payloads, mark fingerprinted
+    assets immutable and compress compressible bodies.
+    """
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+
+    if request.method == "GET" and request.path in STATIC_DASH_PATHS:
+        entry = {"etag": etag_for(response.get_data()), "bodies": {"": response.get_data()}}
+        with _lock:
+            entry = _static_dash.setdefault(request.path, entry)
+        return _static_dash_response(entry)
+
+    # Dash links assets as /assets/<file>?m=<mtime> and component bundles
+    # with a version fingerprint, so both URLs change whenever the file does.
+    immutable = request.path.startswith("/assets/") and "m" in request.args
+    if immutable:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    elif request.path.startswith("/_dash-component-suites/"):
+        immutable = response.cache_control.max_age == IMMUTABLE_MAX_AGE
+
+    if response.mimetype not in COMPRESSIBLE_TYPES:
+        return response
+    if response.is_streamed and not response.direct_passthrough:
+        return response                         # a generator; leave it streaming
+    response.vary.add("Accept-Encoding")
+    response.direct_passthrough = False         # send_file bodies are read once and cached
+    if response.content_length is not None and response.content_length < MIN_COMPRESS_BYTES:
+        return response
+    encoding = choose_encoding()
+    if encoding:
+        _compress_in_place(response, encoding, immutable)
+    return response
@@ -0,0 +1,116 @@
+"""
+Incremental refresh of the NRCan datasets.
+
+    python -m core.ingest path/to/new_files/            # local stand-in
+    python -m core.ingest https://example.org/nrcan/    # fetched over HTTP
+
+The source must provide `conventional.csv`, `phev.csv` and/or `bev.csv` in
+the same (already normalized) schema as `data/`. Each file is diffed against
+the current one by vehicle key (`_id` + model year, see
+`core.data.vehicle_keys`). The changed rows are published as one delta file
+in `data/deltas/`, the CSVs are replaced atomically, and `last_updated.txt`
+is bumped last. Running workers pick the delta up without a restart (see
+`core.data.refresh_if_changed`).
+"""
+
+import argparse
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+import requests
+
+from core.data import DATA_DIR, DELTA_DIR, LAST_UPDATED_PATH, VEHICLE_TYPES, load_vehicle_dataframe, vehicle_keys
+
+
+def fetch_source(source: str, vehicle_type: str) -> pd.DataFrame:
+    """Read `<source>/<vehicle_type>.csv` from a directory or an HTTP(S) base URL; None if absent."""
+    name = f"{vehicle_type}.csv"
+    if source.startswith(("http://", "https://")):
+        resp = requests.get(f"{source.rstrip('/')}/{name}", timeout=60)
+        if resp.status_code == 404:
+            return None
+        resp.raise_for_status()
+        return pd.read_csv(io.StringIO(resp.text))
+    path = os.path.join(source, name)
+    return pd.read_csv(path) if os.path.exists(path) else None
+
+
+def diff_vehicles(vehicle_type: str, old: pd.DataFrame, new: pd.DataFrame) -> dict:
+    """Rows of `new` that are added or changed, and keys of rows that disappeared."""
+    if list(old.columns) != list(new.columns):
+        raise ValueError(f"{vehicle_type}.csv: schema changed {list(old.columns)} -> {list(new.columns)}")
+
+    old_i = old.set_index(vehicle_keys(vehicle_type, old))
+    new_i = new.set_index(vehicle_keys(vehicle_type, new))
+    if new_i.index.has_duplicates:
+        dupes = new_i.index[new_i.index.duplicated()].unique().tolist()[:5]
+        raise ValueError(f"{vehicle_type}.csv: duplicate vehicle keys, e.g. {dupes}")
+
+    common = new_i.index.intersection(old_i.index)
+    differs = (old_i.loc[common].astype(str) != new_i.loc[common].astype(str)).any(axis=1)
+    changed_keys = common[differs.to_numpy()]
+    added_keys = new_i.index.difference(old_i.index)
+    deleted_keys = old_i.index.difference(new_i.index)
+
+    upserts = new_i.loc[changed_keys.append(added_keys)]
+    return {
+        "upsert": upserts.to_dict("records"),
+        "delete": [int(k) for k in deleted_keys],
+        "counts": {"changed": len(changed_keys), "added": len(added_keys), "deleted": len(deleted_keys)},
+    }
+
+
+def _atomic_write(path: str, text: str):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def ingest(source: str) -> dict:
+    """Diff every dataset found in `source`, publish a delta and swap the CSVs. Returns the counts."""
+    changes, summary, replacements = {}, {}, {}
+    for vt in VEHICLE_TYPES:
+        new = fetch_source(source, vt)
+        if new is None:
+            continue
+        diff = diff_vehicles(vt, load_vehicle_dataframe(vt), new)
+        summary[vt] = diff.pop("counts")
+        if diff["upsert"] or diff["delete"]:
+            changes[vt] = diff
+            replacements[vt] = new
+
+    if not changes:
+        return summary
+
+    stamp = datetime.now()
+    os.makedirs(DELTA_DIR, exist_ok=True)
+    # Write the full CSVs first, then the delta, then bump last_updated.txt:
+    # a worker that starts in between loads the new CSVs and re-applies the
+    # (idempotent) delta.
+    for vt, new in replacements.items():
+        _atomic_write(os.path.join(DATA_DIR, f"{vt}.csv"), new.to_csv(index=False))
+    delta_name = f"{stamp:%Y%m%dT%H%M%S}-{time.time_ns() % 10**9:09d}.json"
+    _atomic_write(os.path.join(DELTA_DIR, delta_name), json.dumps({"created": stamp.isoformat(), "changes": changes}))
+    _atomic_write(LAST_UPDATED_PATH, f"Data Last updated: {stamp:%Y-%m-%d %H:%M:%S}\n")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply new NRCan dataset files incrementally.")
+    parser.add_argument("source", help="Directory or base URL containing conventional.csv / phev.csv / bev.csv")
+    args = parser.parse_args()
+
+    summary = ingest(args.source)
+    if not summary:
+        print("No dataset files found in source.")
+    for vt, counts in summary.items():
+        print(f"{vt}: {counts['changed']} changed, {counts['added']} added, {counts['deleted']} deleted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Local job queue for long-running LLM work.
+
+Background callbacks run in their own process (Dash `DiskcacheManager`), so
+web workers only handle fast requests. Progress and results go through a
+diskcache directory that all gunicorn workers share.
+
+`dedupe` collapses identical jobs: the first caller computes, concurrent
+callers with the same key wait for its result, and later callers reuse it
+until it expires.
+
+Car Search selections carry a request token. When the selection changes, the
+old token is superseded, and jobs started under it stop before the next LLM
+call and drop their results.
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+
+import diskcache
+from dash import DiskcacheManager
+from dash.exceptions import PreventUpdate
+
+from core.data import BASE_DIR, on_change
+
+# ---------- Config ----------
+JOB_CACHE_DIR = os.environ.get("JOB_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "jobs"))
+JOB_RESULT_TTL = int(os.environ.get("JOB_RESULT_TTL", 6 * 3600))   # seconds a finished job is reused
+JOB_LOCK_TTL = int(os.environ.get("JOB_LOCK_TTL", 180))             # upper bound for one LLM job
+JOB_POLL_INTERVAL = 0.25
+
+job_cache = diskcache.Cache(JOB_CACHE_DIR)
+background_callback_manager = DiskcacheManager(job_cache, expire=JOB_RESULT_TTL)
+
+
+# ---------- Deduplication ----------
+def job_key(namespace: str, *parts) -> str:
+    raw = json.dumps(list(parts), sort_keys=True, default=str)
+    return f"job:{namespace}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+
+def vehicle_tag(year, make: str, model: str) -> str:
+    """Tag for cached results about one vehicle, so a data refresh can evict them."""
+    return f"vehicle:{year}|{make}|{model}"
+
+
+def _pid_alive(pid) -> bool:
+    """Whether process `pid` on this host is still running (a zombie, killed but not yet reaped, is not)."""
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, TypeError, ValueError):
+        return True
+    try:
+        with open(f"/proc/{int(pid)}/stat", "r") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except (OSError, IndexError):
+        return True
+
+
+def _break_dead_lock(lock_key: str) -> None:
+    """Drop `lock_key` if its holder died without releasing it (a cancelled job is SIGKILLed)."""
+    with job_cache.transact():
+        holder = job_cache.get(lock_key)
+        if holder is not None and not _pid_alive(holder):
+            job_cache.delete(lock_key)
+
+
+def dedupe(key: str, fn, ttl: int = JOB_RESULT_TTL, tag: str = None):
+    """
+    Run `fn()` once per `key` across all processes.
+
+    Results are reused for `ttl` seconds. If another process is already
+    computing the same key we wait for its result instead of calling the
+    LLM a second time; if it dies, we take over. The lock holds the holder's
+    pid, so a killed holder (Dash cancels background jobs with SIGKILL, and
+    its `finally` never runs) is noticed on the next poll, not after
+    JOB_LOCK_TTL.
+    """
+    result_key, lock_key = f"{key}:result", f"{key}:lock"
+
+    deadline = time.monotonic() + JOB_LOCK_TTL
+    while True:
+        cached = job_cache.get(result_key)
+        if cached is not None:
+            return cached
+        if job_cache.add(lock_key, os.getpid(), expire=JOB_LOCK_TTL):
+            break
+        if time.monotonic() > deadline:
+            break
+        _break_dead_lock(lock_key)
+        time.sleep(JOB_POLL_INTERVAL)
+
+    try:
+        result = fn()
+        job_cache.set(result_key, result, expire=ttl, tag=tag)
+        return result
+    finally:
+        job_cache.delete(lock_key)
+
+
+@on_change
+def _evict_changed_vehicles(changed):
+    for year, make, model in changed[["model_year", "make", "model"]].drop_duplicates().itertuples(index=False):
+        job_cache.evict(vehicle_tag(year, make, model))
+
+
+# ---------- Request versioning ----------
+def new_request_token() -> str:
+    return uuid.uuid4().hex
+
+
+def supersede(token: str):
+    """Mark every job started under `token` as stale."""
+    if token:
+        job_cache.set(f"superseded:{token}", True, expire=JOB_LOCK_TTL * 2)
+
+
+def is_superseded(token: str) -> bool:
+    return bool(token) and job_cache.get(f"superseded:{token}", False)
+
+
+def ensure_current(token: str):
+    """Abort a background job (no further LLM calls, no UI update) once its selection changed."""
+    if is_superseded(token):
+        raise PreventUpdate
@@ -0,0 +1,579 @@
+"""
+Pluggable LLM backends with health-based failover.
+
+Pages ask `llm()` for one of four tasks (summary, price, kpis, chat). The
+call goes to the first healthy backend, in order:
+
+    openai     OpenAI API (OPENAI_API_KEY); price is routed mini -> 4o (core.routing)
+    local      any OpenAI-compatible server (LOCAL_LLM_URL, e.g. llama.cpp,
+               Ollama or vLLM at http://localhost:11434/v1) running LOCAL_LLM_MODEL
+    sidecar    the async sidecar (core.sidecar, LLM_SIDECAR_URL): same prompts and
+               routing, with every upstream wait on one event loop
+    template   deterministic text and scores from the NRCan data, no network
+
+Unconfigured backends are left out; LLM_BACKENDS reorders or limits the
+others ("local,openai", "sidecar,openai"). The template backend is always
+last, so pages render without an API key and while the upstream is down.
+
+Client timeouts bound every call. A failed or slow call (over LLM_SLOW_SECONDS)
+is a strike; after LLM_FAILURE_THRESHOLD consecutive strikes a backend is
+skipped for LLM_COOLDOWN seconds. Then one caller, across all processes,
+takes a probe slot and retries it; the others keep skipping it until that
+call succeeds (closing it) or strikes (another cooldown). Health lives in
+the shared job cache, because calls run in background job processes.
+"""
+
+import json
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from core.admission import Ticket, record_latency
+from core.costs import DEFAULT_ANNUAL_KM
+from core.embeddings import chat_candidates
+from core.jobs import dedupe, job_cache, job_key, vehicle_tag
+from core.prompts import KPIS, PRICE, PRICE_SCHEMA, SUMMARY, complete
+from core.records import vehicle_registry
+from core.routing import FAST_FIRST, route
+from core.similar import similarity_index, text_preferences
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# ---------- Config ----------
+LLM_BACKENDS = os.environ.get("LLM_BACKENDS", "openai,local")
+LOCAL_LLM_URL = os.environ.get("LOCAL_LLM_URL", "")
+LOCAL_LLM_MODEL = os.environ.get("LOCAL_LLM_MODEL", "llama3.1:8b")
+LLM_SIDECAR_URL = os.environ.get("LLM_SIDECAR_URL", "")
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 15))                  # seconds per request
+LLM_SLOW_SECONDS = float(os.environ.get("LLM_SLOW_SECONDS", 12))        # slower calls count as a strike
+LLM_FAILURE_THRESHOLD = int(os.environ.get("LLM_FAILURE_THRESHOLD", 3))
+LLM_COOLDOWN = int(os.environ.get("LLM_COOLDOWN", 60))                  # seconds a tripped backend is skipped
+SIDECAR_TIMEOUT = 2 * LLM_TIMEOUT + 5      # price may try two models in the sidecar
+
+MIN_RETAIL_CAD = 8_000         # plausible new-vehicle MSRP band for the price check
+MAX_RETAIL_CAD = 5_000_000
+CHAT_TTL = 600
+
+TRANSMISSIONS = [("AS", "automatic with select shift"), ("AM", "automated manual"),
+                 ("AV", "continuously variable"), ("A", "automatic"), ("M", "manual")]
+FUEL_TYPES = {"X": "regular gasoline", "Z": "premium gasoline", "D": "diesel", "E": "E85",
+              "N": "natural gas", "B": "electricity"}
+POWERTRAIN_NAMES = {"conventional": "Gasoline/Diesel", "phev": "Plug-in Hybrid", "bev": "Electric"}
+
+
+# ---------- Health ----------
+def _health_key(name: str) -> str:
+    return f"llm:health:{name}"
+
+
+def _probe_key(name: str) -> str:
+    return f"llm:probe:{name}"
+
+
+def _default_health() -> dict:
+    return {"calls": 0, "failures": 0, "strikes": 0, "open_until": 0.0, "tripped": False, "last_ms": None,
+            "last_error": None}
+
+
+def is_healthy(name: str) -> bool:
+    """Not in a cooldown (a tripped backend past its cooldown is healthy but only probed)."""
+    return job_cache.get(_health_key(name), _default_health())["open_until"] <= time.time()
+
+
+def may_call(name: str) -> bool:
+    """Whether this caller may use backend `name` now: it is closed, or we won its half-open probe slot."""
+    health = job_cache.get(_health_key(name), _default_health())
+    if health["open_until"] > time.time():
+        return False
+    if not health.get("tripped"):
+        return True
+    # The slot expires on its own if the prober dies mid-call.
+    return job_cache.add(_probe_key(name), os.getpid(), expire=SIDECAR_TIMEOUT)
+
+
+def report_call(name: str, ok: bool, elapsed: float, error: Optional[str] = None) -> None:
+    """Record one call's outcome; trip the backend after LLM_FAILURE_THRESHOLD consecutive strikes."""
+    with job_cache.transact():
+        health = job_cache.get(_health_key(name), _default_health())
+        health["calls"] += 1
+        health["failures"] += not ok
+        health["last_ms"] = round(elapsed * 1000)
+        if ok and elapsed <= LLM_SLOW_SECONDS:
+            health["strikes"] = 0
+            health["tripped"] = False
+        else:
+            health["strikes"] += 1
+            health["last_error"] = error or f"slow response ({elapsed:.1f}s)"
+        if health["strikes"] >= LLM_FAILURE_THRESHOLD:
+            health["open_until"] = time.time() + LLM_COOLDOWN
+            health["tripped"] = True
+            # After the cooldown the probe's one strike trips it again.
+            health["strikes"] = LLM_FAILURE_THRESHOLD - 1
+            logger.warning("llm backend %s skipped for %ss: %s", name, LLM_COOLDOWN, health["last_error"])
+        job_cache.set(_health_key(name), health)
+        job_cache.delete(_probe_key(name))
+
+
+# ---------- Price validation ----------
+def parse_price(content: str):
+    """
+    Validate a structured price answer (core.prompts.PRICE_SCHEMA) for core.routing.route.
+    Raises ValueError if unusable; returns (price_info, concern), where `concern`
+    flags a low-confidence or implausible answer worth a second opinion.
+    """
+    data = json.loads(content)
+    retail = data["retail_price_cad"]
+    used_min, used_max = data["used_min_cad"], data["used_max_cad"]
+    if not isinstance(retail, int) or retail <= 0:
+        raise ValueError(f"retail price {retail!r}")
+    if (used_min is None) != (used_max is None):
+        raise ValueError("half-open used range")
+    if used_min is not None and not 0 < used_min <= used_max:
+        raise ValueError(f"used range {used_min}–{used_max}")
+
+    concern = None
+    if data["confidence"] == "low":
+        concern = "low confidence"
+    elif not MIN_RETAIL_CAD <= retail <= MAX_RETAIL_CAD:
+        concern = f"retail price {retail:,} out of range"
+    elif used_min is not None and (used_max > retail * 1.5 or used_max > used_min * 4):
+        concern = f"used range {used_min:,}–{used_max:,} vs retail {retail:,}"
+
+    retail_label = "Retail Price (Discontinued)" if data["discontinued"] else "Retail Price"
+    used_text = (f"Used Market: ${used_min:,}–${used_max:,} CAD" if used_min is not None
+                 else "Used Market: unavailable")
+    return {"retail_text": f"{retail_label}: ${retail:,} CAD", "used_text": used_text}, concern
+
+
+# ---------- Backends ----------
+class LLMBackend(ABC):
+    """One way of answering the four page tasks. Methods raise on failure."""
+
+    name = "base"
+    monitored = True      # calls count towards health and failover
+
+    @abstractmethod
+    def summary(self, year, make: str, model: str) -> str:
+        raise NotImplementedError
+
+    @abstractmethod
+    def price(self, year, make: str, model: str) -> Dict[str, str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def kpis(self, year, make: str, model: str, price_context: str) -> dict:
+        raise NotImplementedError
+
+    @abstractmethod
+    def chat(self, messages: List[Dict[str, str]]) -> str:
+        raise NotImplementedError
+
+    def cached(self, task: str, *args):
+        """A stored answer for this task, without calling anything; None if there is none."""
+        return None
+
+
+class OpenAIBackend(LLMBackend):
+    """Chat Completions API; answers are shared across processes through `dedupe`."""
+
+    name = "openai"
+
+    def __init__(self, client, tiers=FAST_FIRST, cache_key: bool = True):
+        self.client = client
+        self.tiers = tuple(tiers)
+        self.fast_model = self.tiers[0]
+        self.cache_key = cache_key
+
+    def _complete(self, name: str, messages, temperature: float) -> str:
+        return complete(self.client, name, messages, model=self.fast_model, temperature=temperature,
+                        cache_key=self.cache_key)
+
+    def _key(self, task: str, *args) -> str:
+        return job_key(task, self.name, *args)
+
+    def cached(self, task, *args):
+        return job_cache.get(f"{self._key(task, *args)}:result")
+
+    def summary(self, year, make, model):
+        messages = SUMMARY.messages(year=year, make=make, model=model)
+        return dedupe(
+            self._key("summary", year, make, model),
+            lambda: self._complete(SUMMARY.name, messages, 0.3).strip(),
+            tag=vehicle_tag(year, make, model),
+        )
+
+    def price(self, year, make, model):
+        messages = PRICE.messages(year=year, make=make, model=model)
+        return dedupe(
+            self._key("price", year, make, model),
+            lambda: route(self.client, PRICE.name, messages, parse_price, tiers=self.tiers, temperature=0.3,
+                          response_format=PRICE_SCHEMA, cache_key=self.cache_key),
+            tag=vehicle_tag(year, make, model),
+        )
+
+    def kpis(self, year, make, model, price_context):
+        # The rating rubric lives in the shared static system prefix (core.prompts).
+        messages = KPIS.messages(year=year, make=make, model=model, price_context=price_context)
+        return dedupe(
+            self._key("kpis", year, make, model, price_context),
+            lambda: json.loads(self._complete(KPIS.name, messages, 0.3).strip()),
+            tag=vehicle_tag(year, make, model),
+        )
+
+    def chat(self, messages):
+        # Identical conversations (double clicks, retries) share one LLM call.
+        return dedupe(
+            self._key("chat", messages),
+            lambda: self._complete("chat", messages, 0.7).strip(),
+            ttl=CHAT_TTL,
+        )
+
+
+class LocalHTTPBackend(OpenAIBackend):
+    """An OpenAI-compatible server on the local network running one model; no escalation tier."""
+
+    name = "local"
+
+    def __init__(self, client, model: str = LOCAL_LLM_MODEL):
+        super().__init__(client, tiers=(model,), cache_key=False)
+
+
+class SidecarBackend(LLMBackend):
+    """
+    Calls delegated to the async sidecar (core.sidecar), which holds the upstream
+    waits on one event loop. Results are cached and deduplicated here as for OpenAI.
+    """
+
+    name = "sidecar"
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=32))
+
+    def _post(self, task: str, *args):
+        response = self.session.post(f"{self.url}/v1/{task}", json={"args": list(args)}, timeout=SIDECAR_TIMEOUT)
+        payload = response.json()
+        if response.status_code != 200:
+            raise RuntimeError(payload.get("error", f"sidecar returned {response.status_code}"))
+        return payload["result"]
+
+    def _key(self, task: str, *args) -> str:
+        return job_key(task, self.name, *args)
+
+    def cached(self, task, *args):
+        return job_cache.get(f"{self._key(task, *args)}:result")
+
+    def summary(self, year, make, model):
+        return dedupe(self._key("summary", year, make, model), lambda: self._post("summary", year, make, model),
+                      tag=vehicle_tag(year, make, model))
+
+    def price(self, year, make, model):
+        return dedupe(self._key("price", year, make, model), lambda: self._post("price", year, make, model),
+                      tag=vehicle_tag(year, make, model))
+
+    def kpis(self, year, make, model, price_context):
+        return dedupe(self._key("kpis", year, make, model, price_context),
+                      lambda: self._post("kpis", year, make, model, price_context),
+                      tag=vehicle_tag(year, make, model))
+
+    def chat(self, messages):
+        return dedupe(self._key("chat", messages), lambda: self._post("chat", messages), ttl=CHAT_TTL)
+
+
+class TemplateBackend(LLMBackend):
+    """
+    Deterministic answers from the catalog: a spec summary, and KPI scores from
+    percentiles among the vehicle's peers (same class and model year). It has no
+    price data and no reliability data, so it leaves those out rather than guess.
+    """
+
+    name = "template"
+    monitored = False
+
+    # --- Lookup
+    @staticmethod
+    def _locate(year, make, model) -> int:
+        vehicle = vehicle_registry().find_any(year, make, model)
+        return -1 if vehicle is None else vehicle.position
+
+    @staticmethod
+    def _share_beaten(values: np.ndarray, mask: np.ndarray, value: float, lower_is_better: bool):
+        """Share of peers this value beats (ties count half); None without data."""
+        peers = values[mask & np.isfinite(values)]
+        if not len(peers) or not np.isfinite(value):
+            return None
+        beaten = (peers > value) if lower_is_better else (peers < value)
+        return (beaten.sum() + 0.5 * (peers == value).sum()) / len(peers)
+
+    @staticmethod
+    def _score(share: float) -> float:
+        return round((1 + 9 * share) * 2) / 2
+
+    @staticmethod
+    def _peers(rows, position: int, same_type: bool) -> np.ndarray:
+        """Same class and model year (and powertrain), widened to every year when there are few."""
+        same_class = (rows["vehicle_class"] == rows["vehicle_class"].iat[position]).to_numpy()
+        if same_type:
+            same_class &= (rows["vehicle_type"] == rows["vehicle_type"].iat[position]).to_numpy()
+        same_year = same_class & (rows["model_year"] == rows["model_year"].iat[position]).to_numpy()
+        return same_year if same_year.sum() >= 5 else same_class
+
+    # --- Formatting
+    @staticmethod
+    def _class_label(vehicle_class) -> str:
+        """"Sport utility vehicle: Small" -> "small sport utility vehicle"."""
+        base, _, size = str(vehicle_class).partition(": ")
+        return f"{size} {base}".strip().lower()
+
+    @staticmethod
+    def _transmission(code) -> str:
+        code = str(code or "")
+        for prefix, label in TRANSMISSIONS:
+            if code.startswith(prefix):
+                gears = code[len(prefix):]
+                return f"{gears}-speed {label}" if gears.isdigit() and prefix != "AV" else label
+        return code or "unknown"
+
+    @staticmethod
+    def _engine(record: dict) -> str:
+        parts = []
+        if record.get("engine_size_(l)"):
+            parts.append(f"{record['engine_size_(l)']:.1f}L {int(record.get('cylinders') or 0)}-cylinder engine")
+        if record.get("motor_(kw)"):
+            parts.append(f"{record['motor_(kw)']:.0f} kW motor")
+        return " and ".join(parts) or "unlisted powertrain"
+
+    @staticmethod
+    def _consumption(record: dict) -> str:
+        if record["vehicle_type"] == "bev":
+            return f"{record['combined_(kwh/100_km)']} kWh/100 km ({record['combined_(le/100_km)']} Le/100 km)"
+        return f"{record['combined_(l/100_km)']} L/100 km"
+
+    # --- Tasks
+    def summary(self, year, make, model):
+        position = self._locate(year, make, model)
+        if position < 0:
+            return f"The {year} {make} {model} is not in the NRCan catalog. (AI summary unavailable.)"
+        index = similarity_index()
+        rows = index.catalog.rows
+        record = index.catalog.record(position)
+        vt = record["vehicle_type"]
+        vehicle_class = self._class_label(record["vehicle_class"])
+        transmission = self._transmission(record.get("transmission"))
+
+        if vt == "bev":
+            opening = (f"This {vehicle_class} is a battery-electric vehicle with a {self._engine(record)}, "
+                       f"{transmission} transmission and {record.get('range_(km)')} km of rated range, "
+                       f"using {self._consumption(record)} combined.")
+        elif vt == "phev":
+            opening = (f"This {vehicle_class} is a plug-in hybrid with a {self._engine(record)}: "
+                       f"{record.get('range_1_(km)')} km of electric range, then "
+                       f"{record.get('combined_(l/100_km)')} L/100 km combined on "
+                       f"{FUEL_TYPES.get(record.get('fuel_type_2'), 'gasoline')}.")
+        else:
+            opening = (f"This {vehicle_class} has a {self._engine(record)} and {transmission} transmission, "
+                       f"rated {record['city_(l/100_km)']} L/100 km city and {record['highway_(l/100_km)']} "
+                       f"highway ({record['combined_(l/100_km)']} combined) on "
+                       f"{FUEL_TYPES.get(record.get('fuel_type'), 'fuel')}.")
+
+        share = self._share_beaten(index.annual_cost, self._peers(rows, position, same_type=False),
+                                   index.annual_cost[position], lower_is_better=True)
+        running = f"It costs about ${index.annual_cost[position]:,.0f} CAD a year in energy at {DEFAULT_ANNUAL_KM:,} km"
+        if share is not None:
+            running += f", less than {share:.0%} of comparable {vehicle_class} models"
+        return f"{opening} {running}. (Generated from NRCan data; AI summary unavailable.)"
+
+    def price(self, year, make, model):
+        return {"retail_text": "Price estimate unavailable offline.", "used_text": ""}
+
+    def kpis(self, year, make, model, price_context):
+        position = self._locate(year, make, model)
+        if position < 0:
+            return {"error": "Vehicle not in catalog."}
+        index = similarity_index()
+        rows = index.catalog.rows
+        record = index.catalog.record(position)
+        vt = record["vehicle_type"]
+        year_label = f"{record['model_year']} {self._class_label(record['vehicle_class'])}"
+        scores, explanations = {}, {}
+
+        # Performance: engine displacement, or motor power for EVs, against same-powertrain peers.
+        power = index.raw["motor_kw" if vt == "bev" else "engine_size"].to_numpy()
+        share = self._share_beaten(power, self._peers(rows, position, same_type=True), power[position],
+                                   lower_is_better=False)
+        if share is not None:
+            engine = self._engine(record)
+            measure = "motor power" if vt == "bev" else "displacement"
+            scores["performance"] = self._score(share)
+            explanations["performance"] = (f"{engine[0].upper()}{engine[1:]}; more {measure} than {share:.0%} "
+                                           f"of comparable {year_label} models.")
+
+        # Value: running cost only; there is no price data offline.
+        share = self._share_beaten(index.annual_cost, self._peers(rows, position, same_type=False),
+                                   index.annual_cost[position], lower_is_better=True)
+        if share is not None:
+            scores["value"] = self._score(share)
+            explanations["value"] = (f"About ${index.annual_cost[position]:,.0f} CAD/year in energy, cheaper to run "
+                                     f"than {share:.0%} of {year_label} models; purchase price not included.")
+
+        explanations["reliability"] = "No reliability data available offline."
+
+        # Eco: CO₂ against every vehicle of the same model year.
+        if vt == "bev":
+            scores["eco"] = 10
+            explanations["eco"] = f"Zero tailpipe emissions; {self._consumption(record)}."
+        else:
+            same_year = (rows["model_year"] == record["model_year"]).to_numpy()
+            share = self._share_beaten(index.co2, same_year, index.co2[position], lower_is_better=True)
+            if share is not None:
+                scores["eco"] = self._score(share)
+                explanations["eco"] = (f"{self._consumption(record)}, {index.co2[position]:.0f} g/km CO₂; "
+                                       f"lower than {share:.0%} of {record['model_year']} vehicles.")
+        return {**scores, "explanations": explanations}
+
+    def chat(self, messages):
+        text = " ".join(m["content"] for m in messages if m["role"] == "user")
+        prefs = text_preferences(text)
+        positions = chat_candidates(text, k=5) if any(prefs.values()) else []
+        if not len(positions):
+            return ("The AI advisor is unavailable right now, but I can still search the Canadian catalog. "
+                    "Tell me the body style (SUV, sedan, pickup…), the powertrain (gas, hybrid, electric) "
+                    "or a make you like.")
+        index = similarity_index()
+        recommendations = []
+        for rank, p in enumerate(positions, start=1):
+            record = index.catalog.record(int(p))
+            vt = record["vehicle_type"]
+            recommendations.append({
+                "rank": rank,
+                "model": record["model"],
+                "manufacturer": record["make"],
+                "year": record["model_year"],
+                "category": record["vehicle_class"],
+                "fuel_type": POWERTRAIN_NAMES[vt],
+                "price_range": "N/A (offline)",
+                "seats": "-",
+                "transmission": self._transmission(record.get("transmission")),
+                "engine": self._engine(record),
+                "max_speed": "-",
+                "fuel_consumption": self._consumption(record),
+                "region_availability": ["Canada"],
+                "rationale": (f"Catalog match for your request; about ${index.annual_cost[p]:,.0f} CAD/year in energy, "
+                              f"{index.co2[p]:.0f} g/km CO₂."),
+            })
+        return json.dumps({"recommendations": recommendations})
+
+
+# ---------- Failover ----------
+class FailoverLLM:
+    """
+    Runs each task on the first healthy backend; the last backend is always tried.
+    A shed admission ticket (core.admission) skips the upstream: a stored answer
+    from any backend, else the last backend.
+    """
+
+    def __init__(self, backends: List[LLMBackend]):
+        self.backends = backends
+
+    def cached(self, task: str, *args):
+        """A stored answer from any backend but the last, without calling anything; None if there is none."""
+        for backend in self.backends[:-1]:
+            result = backend.cached(task, *args)
+            if result is not None:
+                return result
+        return None
+
+    def _shed(self, task: str, args: tuple, ticket: Ticket):
+        result = self.cached(task, *args)
+        if result is not None:
+            ticket.served[task] = "cached"
+            return result
+        ticket.served[task] = "offline"
+        return getattr(self.backends[-1], task)(*args)
+
+    def _call(self, task: str, *args, ticket: Optional[Ticket] = None):
+        if ticket is not None and not ticket.admitted:
+            return self._shed(task, args, ticket)
+        last = len(self.backends) - 1
+        for i, backend in enumerate(self.backends):
+            if i < last and backend.monitored and not may_call(backend.name):
+                continue
+            start = time.perf_counter()
+            try:
+                result = getattr(backend, task)(*args)
+            except Exception as e:
+                if i == last:
+                    raise
+                if backend.monitored:
+                    elapsed = time.perf_counter() - start
+                    report_call(backend.name, False, elapsed, f"{type(e).__name__}: {e}")
+                    record_latency(elapsed)
+                logger.warning("llm backend %s failed on %s, falling back: %s", backend.name, task, e)
+                continue
+            if backend.monitored:
+                elapsed = time.perf_counter() - start
+                report_call(backend.name, True, elapsed)
+                record_latency(elapsed)
+            return result
+
+    def summary(self, year, make: str, model: str, ticket: Optional[Ticket] = None) -> str:
+        return self._call("summary", year, make, model, ticket=ticket)
+
+    def price(self, year, make: str, model: str, ticket: Optional[Ticket] = None) -> Dict[str, str]:
+        return self._call("price", year, make, model, ticket=ticket)
+
+    def kpis(self, year, make: str, model: str, price_context: str, ticket: Optional[Ticket] = None) -> dict:
+        return self._call("kpis", year, make, model, price_context, ticket=ticket)
+
+    def chat(self, messages: List[Dict[str, str]], ticket: Optional[Ticket] = None) -> str:
+        return self._call("chat", messages, ticket=ticket)
+
+    def health_report(self) -> Dict[str, dict]:
+        report = {}
+        for backend in self.backends:
+            health = job_cache.get(_health_key(backend.name), _default_health()) if backend.monitored else {}
+            report[backend.name] = {**health, "healthy": not backend.monitored or is_healthy(backend.name)}
+        return report
+
+
+def build_backends() -> List[LLMBackend]:
+    try:
+        from openai import OpenAI
+    except ImportError:
+        OpenAI = None
+
+    backends = []
+    for name in [n.strip() for n in LLM_BACKENDS.split(",") if n.strip()]:
+        if name == "sidecar" and LLM_SIDECAR_URL:
+            backends.append(SidecarBackend(LLM_SIDECAR_URL))
+        elif OpenAI is None:
+            continue
+        elif name == "openai" and os.getenv("OPENAI_API_KEY"):
+            client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT, max_retries=1)
+            backends.append(OpenAIBackend(client))
+        elif name == "local" and LOCAL_LLM_URL:
+            client = OpenAI(base_url=LOCAL_LLM_URL, api_key=os.getenv("LOCAL_LLM_API_KEY", "local"),
+                            timeout=LLM_TIMEOUT, max_retries=0)
+            backends.append(LocalHTTPBackend(client))
+    backends.append(TemplateBackend())
+    return backends
+
+
+_llm: Optional[FailoverLLM] = None
+
+
+def llm() -> FailoverLLM:
+    """The process-wide backend chain, built from the environment on first use."""
+    global _llm
+    if _llm is None:
+        _llm = FailoverLLM(build_backends())
+    return _llm
@@ -0,0 +1,215 @@
+"""
+Memoized Dash callbacks: identical inputs over the same dataset skip the work.
+
+Dropdown options, the Industry Leaders cards and the Market Analysis charts are
+pure functions of their inputs and states over data that only changes on a
+refresh. `memoized_callback` registers a callback like `dash.callback` and
+caches its outputs:
+
+    key       sha256 of the callback name, its inputs and states, the dataset
+              version (`last_updated()`) and a fingerprint of the app code
+    memory    per-process LRU of decoded outputs (MEMO_LRU_SIZE entries);
+              a hit returns them without building any component
+    shared    diskcache directory (SQLite index) that every gunicorn worker
+              reads, so a result computed by one worker serves the others
+              and survives restarts (MEMO_CACHE_DIR, MEMO_SIZE_LIMIT bytes)
+
+Outputs are stored as Plotly JSON, i.e. what Dash would send anyway.
+Results carrying `no_update` or a `Patch` are returned but not cached, and
+neither is a raised `PreventUpdate`.
+
+A new dataset version changes every key. The first call that sees it also
+empties the process LRU and evicts the previous version's shared entries
+(they are tagged with it). Editing code under core/ or pages/ changes the
+fingerprint, so a deploy never serves results rendered by the old code.
+
+Hits (memory and shared), misses and compute time per callback are counted
+in process and folded into the job cache every few seconds;
+`GET /metrics/memo` reports them for all workers.
+"""
+
+import functools
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import diskcache
+from dash import Patch, callback
+from dash._callback import NoUpdate
+from plotly.utils import PlotlyJSONEncoder
+
+from core.data import BASE_DIR, last_updated
+from core.jobs import job_cache
+
+logger = logging.getLogger(__name__)
+
+# ---------- Config ----------
+MEMO_CACHE_DIR = os.environ.get("MEMO_CACHE_DIR", os.path.join(BASE_DIR, ".cache", "memo"))
+MEMO_LRU_SIZE = int(os.environ.get("MEMO_LRU_SIZE", 512))                     # entries per process
+MEMO_SIZE_LIMIT = int(os.environ.get("MEMO_SIZE_LIMIT", 256 * 1024 ** 2))     # bytes on disk
+MEMO_FLUSH_INTERVAL = float(os.environ.get("MEMO_FLUSH_INTERVAL", 5))         # seconds between stats flushes
+
+STATS_KEY = "memo:stats"
+COUNTERS = ("memory_hits", "shared_hits", "misses", "uncached", "compute_s")
+
+memo_cache = diskcache.Cache(MEMO_CACHE_DIR, size_limit=MEMO_SIZE_LIMIT, tag_index=True)
+
+
+def _code_fingerprint() -> str:
+    # mtime and size of every module the callbacks can reach; cheap to compute once per process.
+    h = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(BASE_DIR, "core", "*.py")) +
+                       glob.glob(os.path.join(BASE_DIR, "pages", "*.py"))):
+        stat = os.stat(path)
+        h.update(f"{os.path.basename(path)}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+CODE_FINGERPRINT = _code_fingerprint()
+
+
+# ---------- Process LRU ----------
+_lock = threading.Lock()
+_memory: "OrderedDict[str, object]" = OrderedDict()
+_version = {"current": None}
+
+
+def _dataset_version() -> str:
+    """Current version; on a change, drop everything cached for the previous one."""
+    version = last_updated()
+    previous = _version["current"]
+    if version != previous:
+        with _lock:
+            if _version["current"] == previous:
+                _memory.clear()
+                _version["current"] = version
+        if previous is not None:
+            evicted = memo_cache.evict(f"version:{previous}")
+            logger.info("dataset version changed; evicted %d memoized outputs", evicted)
+    return version
+
+
+def _memory_get(key: str):
+    with _lock:
+        if key in _memory:
+            _memory.move_to_end(key)
+            return True, _memory[key]
+    return False, None
+
+
+def _memory_put(key: str, value) -> None:
+    with _lock:
+        _memory[key] = value
+        _memory.move_to_end(key)
+        while len(_memory) > MEMO_LRU_SIZE:
+            _memory.popitem(last=False)
+
+
+# ---------- Stats ----------
+_stats: dict = {}
+_flushed = {"at": time.monotonic()}
+
+
+def _count(name: str, **amounts) -> None:
+    with _lock:
+        row = _stats.setdefault(name, dict.fromkeys(COUNTERS, 0))
+        for counter, amount in amounts.items():
+            row[counter] += amount
+        due = time.monotonic() - _flushed["at"] >= MEMO_FLUSH_INTERVAL
+    if due:
+        _flush()
+
+
+def _flush() -> None:
+    with _lock:
+        pending = {name: dict(row) for name, row in _stats.items()}
+        _stats.clear()
+        _flushed["at"] = time.monotonic()
+    if not pending:
+        return
+    with job_cache.transact():
+        totals = job_cache.get(STATS_KEY, {})
+        for name, row in pending.items():
+            total = totals.setdefault(name, dict.fromkeys(COUNTERS, 0))
+            for counter, amount in row.items():
+                total[counter] += amount
+        job_cache.set(STATS_KEY, totals)
+
+
+def memo_report() -> dict:
+    """Per callback: hits by layer, misses, hit rate and mean compute time, across all workers."""
+    _flush()
+    report = {}
+    for name, row in sorted(job_cache.get(STATS_KEY, {}).items()):
+        hits = row["memory_hits"] + row["shared_hits"]
+        calls = hits + row["misses"] + row["uncached"]
+        computed = row["misses"] + row["uncached"]
+        report[name] = {
+            "calls": calls,
+            "memory_hits": row["memory_hits"],
+            "shared_hits": row["shared_hits"],
+            "misses": row["misses"],
+            "uncached": row["uncached"],
+            "hit_rate": round(hits / calls, 3) if calls else None,
+            "compute_ms_mean": round(1000 * row["compute_s"] / computed, 2) if computed else None,
+        }
+    return {"callbacks": report, "lru_size": len(_memory), "lru_max": MEMO_LRU_SIZE,
+            "shared_entries": len(memo_cache), "shared_bytes": memo_cache.volume(),
+            "dataset_version": _version["current"], "code": CODE_FINGERPRINT}
+
+
+# ---------- Decorator ----------
+def _cacheable(result) -> bool:
+    outputs = result if isinstance(result, (list, tuple)) else [result]
+    return not any(isinstance(o, (NoUpdate, Patch)) for o in outputs)
+
+
+def memoized_callback(*args, **kwargs):
+    """`dash.callback` for a pure function of its inputs and states; see the module docstring."""
+
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*values):
+            version = _dataset_version()
+            raw = json.dumps([name, version, CODE_FINGERPRINT, values], sort_keys=True, default=str)
+            key = f"memo:{hashlib.sha256(raw.encode('utf-8')).hexdigest()}"
+
+            found, value = _memory_get(key)
+            if found:
+                _count(name, memory_hits=1)
+                return value
+            stored = memo_cache.get(key)
+            if stored is not None:
+                value = json.loads(stored)
+                _memory_put(key, value)
+                _count(name, shared_hits=1)
+                return value
+
+            start = time.perf_counter()
+            result = fn(*values)
+            elapsed = time.perf_counter() - start
+            if not _cacheable(result):
+                _count(name, uncached=1, compute_s=elapsed)
+                return result
+            try:
+                encoded = json.dumps(result, cls=PlotlyJSONEncoder)
+            except TypeError:
+                logger.warning("%s returned an output that cannot be serialized; not memoized", name)
+                _count(name, uncached=1, compute_s=elapsed)
+                return result
+            memo_cache.set(key, encoded, tag=f"version:{version}")
+            _memory_put(key, json.loads(encoded))
+            _count(name, misses=1, compute_s=elapsed)
+            return result
+
+        callback(*args, **kwargs)(wrapper)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,209 @@
+"""
+Opt-in memory instrumentation for finding slow growth in long-running workers.
+
+With MEMORY_TRACKING=1, `install` starts tracemalloc and hooks every Flask
+request (each Dash callback is a POST to /_dash-update-component, named
+here by its output, e.g. "callback:chat-history.children"). Per endpoint it
+records
+
+    peak        highest traced allocation above the request's starting point
+    retained    traced memory still held when the request ended
+    sites       for one request in MEMORY_SNAPSHOT_EVERY, a tracemalloc
+                snapshot before and after, diffed by source line; the
+                growth per line is summed across sampled requests
+
+`GET /debug/memory` reports them with the process RSS, the top allocation
+sites right now, and the growth per site since the worker served its first
+request (the leak view). Everything is per process. Unmatched routes share
+one "404" entry, and callback outputs the app does not define one
+"callback:unknown" entry, so clients cannot grow the table.
+
+tracemalloc's peak and traced total are process-wide, and gunicorn runs
+GUNICORN_THREADS (default 16) threads per worker. So peak, retained and
+sites count only requests that ran alone; ones that overlapped another
+request are counted as `overlapped` and left out. Run the worker with
+GUNICORN_THREADS=1 for every request to count. Background callbacks (Car
+Search Generate, the chat) run in job processes (core.jobs) and are not
+traced; their POST only starts or polls the job.
+
+Tracing slows allocations down noticeably; keep it off in normal serving.
+Bounding memory does not depend on it: gunicorn.conf.py recycles a worker
+whose RSS (`rss_bytes`) passes WORKER_MAX_RSS_MB.
+"""
+
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Optional
+
+from flask import Blueprint, g, jsonify, request
+
+# ---------- Config ----------
+MEMORY_TRACKING = os.environ.get("MEMORY_TRACKING", "0") == "1"
+MEMORY_TRACE_FRAMES = int(os.environ.get("MEMORY_TRACE_FRAMES", 1))      # frames kept per allocation
+MEMORY_SNAPSHOT_EVERY = int(os.environ.get("MEMORY_SNAPSHOT_EVERY", 20))  # diff one request in N per endpoint
+TOP_SITES = 25
+MB = 1024 ** 2
+
+# Allocations made by the tracing itself.
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process now (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+# ---------- Per-endpoint stats ----------
+_lock = threading.Lock()
+_endpoints: dict = {}
+_active: dict = {}          # in-flight request id -> overlapped another request
+_dash_app = None            # its callback_map names the known callbacks
+_baseline = {"snapshot": None, "at": None}
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+
+def _site(stat) -> str:
+    frame = stat.traceback[0]
+    return f"{frame.filename}:{frame.lineno}"
+
+
+def endpoint_name() -> str:
+    """Stats key for this request; only names the app defines, so clients cannot add keys."""
+    if request.path == "/_dash-update-component":
+        body = request.get_json(silent=True) or {}
+        output = body.get("output")
+        if isinstance(output, str) and _dash_app is not None and output in _dash_app.callback_map:
+            return f"callback:{output[:120]}"
+        return "callback:unknown"
+    if request.url_rule is None:
+        return "404"
+    return f"{request.method} {request.url_rule.rule}"
+
+
+def _before_request():
+    if _baseline["snapshot"] is None:
+        with _lock:
+            if _baseline["snapshot"] is None:
+                _baseline["snapshot"], _baseline["at"] = _snapshot(), time.time()
+    name = endpoint_name()
+    token = object()
+    with _lock:
+        stats = _endpoints.setdefault(name, {"requests": 0, "measured": 0, "overlapped": 0, "peak_max": 0,
+                                             "peak_sum": 0, "retained_sum": 0, "sampled": 0, "sites": Counter()})
+        stats["requests"] += 1
+        sampled = stats["requests"] % MEMORY_SNAPSHOT_EVERY == 1 or MEMORY_SNAPSHOT_EVERY == 1
+        alone = not _active
+        for other in _active:
+            _active[other] = True
+        _active[token] = not alone
+        # Resetting the process-wide peak would spoil a request already in flight.
+        if alone:
+            tracemalloc.reset_peak()
+    g.memory = {"name": name, "token": token, "start": tracemalloc.get_traced_memory()[0],
+                "snapshot": _snapshot() if sampled and alone else None}
+
+
+def _teardown_request(_exc):
+    state = g.pop("memory", None)
+    if state is None:
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    with _lock:
+        overlapped = _active.pop(state["token"])
+    diff = []
+    if state["snapshot"] is not None and not overlapped:
+        diff = _snapshot().compare_to(state["snapshot"], "lineno")
+    with _lock:
+        stats = _endpoints[state["name"]]
+        if overlapped:
+            stats["overlapped"] += 1
+            return
+        stats["measured"] += 1
+        stats["peak_max"] = max(stats["peak_max"], peak - state["start"])
+        stats["peak_sum"] += peak - state["start"]
+        stats["retained_sum"] += current - state["start"]
+        if diff:
+            stats["sampled"] += 1
+            for stat in diff:
+                if stat.size_diff:
+                    stats["sites"][_site(stat)] += stat.size_diff
+
+
+def memory_report(limit: int = TOP_SITES) -> dict:
+    current, peak = tracemalloc.get_traced_memory()
+    report = {"pid": os.getpid(), "rss_mb": round(rss_bytes() / MB, 1), "tracking": tracemalloc.is_tracing(),
+              "traced_mb": round(current / MB, 1), "traced_peak_mb": round(peak / MB, 1)}
+    if not tracemalloc.is_tracing():
+        return report
+
+    snapshot = _snapshot()
+    report["top_sites"] = [{"site": _site(s), "mb": round(s.size / MB, 2), "blocks": s.count}
+                           for s in snapshot.statistics("lineno")[:limit]]
+    if _baseline["snapshot"] is not None:
+        growth = snapshot.compare_to(_baseline["snapshot"], "lineno")
+        report["growth_since"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(_baseline["at"]))
+        report["growth_sites"] = [{"site": _site(s), "mb": round(s.size_diff / MB, 3), "blocks": s.count_diff}
+                                  for s in growth[:limit] if s.size_diff > 0]
+
+    endpoints = []
+    with _lock:
+        for name, stats in _endpoints.items():
+            n = stats["measured"]
+            endpoints.append({
+                "endpoint": name,
+                "requests": stats["requests"],
+                "measured": n,
+                "overlapped": stats["overlapped"],
+                "peak_kb_max": round(stats["peak_max"] / 1024, 1),
+                "peak_kb_mean": round(stats["peak_sum"] / n / 1024, 1) if n else 0.0,
+                "retained_kb_total": round(stats["retained_sum"] / 1024, 1),
+                "sampled": stats["sampled"],
+                "sites": [{"site": site, "kb": round(size / 1024, 1)}
+                          for site, size in stats["sites"].most_common(5)],
+            })
+    report["endpoints"] = sorted(endpoints, key=lambda e: e["retained_kb_total"], reverse=True)
+    return report
+
+
+# ---------- Wiring ----------
+memory_debug = Blueprint("memory_debug", __name__)
+
+
+@memory_debug.route("/debug/memory")
+def debug_memory():
+    """Allocation sites and per-endpoint peaks for this worker (MEMORY_TRACKING=1 only)."""
+    limit = request.args.get("limit", TOP_SITES, type=int)
+    return jsonify(memory_report(max(1, min(limit, 200))))
+
+
+def install(app, enabled: Optional[bool] = None) -> bool:
+    """Start tracing and register the request hooks and debug route on the Dash `app`'s server when tracking is on."""
+    global _dash_app
+    if not (MEMORY_TRACKING if enabled is None else enabled):
+        return False
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(MEMORY_TRACE_FRAMES)
+    _dash_app = app
+    server = app.server
+    server.before_request(_before_request)
+    server.teardown_request(_teardown_request)
+    server.register_blueprint(memory_debug)
+    return True
@@ -0,0 +1,238 @@
+"""
+Prompt templates for every LLM call, laid out for provider-side prefix caching.
+
+Every template puts its static instructions first, in a system message that
+is byte-identical across calls, and the variable vehicle or user data last:
+
+    [system]  KPIS_SYSTEM         static, one per task
+    [user]    vehicle details + price context
+
+OpenAI caches a prompt prefix only from 1,024 tokens, and only per model. So
+the Car Search prompts are kept as short as their task allows, and each task
+has its own system message. The summary and KPI calls share gpt-4o-mini, but
+both prompts are under the threshold, so a shared prefix would only add
+tokens. The price call starts on gpt-4o-mini and escalates to gpt-4o
+(core.routing), which could not reuse a mini cache anyway. The Find Your Car
+chat keeps CHAT_SYSTEM first and appends turns (and the retrieved catalog
+candidates) after it; long conversations pass the threshold and hit the cache.
+
+`complete` sends a rendered prompt and records the `usage` block of every
+response per template. `usage_report()` gives the cached-token ratio per
+prompt; it is served at /metrics/llm.
+"""
+
+import asyncio
+import hashlib
+from typing import Dict, List
+
+from core.jobs import job_cache
+
+SUMMARY_SYSTEM = """
+You are an automotive advisor for Canadian buyers. Act like a car nerd.
+In 2–3 sentences, summarize the vehicle in the user message focusing on the general public view, performance,
+reliability, and everyday usability — what it's good for and what it's not ideal for.
+Keep it neutral, concise, and friendly.
+""".strip()
+
+PRICE_SYSTEM = """
+You are an automotive market analyst. Estimate Canadian prices (CAD) for the vehicle in the user message:
+- retail_price_cad: MSRP of the base trim; the last MSRP if it is no longer sold new
+- discontinued: true if the vehicle is no longer sold new
+- used_min_cad, used_max_cad: a reasonable used market range based on typical Canadian listings,
+  condition, and mileage; null for both if too new or unavailable second-hand
+- confidence: "low" if you are unsure about this exact model and year, otherwise "medium" or "high"
+""".strip()
+
+KPIS_SYSTEM = """
+You are an automotive expert. Rate the vehicle in the user message on a 1–10 scale (can be float like 8.5, 9.5, 4.5) for:
+- Performance (acceleration, handling, top speed)
+- Value for Money (price vs quality, efficiency, features); use the price context given
+- Reliability (mechanical dependability, repair frequency, maintenance cost)
+- Eco-Friendliness (fuel economy AND CO₂ emissions)
+
+Interpretation guide:
+7 = average for its class, 8–9 = excellent, 10 = exceptional or class-leading,
+5–6 = below average, 1–4 = poor. Be realistic and fair — do not exaggerate.
+
+Performance:
+10 → supercar / hypercar (0–100 km/h under 3.0s, top speed >300 km/h)
+8–9 → high-performance sports cars (0–100 km/h 3.5–4.0s)
+7 → sporty or strong performance
+5–6 → typical everyday vehicle
+1–4 → slow or underpowered.
+
+Reliability:
+10 → extremely dependable (e.g., Toyota, Lexus, Volvo)
+7–8 → good reliability with minor or infrequent issues (e.g., premium or exotic cars like Porsche,
+Lamborghini — high build quality but costly parts)
+5–6 → average reliability
+1–4 → poor reliability or frequent major repairs.
+
+Eco-Friendliness:
+10 → zero tailpipe emissions (EV)
+7–9 → hybrids and very efficient gas vehicles
+5–6 → moderate fuel use (around 8–10 L/100 km)
+1–4 → inefficient or high CO₂ vehicles (>12 L/100 km or >250 g/km CO₂).
+
+Always include numeric details in explanations where possible: engine size (L), cylinder count,
+horsepower, 0–100 km/h acceleration, top speed, fuel economy (L/100 km or mpg), and CO₂ emissions (g/km).
+If exact data isn't available, estimate realistically based on vehicle type and class.
+
+Keep explanations short (one sentence, two at most), factual, and neutral — no marketing tone.
+
+Return only a valid JSON object. Example:
+{"performance": 10, "value": 6, "reliability": 7, "eco": 3,
+ "explanations": {"performance": "5.2L V10, 0–100 km/h in 2.9s, top 310 km/h.",
+                  "value": "Very expensive but extreme performance.",
+                  "reliability": "High-quality engineering but costly servicing.",
+                  "eco": "13.5 L/100 km, 320 g/km CO₂."}}
+""".strip()
+
+CHAT_SYSTEM = """
+You are CarAdvisor — a specialized automotive consultant who helps users choose, compare, and inspect cars for purchase in a natural multi-turn chat.
+
+You must:
+1. Extract and remember user preferences (seats, performance, use case, price, fuel type, brand, drive type, transmission, range, maintenance, cargo space, climate).
+2. If any information is missing, ask the most relevant 1–2 clarifying questions.
+3. When ready, provide EXACTLY 5 recommendations in this JSON format:
+
+{
+  "recommendations": [
+    {
+      "rank": 1,
+      "model": "Toyota RAV4 Hybrid",
+      "manufacturer": "Toyota",
+      "year": 2025,
+      "category": "SUV",
+      "fuel_type": "Hybrid Gasoline",
+      "price_range": "Used: $25,000–$35,000 | New: $38,000–$45,000",
+      "seats": 5,
+      "transmission": "Automatic",
+      "engine": "2.5L I4 Hybrid",
+      "max_speed": "180 km/h",
+      "fuel_consumption": "5.8 L/100 km",
+      "region_availability": ["North America", "Europe", "Asia"],
+      "rationale": "Reliable, efficient family SUV ideal for city and long-range travel."
+    },
+    ...
+  ]
+}
+
+Guidelines:
+- Always include `price_range`, `seats`, `transmission`, `engine`, `max_speed`, and `fuel_consumption` (or electric consumption if EV).
+- Be realistic and concise. You may estimate reasonable ranges if unknown.
+- If comparing multiple cars, use short comparison summaries.
+- If unclear about user intent, ask follow-up questions before listing.
+- A system note after the conversation may list real vehicles from the Canadian catalog that match the request; prefer those.
+
+Tone: friendly, expert, and professional.
+""".strip()
+
+
+class PromptTemplate:
+    """A static system prefix plus a user message holding the variable data, rendered last."""
+
+    def __init__(self, name: str, system: str, user: str):
+        self.name = name
+        self.system = system
+        self.user = user
+
+    def messages(self, **values) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.user.format(**values)},
+        ]
+
+
+PRICE_SCHEMA = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "vehicle_price",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "retail_price_cad": {"type": "integer"},
+                "discontinued": {"type": "boolean"},
+                "used_min_cad": {"type": ["integer", "null"]},
+                "used_max_cad": {"type": ["integer", "null"]},
+                "confidence": {"type": "string", "enum": ["low", "medium", "high"]},
+            },
+            "required": ["retail_price_cad", "discontinued", "used_min_cad", "used_max_cad", "confidence"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+SUMMARY = PromptTemplate("summary", SUMMARY_SYSTEM, "Vehicle: {year} {make} {model}")
+PRICE = PromptTemplate("price", PRICE_SYSTEM, "Vehicle: {year} {make} {model}")
+KPIS = PromptTemplate("kpis", KPIS_SYSTEM, "Vehicle: {year} {make} {model}\nPrice context: {price_context}")
+
+
+# ---------- Usage tracking ----------
+# LLM calls run in background job processes, so totals live in the shared job cache.
+USAGE_KEY = "metrics:llm:usage"
+
+
+def record_usage(name: str, usage) -> None:
+    """Accumulate one response's token usage (including cached prompt tokens) under `name`."""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    with job_cache.transact():
+        totals = job_cache.get(USAGE_KEY, {})
+        entry = totals.setdefault(name, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0})
+        entry["calls"] += 1
+        entry["prompt_tokens"] += usage.prompt_tokens or 0
+        entry["cached_tokens"] += cached
+        entry["completion_tokens"] += usage.completion_tokens or 0
+        job_cache.set(USAGE_KEY, totals)
+
+
+def usage_report() -> Dict[str, dict]:
+    """Per-prompt token totals across all workers, with the share of prompt tokens served from cache."""
+    report = job_cache.get(USAGE_KEY, {})
+    for entry in report.values():
+        entry["cache_ratio"] = round(entry["cached_tokens"] / entry["prompt_tokens"], 3) if entry["prompt_tokens"] else 0.0
+    return report
+
+
+def prefix_cache_key(messages: List[Dict[str, str]]) -> str:
+    """Routing hint for the provider cache: calls sharing a system prefix share a key."""
+    return "carwise-" + hashlib.sha1(messages[0]["content"].encode("utf-8")).hexdigest()[:12]
+
+
+def create(client, name: str, messages: List[Dict[str, str]], model: str, temperature: float,
+           cache_key: bool = True, **kwargs):
+    """
+    One chat completion response; its usage is recorded under `name`.
+    `cache_key=False` omits `prompt_cache_key` for OpenAI-compatible servers that reject it.
+    """
+    if cache_key:
+        kwargs["prompt_cache_key"] = prefix_cache_key(messages)
+    response = client.chat.completions.create(model=model, messages=messages, temperature=temperature, **kwargs)
+    record_usage(name, response.usage)
+    return response
+
+
+def complete(client, name: str, messages: List[Dict[str, str]], model: str, temperature: float, **kwargs) -> str:
+    """Like `create`, returning only the message text."""
+    return create(client, name, messages, model, temperature, **kwargs).choices[0].message.content
+
+
+async def acreate(client, name: str, messages: List[Dict[str, str]], model: str, temperature: float,
+                  cache_key: bool = True, **kwargs):
+    """`create` for an `AsyncOpenAI` client; the usage write runs off the event loop."""
+    if cache_key:
+        kwargs["prompt_cache_key"] = prefix_cache_key(messages)
+    response = await client.chat.completions.create(model=model, messages=messages, temperature=temperature,
+                                                    **kwargs)
+    await asyncio.to_thread(record_usage, name, response.usage)
+    return response
+
+
+async def acomplete(client, name: str, messages: List[Dict[str, str]], model: str, temperature: float,
+                    **kwargs) -> str:
+    """Like `acreate`, returning only the message text."""
+    return (await acreate(client, name, messages, model, temperature, **kwargs)).choices[0].message.content
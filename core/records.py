@@ -0,0 +1,140 @@
+"""
+Compact records for per-request rendering.
+
+Callbacks used to pull one vehicle at a time out of pandas (boolean masks,
+`.iloc[0]`, `iterrows`), which allocates a Series or frame per lookup. Here
+every catalog vehicle becomes one `Vehicle` NamedTuple, built once from the
+catalog's column arrays, and `VehicleRegistry` finds it by vehicle key, by
+`_id` or by the Car Search selection with a dict lookup. A fetch allocates
+nothing; the tuples share their values with the registry.
+
+`Award` does the same for Industry Leaders rows, which used to go through
+`groupby` + `iterrows` on every year change.
+
+`scripts/record_benchmark.py` measures the per-callback latency and allocations.
+"""
+
+import threading
+from typing import Dict, List, NamedTuple, Optional
+
+import pandas as pd
+
+from core.catalog import CatalogIndex, catalog_index
+from core.data import VEHICLE_TYPES
+from core.similar import similarity_index
+
+
+class Vehicle(NamedTuple):
+    """One catalog vehicle. `position` is its row in `core.catalog` / `core.similar` arrays."""
+
+    position: int
+    key: int
+    vehicle_type: str
+    nrcan_id: int
+    year: int
+    make: str
+    model: str
+    vehicle_class: str
+    display_name: str
+    unit: str                   # "L" or "kWh", what city/highway are measured in
+    city: float                 # L or kWh per 100 km
+    highway: float
+    consumption: float          # combined, L/100 km or Le/100 km
+    energy: float               # combined kWh per 100 km, comparable across powertrains
+    co2: float                  # g/km
+    engine_size: float          # L; NaN for BEVs
+    cylinders: float
+    motor_kw: float             # NaN for conventional
+    electric_range: float       # km; NaN for conventional
+    annual_cost: float          # CAD/year at the default prices and distance
+
+
+# `core.vehicle_table` columns behind each `Vehicle` field after `position` (annual_cost comes from core.similar).
+TABLE_FIELDS = ["vehicle_key", "vehicle_type", "_id", "model_year", "make", "model", "vehicle_class", "display_name",
+                "energy_unit", "city", "highway", "consumption", "energy_combined", "co2", "engine_size", "cylinders",
+                "motor_kw", "electric_range"]
+
+
+class VehicleRegistry:
+    """All catalog vehicles as `Vehicle` tuples, with dict indexes for O(1) lookups."""
+
+    def __init__(self, catalog: CatalogIndex):
+        self.catalog = catalog
+        rows = catalog.rows
+        columns = [range(len(rows))]
+        columns += [rows[column].tolist() for column in TABLE_FIELDS]
+        columns.append(similarity_index().annual_cost.tolist())
+        self.vehicles: List[Vehicle] = list(map(Vehicle._make, zip(*columns)))
+
+        self._by_key: Dict[int, Vehicle] = {v.key: v for v in self.vehicles}
+        self._by_selection: Dict[tuple, Vehicle] = {}
+        self._by_id: Dict[int, List[Vehicle]] = {}
+        for v in self.vehicles:
+            # First row wins, as with the dataset filters it replaces.
+            self._by_selection.setdefault((v.vehicle_type, v.year, v.make, v.model), v)
+            self._by_id.setdefault(v.nrcan_id, []).append(v)
+
+    def __len__(self) -> int:
+        return len(self.vehicles)
+
+    def at(self, position: int) -> Vehicle:
+        return self.vehicles[position]
+
+    def get(self, key: int) -> Optional[Vehicle]:
+        return self._by_key.get(key)
+
+    def find(self, vehicle_type: str, year, make: str, model: str) -> Optional[Vehicle]:
+        """The vehicle for one Car Search selection (first matching row), or None."""
+        try:
+            return self._by_selection.get((vehicle_type, int(year), make, model))
+        except (TypeError, ValueError):
+            return None
+
+    def find_any(self, year, make: str, model: str) -> Optional[Vehicle]:
+        """Like `find`, trying each dataset in order."""
+        for vehicle_type in VEHICLE_TYPES:
+            vehicle = self.find(vehicle_type, year, make, model)
+            if vehicle is not None:
+                return vehicle
+        return None
+
+    def by_id(self, nrcan_id: int, year: Optional[int] = None) -> List[Vehicle]:
+        """Every vehicle sharing an NRCan `_id` (it repeats across model years and datasets)."""
+        vehicles = self._by_id.get(nrcan_id, [])
+        return vehicles if year is None else [v for v in vehicles if v.year == year]
+
+
+_registry_lock = threading.Lock()
+_registry: Optional[VehicleRegistry] = None
+
+
+def vehicle_registry() -> VehicleRegistry:
+    """The registry for the current catalog; rebuilt after a data refresh drops the catalog."""
+    global _registry
+    catalog = catalog_index()
+    with _registry_lock:
+        if _registry is None or _registry.catalog is not catalog:
+            _registry = VehicleRegistry(catalog)
+        return _registry
+
+
+# ---------- Industry Leaders ----------
+class Award(NamedTuple):
+    year: int
+    category: str
+    rank: int
+    model: str
+    manufacturer: str
+    source: str                 # "" when unknown
+    rationale: str
+
+
+def awards_from_frame(rankings: pd.DataFrame) -> List[Award]:
+    """Award rows in file order, with missing text as ""."""
+    frame = rankings[list(Award._fields)].copy()
+    for column in ("source", "rationale", "model", "manufacturer", "category"):
+        frame[column] = frame[column].fillna("").astype(str)
+    frame["year"] = frame["year"].astype("int64")
+    frame["rank"] = frame["rank"].astype("int64")
+    return list(map(Award._make, frame.itertuples(index=False, name=None)))
+
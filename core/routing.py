@@ -0,0 +1,169 @@
+"""
+Model routing: try the fast model first, escalate to a larger one only when needed.
+
+A routed call walks a list of model tiers. Each answer goes through the
+caller's `parse` function, which either
+
+  * raises ValueError      -> the answer is unusable (bad JSON, missing fields),
+  * returns (result, None) -> accepted,
+  * returns (result, why)  -> usable but doubtful (low confidence, odd numbers).
+
+Unusable or doubtful answers, and API errors, escalate to the next tier. The
+last tier's doubtful answer is still accepted. If a later tier fails, the
+first doubtful answer is returned instead, since a doubtful answer beats no
+answer. Only if no tier gives a usable answer is the last error raised.
+
+Every routed request is logged (models tried, escalation reason, latency,
+cost) and summarised per prompt in `routing_report()`, served at /metrics/llm.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from core.jobs import job_cache
+from core.prompts import acreate, create
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+}
+FAST_FIRST = ("gpt-4o-mini", "gpt-4o")
+LATENCY_WINDOW = 500      # recent requests kept per prompt for latency percentiles
+
+
+def request_cost(model: str, usage) -> float:
+    """USD cost of one response from its `usage` block (cached prompt tokens at the discounted rate)."""
+    if usage is None or model not in MODEL_PRICES:
+        return 0.0
+    price_in, price_cached, price_out = MODEL_PRICES[model]
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", 0) or 0
+    prompt = usage.prompt_tokens or 0
+    completion = usage.completion_tokens or 0
+    return ((prompt - cached) * price_in + cached * price_cached + completion * price_out) / 1e6
+
+
+# ---------- Stats ----------
+# Routed calls run in background job processes, so stats live in the shared job cache.
+ROUTING_KEY = "metrics:llm:routing"
+
+
+def _record(name: str, attempts: List[dict], latency: float, cost: float, answered_by: Optional[str]) -> None:
+    with job_cache.transact():
+        stats = job_cache.get(ROUTING_KEY, {})
+        entry = stats.setdefault(name, {
+            "requests": 0, "escalations": 0, "failures": 0, "cost_usd": 0.0, "answered_by": {}, "latencies": [],
+        })
+        entry["requests"] += 1
+        entry["escalations"] += len(attempts) > 1
+        entry["failures"] += answered_by is None
+        entry["cost_usd"] += cost
+        entry["latencies"] = (entry["latencies"] + [latency])[-LATENCY_WINDOW:]
+        if answered_by is not None:
+            entry["answered_by"][answered_by] = entry["answered_by"].get(answered_by, 0) + 1
+        job_cache.set(ROUTING_KEY, stats)
+
+
+def routing_report() -> Dict[str, dict]:
+    """Per-prompt routing totals across all workers: escalation rate, cost and latency percentiles."""
+    report = {}
+    for name, entry in job_cache.get(ROUTING_KEY, {}).items():
+        latencies = entry["latencies"]
+        p50, p95 = np.percentile(latencies, [50, 95]) if latencies else (0.0, 0.0)
+        report[name] = {
+            "requests": entry["requests"],
+            "escalations": entry["escalations"],
+            "escalation_rate": round(entry["escalations"] / entry["requests"], 3),
+            "failures": entry["failures"],
+            "answered_by": entry["answered_by"],
+            "cost_usd": round(entry["cost_usd"], 6),
+            "latency_ms_p50": round(float(p50) * 1000, 1),
+            "latency_ms_p95": round(float(p95) * 1000, 1),
+        }
+    return report
+
+
+# ---------- Routing ----------
+def _try(model: str, response, parse: Callable, attempt: dict):
+    """(result, concern) for one tier's response; records its cost on `attempt`."""
+    attempt["cost"] = request_cost(model, response.usage)
+    return parse(response.choices[0].message.content)
+
+
+def _finish(name: str, attempts: List[dict], start: float, accepted, last_error, fallback: Optional[tuple]):
+    """Record and log one routed request; `fallback` is (model, result) of the first doubtful answer."""
+    latency = time.perf_counter() - start
+    cost = sum(a["cost"] for a in attempts)
+    answered_by = attempts[-1]["model"] if accepted is not None else None
+    if accepted is None and fallback is not None:
+        answered_by, accepted = fallback
+        logger.warning("llm route %s: escalation failed, using the doubtful %s answer", name, answered_by)
+    ok = accepted is not None
+    _record(name, attempts, latency, cost, answered_by)
+    logger.info(
+        "llm route %s: %s%s latency=%.0fms cost=$%.5f",
+        name,
+        " -> ".join(f"{a['model']}({a['ms']}ms)" for a in attempts),
+        "".join(f" [{a['model']}: {a['reason']}]" for a in attempts if a["reason"]),
+        latency * 1000, cost,
+    )
+    if not ok:
+        raise last_error or ValueError(f"No model produced a usable {name} answer.")
+    return accepted
+
+
+def route(client, name: str, messages: List[Dict[str, str]], parse: Callable,
+          tiers: Sequence[str] = FAST_FIRST, temperature: float = 0.3, **kwargs):
+    """Ask each model in `tiers` until `parse` accepts an answer; see the module docstring."""
+    attempts, accepted, last_error, fallback = [], None, None, None
+    start = time.perf_counter()
+    for i, model in enumerate(tiers):
+        attempt = {"model": model, "cost": 0.0}
+        attempts.append(attempt)
+        tick = time.perf_counter()
+        try:
+            response = create(client, name, messages, model=model, temperature=temperature, **kwargs)
+            result, concern = _try(model, response, parse, attempt)
+        except Exception as e:
+            last_error, concern = e, f"{type(e).__name__}: {e}"
+            result = None
+        attempt["ms"] = round((time.perf_counter() - tick) * 1000)
+        attempt["reason"] = concern
+        if result is not None and (concern is None or i == len(tiers) - 1):
+            accepted = result
+            break
+        if result is not None and fallback is None:
+            fallback = (model, result)
+    return _finish(name, attempts, start, accepted, last_error, fallback)
+
+
+async def aroute(client, name: str, messages: List[Dict[str, str]], parse: Callable,
+                 tiers: Sequence[str] = FAST_FIRST, temperature: float = 0.3, **kwargs):
+    """`route` for an `AsyncOpenAI` client (core.sidecar); the stats write runs off the event loop."""
+    attempts, accepted, last_error, fallback = [], None, None, None
+    start = time.perf_counter()
+    for i, model in enumerate(tiers):
+        attempt = {"model": model, "cost": 0.0}
+        attempts.append(attempt)
+        tick = time.perf_counter()
+        try:
+            response = await acreate(client, name, messages, model=model, temperature=temperature, **kwargs)
+            result, concern = _try(model, response, parse, attempt)
+        except Exception as e:
+            last_error, concern = e, f"{type(e).__name__}: {e}"
+            result = None
+        attempt["ms"] = round((time.perf_counter() - tick) * 1000)
+        attempt["reason"] = concern
+        if result is not None and (concern is None or i == len(tiers) - 1):
+            accepted = result
+            break
+        if result is not None and fallback is None:
+            fallback = (model, result)
+    return await asyncio.to_thread(_finish, name, attempts, start, accepted, last_error, fallback)
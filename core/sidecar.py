@@ -0,0 +1,245 @@
+"""
+Async LLM sidecar: one process holds every in-flight upstream call.
+
+    python -m core.sidecar [--host 127.0.0.1] [--port 8765]
+
+LLM work is almost all waiting on the upstream. In the Dash app each wait
+holds a background job process (Generate, chat) or a request thread. Here
+each wait is a coroutine. The four tasks (summary, price, kpis, chat) run
+on one event loop and share pooled async HTTP clients (`AsyncOpenAI` over
+httpx; SIDECAR_MAX_CONNECTIONS keep-alive connections split into pools of
+SIDECAR_POOL_SIZE). A single process can then hold hundreds of concurrent
+upstream requests.
+
+The app delegates to it through `core.llm.SidecarBackend`: set
+LLM_SIDECAR_URL=http://127.0.0.1:8765 and list "sidecar" in LLM_BACKENDS.
+Prompts, price routing (mini -> 4o with `core.routing.aroute`), usage and
+routing metrics are the same as the in-process OpenAI backend. Result
+caching stays in the app (`dedupe`); here identical concurrent requests
+share one upstream call.
+
+    POST /v1/<task>   {"args": [...]} -> {"result": ...}, or 502 {"error": ...}
+    GET  /healthz
+    GET  /metrics     in flight (now and peak), totals, latency percentiles
+
+The upstream is OpenAI (OPENAI_API_KEY), or any OpenAI-compatible server at
+SIDECAR_UPSTREAM_URL (a local model, or `scripts/mock_llm_upstream.py` for
+load tests). The HTTP layer is a small stdlib asyncio server; `serve_json`
+is shared with the mock.
+"""
+
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import logging
+import math
+import os
+import time
+from typing import Awaitable, Callable, Dict, Tuple
+
+import numpy as np
+
+from core.llm import LLM_TIMEOUT, parse_price
+from core.prompts import KPIS, PRICE, PRICE_SCHEMA, SUMMARY, acomplete
+from core.routing import FAST_FIRST, aroute
+
+logger = logging.getLogger(__name__)
+
+# ---------- Config ----------
+SIDECAR_HOST = os.environ.get("SIDECAR_HOST", "127.0.0.1")
+SIDECAR_PORT = int(os.environ.get("SIDECAR_PORT", 8765))
+SIDECAR_UPSTREAM_URL = os.environ.get("SIDECAR_UPSTREAM_URL", "")           # default: api.openai.com
+SIDECAR_MODELS = tuple(m.strip() for m in os.environ.get("SIDECAR_MODELS", ",".join(FAST_FIRST)).split(","))
+SIDECAR_MAX_INFLIGHT = int(os.environ.get("SIDECAR_MAX_INFLIGHT", 1000))    # upstream calls at once
+SIDECAR_MAX_CONNECTIONS = int(os.environ.get("SIDECAR_MAX_CONNECTIONS", 1000))
+# httpcore scans a pool's connections for every queued request, so the cost per
+# request grows with pool size; many small pools scale better than one big one.
+SIDECAR_POOL_SIZE = int(os.environ.get("SIDECAR_POOL_SIZE", 50))
+LATENCY_SAMPLES = 5000
+
+TASKS = ("summary", "price", "kpis", "chat")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 502: "Bad Gateway"}
+MAX_BODY = 1024 ** 2
+
+
+# ---------- HTTP ----------
+Handler = Callable[[str, str, bytes], Awaitable[Tuple[int, dict]]]
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = header.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise ValueError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, target.split("?", 1)[0], headers, body
+
+
+async def serve_json(handler: Handler, host: str, port: int) -> None:
+    """Minimal HTTP/1.1 JSON server with keep-alive: `handler(method, path, body)` -> (status, payload)."""
+
+    async def on_client(reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await handler(method, path, body)
+                data = json.dumps(payload, default=str).encode("utf-8")
+                writer.write(f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(on_client, host, port, backlog=4096, limit=MAX_BODY)
+    async with server:
+        await server.serve_forever()
+
+
+# ---------- Tasks ----------
+class AsyncLLM:
+    """The four page tasks as coroutines over a few `AsyncOpenAI` clients, used in turn."""
+
+    def __init__(self, clients, tiers=SIDECAR_MODELS, cache_key: bool = True):
+        self.clients = itertools.cycle(clients)
+        self.tiers = tuple(tiers)
+        self.fast_model = self.tiers[0]
+        self.cache_key = cache_key
+
+    async def _complete(self, name: str, messages, temperature: float) -> str:
+        return await acomplete(next(self.clients), name, messages, model=self.fast_model, temperature=temperature,
+                               cache_key=self.cache_key)
+
+    async def summary(self, year, make, model):
+        messages = SUMMARY.messages(year=year, make=make, model=model)
+        return (await self._complete(SUMMARY.name, messages, 0.3)).strip()
+
+    async def price(self, year, make, model):
+        messages = PRICE.messages(year=year, make=make, model=model)
+        return await aroute(next(self.clients), PRICE.name, messages, parse_price, tiers=self.tiers, temperature=0.3,
+                            response_format=PRICE_SCHEMA, cache_key=self.cache_key)
+
+    async def kpis(self, year, make, model, price_context):
+        messages = KPIS.messages(year=year, make=make, model=model, price_context=price_context)
+        return json.loads((await self._complete(KPIS.name, messages, 0.3)).strip())
+
+    async def chat(self, messages):
+        return (await self._complete("chat", messages, 0.7)).strip()
+
+
+def build_clients() -> list:
+    """Upstream clients with SIDECAR_POOL_SIZE connections each, SIDECAR_MAX_CONNECTIONS in total."""
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+    import httpx
+
+    if SIDECAR_UPSTREAM_URL:
+        upstream = {"base_url": SIDECAR_UPSTREAM_URL, "api_key": os.getenv("SIDECAR_UPSTREAM_KEY", "local"),
+                    "max_retries": 0}
+    else:
+        upstream = {"api_key": os.getenv("OPENAI_API_KEY"), "max_retries": 1}
+    limits = httpx.Limits(max_connections=SIDECAR_POOL_SIZE, max_keepalive_connections=SIDECAR_POOL_SIZE)
+    return [AsyncOpenAI(timeout=LLM_TIMEOUT, http_client=DefaultAsyncHttpxClient(limits=limits), **upstream)
+            for _ in range(max(1, math.ceil(SIDECAR_MAX_CONNECTIONS / SIDECAR_POOL_SIZE)))]
+
+
+# ---------- Service ----------
+class Sidecar:
+    """Runs tasks with a bound on concurrent upstream calls; identical in-flight requests share one."""
+
+    def __init__(self, tasks: AsyncLLM, max_inflight: int = SIDECAR_MAX_INFLIGHT):
+        self.tasks = tasks
+        self.limit = asyncio.Semaphore(max_inflight)
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.stats = {"requests": 0, "failures": 0, "joined": 0, "inflight": 0, "peak_inflight": 0}
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        self.started = time.time()
+
+    async def _run(self, task: str, args: list):
+        async with self.limit:
+            self.stats["inflight"] += 1
+            self.stats["peak_inflight"] = max(self.stats["peak_inflight"], self.stats["inflight"])
+            try:
+                return await getattr(self.tasks, task)(*args)
+            finally:
+                self.stats["inflight"] -= 1
+
+    async def run(self, task: str, args: list):
+        key = json.dumps([task, args], sort_keys=True)
+        shared = self.pending.get(key)
+        if shared is not None:
+            self.stats["joined"] += 1
+            return await asyncio.shield(shared)
+        future = asyncio.ensure_future(self._run(task, args))
+        self.pending[key] = future
+        future.add_done_callback(lambda _: self.pending.pop(key, None))
+        return await asyncio.shield(future)
+
+    def report(self) -> dict:
+        latencies = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+        return {**self.stats, "uptime_s": round(time.time() - self.started),
+                "latency_ms_p50": round(float(p50), 1), "latency_ms_p95": round(float(p95), 1),
+                "latency_ms_p99": round(float(p99), 1)}
+
+    async def handle(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if method == "GET" and path == "/healthz":
+            return 200, {"status": "ok"}
+        if method == "GET" and path == "/metrics":
+            return 200, self.report()
+        task = path.removeprefix("/v1/")
+        if method != "POST" or task not in TASKS:
+            return 404, {"error": f"no route for {method} {path}"}
+        try:
+            args = json.loads(body or b"{}").get("args", [])
+        except (ValueError, AttributeError):
+            return 400, {"error": "expected a JSON object body with 'args'"}
+
+        self.stats["requests"] += 1
+        start = time.perf_counter()
+        try:
+            result = await self.run(task, list(args))
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.warning("sidecar %s failed: %s: %s", task, type(e).__name__, e)
+            return 502, {"error": f"{type(e).__name__}: {e}"}
+        self.latencies.append(time.perf_counter() - start)
+        return 200, {"result": result}
+
+
+async def serve(host: str = SIDECAR_HOST, port: int = SIDECAR_PORT) -> None:
+    sidecar = Sidecar(AsyncLLM(build_clients(), cache_key=not SIDECAR_UPSTREAM_URL))
+    logger.info("llm sidecar on %s:%s -> %s (%s)", host, port, SIDECAR_UPSTREAM_URL or "api.openai.com",
+                " -> ".join(SIDECAR_MODELS))
+    await serve_json(sidecar.handle, host, port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Async LLM sidecar for the Car Intelligence Hub.")
+    parser.add_argument("--host", default=SIDECAR_HOST)
+    parser.add_argument("--port", type=int, default=SIDECAR_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    asyncio.run(serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
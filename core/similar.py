@@ -0,0 +1,265 @@
+"""
+Similar-vehicle search: exact k-nearest-neighbours over normalized spec vectors.
+
+Every catalog vehicle (all three datasets, in `core.catalog` row order) gets
+a feature vector of
+
+    engine size, cylinders, motor kW, combined consumption (L or Le/100 km),
+    CO₂ g/km, electric range              z-scored, missing -> 0
+    vehicle class, powertrain             one-hot, weighted
+
+Queries are one matrix-vector product over the float32 matrix, using
+|x - q|² = |x|² - 2·x·q + |q|², so the whole catalog is ranked in well under a
+millisecond and no LLM is involved. Results keep one row per model family
+(make + leading model word), because the same car repeats across model years
+and trims.
+
+Two entry points:
+    similar_to(position, ...)      "cars like this", optionally cheaper to run or lower CO₂
+    candidates_for_text(text, ...) catalog candidates for the Find Your Car chat
+"""
+
+import re
+import threading
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from core.catalog import CatalogIndex, catalog_index
+from core.costs import DEFAULT_ANNUAL_KM, DEFAULT_CITY_RATIO, DEFAULT_ELECTRICITY_PRICE, DEFAULT_FUEL_PRICE
+from core.data import VEHICLE_TYPES
+from core.vehicle_table import annual_costs
+
+NUMERIC_FEATURES = ["engine_size", "cylinders", "motor_kw", "consumption", "co2", "electric_range"]
+CLASS_WEIGHT = 1.5          # one-hot weights relative to one standard deviation
+POWERTRAIN_WEIGHT = 1.0
+DEFAULT_K = 5
+RECENT_YEARS = 3            # chat candidates default to the latest model years
+
+SIMILAR_MODES = {
+    "like": "Most similar",
+    "cheaper": "Cheaper to run",
+    "greener": "Lower CO₂",
+}
+
+
+# ---------- Features ----------
+def model_family(model: pd.Series) -> pd.Series:
+    """Leading model word, lowercase ("RAV4 AWD LE ..." -> "rav4"; "Model 3 ..." -> "model 3")."""
+    words = model.astype(str).str.lower().str.split()
+    return words.map(lambda w: " ".join(w[:2]) if w and (len(w[0]) <= 2 or w[0] == "model") else (w[0] if w else ""))
+
+
+def raw_features(rows: pd.DataFrame) -> pd.DataFrame:
+    """Unscaled spec columns for every vehicle of the catalog table; values that do not apply count as 0."""
+    return rows[NUMERIC_FEATURES].fillna(0.0).reset_index(drop=True)
+
+
+class SimilarityIndex:
+    """Normalized feature matrix over a `CatalogIndex`, plus running cost and CO₂ per row."""
+
+    def __init__(self, catalog: CatalogIndex):
+        self.catalog = catalog
+        rows = catalog.rows
+        raw = raw_features(rows)
+        self.raw = raw
+        self.mean = raw.mean().to_numpy()
+        self.std = raw.std().replace(0, 1).fillna(1).to_numpy()
+        numeric = np.nan_to_num((raw.to_numpy() - self.mean) / self.std)
+
+        self.classes = sorted(rows["vehicle_class"].astype(str).unique())
+        classes = pd.Categorical(rows["vehicle_class"].astype(str), categories=self.classes)
+        class_onehot = np.eye(len(self.classes))[classes.codes] * CLASS_WEIGHT
+        powertrains = pd.Categorical(rows["vehicle_type"].astype(str), categories=VEHICLE_TYPES)
+        powertrain_onehot = np.eye(len(VEHICLE_TYPES))[powertrains.codes] * POWERTRAIN_WEIGHT
+
+        self.matrix = np.hstack([numeric, class_onehot, powertrain_onehot]).astype(np.float32)
+        self.sq_norms = np.einsum("ij,ij->i", self.matrix, self.matrix)
+
+        self.annual_cost = annual_costs(rows, DEFAULT_FUEL_PRICE, DEFAULT_ELECTRICITY_PRICE,
+                                        DEFAULT_CITY_RATIO / 100.0, DEFAULT_ANNUAL_KM)
+        self.co2 = rows["co2"].to_numpy(dtype=float)
+        self.years = rows["model_year"].to_numpy()
+        self.family_codes = pd.factorize(rows["make"].astype(str).str.lower() + "|" + model_family(rows["model"]))[0]
+
+    def distances(self, query: np.ndarray) -> np.ndarray:
+        query = np.asarray(query, dtype=np.float32)
+        return self.sq_norms - 2.0 * (self.matrix @ query) + float(query @ query)
+
+    def nearest(self, query: np.ndarray, k: int = DEFAULT_K, mask: Optional[np.ndarray] = None,
+                exclude_families=()) -> np.ndarray:
+        """Positions of the k nearest rows (one per model family), closest first."""
+        dist = self.distances(query)
+        if mask is not None:
+            dist = np.where(mask, dist, np.inf)
+        # A generous partial sort, then dedupe by family in distance order.
+        pool = min(len(dist), max(k * 40, 200))
+        candidates = np.argpartition(dist, pool - 1)[:pool]
+        candidates = candidates[np.argsort(dist[candidates], kind="stable")]
+        candidates = candidates[np.isfinite(dist[candidates])]
+        excluded = np.isin(self.family_codes[candidates], list(exclude_families))
+        candidates = candidates[~excluded]
+        _, first = np.unique(self.family_codes[candidates], return_index=True)
+        return candidates[np.sort(first)][:k]
+
+    def query_for_features(self, features: dict, classes=(), powertrains=()) -> np.ndarray:
+        """Feature vector for target raw values (missing features sit at the mean)."""
+        numeric = np.array([
+            (features[f] - m) / s if features.get(f) is not None else 0.0
+            for f, m, s in zip(NUMERIC_FEATURES, self.mean, self.std)
+        ])
+        class_part = np.zeros(len(self.classes))
+        for c in classes:
+            if c in self.classes:
+                class_part[self.classes.index(c)] = CLASS_WEIGHT / len(classes)
+        powertrain_part = np.zeros(len(VEHICLE_TYPES))
+        for p in powertrains:
+            powertrain_part[VEHICLE_TYPES.index(p)] = POWERTRAIN_WEIGHT / len(powertrains)
+        return np.concatenate([numeric, class_part, powertrain_part]).astype(np.float32)
+
+
+_index_lock = threading.Lock()
+_similarity_index: Optional[SimilarityIndex] = None
+
+
+def similarity_index() -> SimilarityIndex:
+    """The index for the current catalog; rebuilt after a data refresh drops the catalog."""
+    global _similarity_index
+    catalog = catalog_index()
+    with _index_lock:
+        if _similarity_index is None or _similarity_index.catalog is not catalog:
+            _similarity_index = SimilarityIndex(catalog)
+        return _similarity_index
+
+
+# ---------- Similar vehicles ----------
+def similar_to(position: int, k: int = DEFAULT_K, mode: str = "like", same_year: bool = False) -> np.ndarray:
+    """
+    Catalog positions of the k vehicles most like the one at `position`.
+    mode "cheaper" keeps only vehicles with a lower annual energy cost at the
+    default prices, "greener" only those with lower CO₂. "like" leaves out the
+    vehicle's own model family; the other modes may suggest a sibling trim
+    (e.g. the hybrid version).
+    """
+    index = similarity_index()
+    mask = np.ones(len(index.matrix), dtype=bool)
+    if mode == "cheaper":
+        mask &= index.annual_cost < index.annual_cost[position]
+    elif mode == "greener":
+        mask &= index.co2 < index.co2[position]
+    if same_year:
+        mask &= index.years == index.years[position]
+    mask[position] = False
+    exclude = {index.family_codes[position]} if mode == "like" else ()
+    return index.nearest(index.matrix[position], k, mask, exclude_families=exclude)
+
+
+# ---------- Chat candidates ----------
+CLASS_KEYWORDS = {
+    r"\bsuvs?\b|crossover|sport utility": ["Sport utility vehicle: Small", "Sport utility vehicle: Standard"],
+    r"small suv|compact suv": ["Sport utility vehicle: Small"],
+    r"large suv|full[- ]size suv|three[- ]row|7[- ]seat|8[- ]seat": ["Sport utility vehicle: Standard", "Minivan"],
+    r"pickup|truck": ["Pickup truck: Small", "Pickup truck: Standard"],
+    r"minivan|\bvan\b": ["Minivan", "Van: Passenger"],
+    r"wagon|estate": ["Station wagon: Small", "Station wagon: Mid-size"],
+    r"sedan": ["Compact", "Mid-size", "Full-size"],
+    r"hatchback|city car|small car|subcompact": ["Subcompact", "Compact", "Minicompact"],
+    r"sports car|two[- ]seat|roadster|convertible|coupe": ["Two-seater", "Minicompact"],
+}
+POWERTRAIN_KEYWORDS = {
+    r"plug[- ]in|phev": ["phev"],
+    r"\bevs?\b|electric|battery|\bbev\b": ["bev"],
+    r"gas(oline)?\b|diesel|petrol": ["conventional"],
+}
+# Plain "hybrid" means a PHEV or a conventional hybrid (`hybrid` in core.vehicle_table), not any gas car.
+HYBRID_WORDS = r"(?<!plug-in )(?<!plug in )\bhybrids?\b"
+EFFICIENT_WORDS = r"mileage|efficien|economical|\beco\b|low (fuel|running|co2|emission)|cheap to run|green|commut"
+PERFORMANCE_WORDS = r"fast|powerful|performance|sporty|quick|towing|\bv8\b|horsepower"
+
+
+def parse_preferences(text: str, makes=()) -> dict:
+    """Keyword read of a free-text request: classes, powertrains, hybrid, makes, year, efficient/performance."""
+    text = (text or "").lower()
+    classes, powertrains = [], []
+    for pattern, values in CLASS_KEYWORDS.items():
+        if re.search(pattern, text):
+            # A narrower phrase ("small suv") refines a broader one ("suv");
+            # unrelated ones ("suv or pickup") add up.
+            narrowed = [c for c in classes if c in values]
+            classes = narrowed or classes + [c for c in values if c not in classes]
+    for pattern, values in POWERTRAIN_KEYWORDS.items():
+        if re.search(pattern, text):
+            powertrains.extend(v for v in values if v not in powertrains)
+    # "gas or hybrid" still allows every gas car; "hybrid" alone only the hybrids.
+    hybrid = False
+    if re.search(HYBRID_WORDS, text):
+        hybrid = "conventional" not in powertrains
+        powertrains.extend(v for v in ("conventional", "phev") if v not in powertrains)
+    year = re.search(r"\b(20[12]\d)\b", text)
+    return {
+        "classes": classes,
+        "powertrains": powertrains,
+        "hybrid": hybrid,
+        "makes": [m for m in makes if re.search(rf"\b{re.escape(m.lower())}\b", text)],
+        "year": int(year.group(1)) if year else None,
+        "efficient": bool(re.search(EFFICIENT_WORDS, text)),
+        "performance": bool(re.search(PERFORMANCE_WORDS, text)),
+    }
+
+
+def powertrain_mask(rows: pd.DataFrame, prefs: dict) -> np.ndarray:
+    """Catalog rows of the powertrains `parse_preferences` read (all rows when none was named)."""
+    mask = np.ones(len(rows), dtype=bool)
+    if prefs["powertrains"]:
+        mask &= rows["vehicle_type"].isin(prefs["powertrains"]).to_numpy()
+    if prefs.get("hybrid"):
+        mask &= (rows["vehicle_type"] != "conventional").to_numpy() | rows["hybrid"].to_numpy()
+    return mask
+
+
+def preference_mask(index: SimilarityIndex, prefs: dict) -> np.ndarray:
+    """Catalog rows passing the hard filters of `parse_preferences` (recent years unless a year is given)."""
+    rows = index.catalog.rows
+    mask = powertrain_mask(rows, prefs)
+    if prefs["classes"]:
+        mask &= rows["vehicle_class"].isin(prefs["classes"]).to_numpy()
+    if prefs["makes"]:
+        mask &= rows["make"].isin(prefs["makes"]).to_numpy()
+    if prefs["year"]:
+        mask &= index.years == prefs["year"]
+    else:
+        mask &= index.years > index.years.max() - RECENT_YEARS
+    return mask
+
+
+def text_preferences(text: str) -> dict:
+    rows = similarity_index().catalog.rows
+    return parse_preferences(text, makes=sorted(rows["make"].astype(str).unique()))
+
+
+def candidates_for_text(text: str, k: int = 10) -> np.ndarray:
+    """
+    Catalog positions of real vehicles that fit a free-text request. The
+    request is read into hard filters (class, powertrain, make, year) and a
+    target spec vector: the filtered set's median, pulled toward its most
+    efficient or most powerful end when the text asks for that.
+    """
+    index = similarity_index()
+    prefs = text_preferences(text)
+    mask = preference_mask(index, prefs)
+    if not mask.any():
+        return np.array([], dtype="int64")
+
+    pool = index.raw[mask]
+    target = pool.median().to_dict()
+    if prefs["efficient"]:
+        target["consumption"] = pool["consumption"].quantile(0.1)
+        target["co2"] = pool["co2"].quantile(0.1)
+    if prefs["performance"]:
+        target["engine_size"] = pool["engine_size"].quantile(0.9)
+        target["motor_kw"] = pool["motor_kw"].quantile(0.9)
+    target = {f: (None if pd.isna(v) else v) for f, v in target.items()}
+
+    query = index.query_for_features(target, prefs["classes"], prefs["powertrains"])
+    return index.nearest(query, k, mask)
@@ -0,0 +1,335 @@
+"""
+Static detail pages for every catalog vehicle, rendered at build time.
+
+    python -m core.vehicle_pages build [--workers 4]
+
+A Car Search view needs a Dash session and a chain of callbacks. Direct
+links and crawlers get a plain page instead: `build` renders one HTML page
+and one JSON document per vehicle (all three datasets) with
+
+    specs        every dataset column (as GET /api/v1/vehicles/<key>)
+    running      annual energy cost, consumption and CO₂ at the default
+                 prices, distance and city share
+    summary      the AI summary if one is stored in the job cache,
+    KPIs         else the data-derived ones from the template backend
+
+Vehicles are split into chunks and rendered by a process pool; on Linux the
+workers fork from the builder, so the catalog is loaded once. Files are
+named by a hash of their content (`<key>-2024-toyota-rav4-….3f9c2a1b7e44.html`)
+and only written when new, so a rebuild rewrites only pages whose data or
+AI answers changed. `manifest.json` maps vehicle keys to the current files
+and is swapped in atomically; files it no longer names are deleted.
+
+The `vehicle_pages` blueprint serves them from disk:
+
+    GET /vehicles/                      index of every page
+    GET /vehicles/<key>-<slug>          HTML (any other slug redirects here)
+    GET /vehicles/<key>-<slug>.json     the page data
+    GET /vehicles/files/<hashed name>   same bytes, cached for a year
+
+Named pages revalidate with the content hash as ETag after PAGE_MAX_AGE.
+Pages show the dataset version they were built from; run `build` after a
+data refresh (or on deploy) to bring them up to date.
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from flask import Blueprint, abort, redirect, send_file
+
+from core.catalog import catalog_index
+from core.costs import DEFAULT_ANNUAL_KM, DEFAULT_CITY_RATIO, DEFAULT_ELECTRICITY_PRICE, DEFAULT_FUEL_PRICE
+from core.data import DATA_DIR, last_updated
+from core.http import IMMUTABLE_MAX_AGE
+from core.llm import TemplateBackend, llm
+from core.records import Vehicle, vehicle_registry
+
+VEHICLE_PAGES_DIR = os.environ.get("VEHICLE_PAGES_DIR", os.path.join(DATA_DIR, "vehicle_pages"))
+MANIFEST_FILE = "manifest.json"
+PAGE_MAX_AGE = int(os.environ.get("VEHICLE_PAGE_MAX_AGE", 3600))   # seconds before revalidating
+CHUNK_SIZE = 200
+HASH_CHARS = 12
+
+KPI_LABELS = {"performance": "Performance", "value": "Value", "reliability": "Reliability",
+              "eco": "Eco-Friendliness"}
+
+
+# ---------- Page data ----------
+def slug(vehicle: Vehicle) -> str:
+    """URL name: "<key>-<year>-<make>-<model>"; only the key is needed to find the page."""
+    text = re.sub(r"[^a-z0-9]+", "-", f"{vehicle.year} {vehicle.make} {vehicle.model}".lower()).strip("-")
+    return f"{vehicle.key}-{text}"
+
+
+def _rounded(value: float, digits: int = 1) -> Optional[float]:
+    return None if value != value else round(value, digits)
+
+
+def page_data(vehicle: Vehicle, version: str) -> dict:
+    """Everything one page shows; AI answers only when already stored (nothing is requested)."""
+    year = str(vehicle.year)       # Car Search passes the year as the dropdown string
+    router, template = llm(), TemplateBackend()
+    summary = router.cached("summary", year, vehicle.make, vehicle.model)
+    summary_source = "ai" if summary is not None else "nrcan"
+    if summary is None:
+        summary = template.summary(year, vehicle.make, vehicle.model)
+
+    price = router.cached("price", year, vehicle.make, vehicle.model)
+    kpis = None
+    if price is not None:
+        price_context = f"{price['retail_text']} | {price['used_text']}"
+        kpis = router.cached("kpis", year, vehicle.make, vehicle.model, price_context)
+    kpi_source = "ai" if kpis is not None else "nrcan"
+    if kpis is None:
+        kpis = template.kpis(year, vehicle.make, vehicle.model, "")
+
+    is_bev = vehicle.vehicle_type == "bev"
+    return {
+        "vehicle_key": vehicle.key,
+        "slug": slug(vehicle),
+        "display_name": vehicle.display_name,
+        "vehicle_type": vehicle.vehicle_type,
+        "model_year": vehicle.year,
+        "make": vehicle.make,
+        "model": vehicle.model,
+        "vehicle_class": vehicle.vehicle_class,
+        "running": {
+            "annual_cost_cad": _rounded(vehicle.annual_cost, 0),
+            "annual_km": DEFAULT_ANNUAL_KM,
+            "city_ratio": DEFAULT_CITY_RATIO,
+            "energy_price": DEFAULT_ELECTRICITY_PRICE if is_bev else DEFAULT_FUEL_PRICE,
+            "energy_unit": vehicle.unit,
+            "city_per_100km": _rounded(vehicle.city),
+            "highway_per_100km": _rounded(vehicle.highway),
+            "consumption": _rounded(vehicle.consumption),
+            "consumption_unit": "Le/100 km" if is_bev else "L/100 km",
+            "co2_g_km": _rounded(vehicle.co2, 0),
+        },
+        "summary": {"text": summary, "source": summary_source},
+        "price": price,
+        "kpis": {**kpis, "source": kpi_source},
+        "specs": catalog_index().record(vehicle.position),
+        "data_version": version,
+    }
+
+
+# ---------- HTML ----------
+PAGE_STYLE = (
+    "body{font-family:Inter,system-ui,sans-serif;max-width:880px;margin:0 auto;padding:24px;color:#2c3e50}"
+    "h1{margin-bottom:4px}.muted{color:#777;font-size:.9rem}"
+    ".cards{display:flex;flex-wrap:wrap;gap:12px;margin:16px 0}"
+    ".card{flex:1 1 180px;border:1px solid #eaeaea;border-radius:12px;padding:12px 16px;background:#fdfdfd}"
+    ".card b{display:block;font-size:1.4rem}table{border-collapse:collapse;width:100%}"
+    "td{border-bottom:1px solid #eee;padding:4px 8px;font-size:.9rem}td:first-child{color:#555}"
+)
+
+
+def _e(value) -> str:
+    return html.escape("" if value is None else str(value))
+
+
+def render_html(data: dict, json_href: str) -> str:
+    running = data["running"]
+    title = f"{data['model_year']} {data['make']} {data['model']}"
+    cost = running["annual_cost_cad"]
+    cards = [
+        ("Annual energy cost", "–" if cost is None else f"${cost:,.0f} CAD",
+         f"{running['annual_km']:,} km, {running['city_ratio']}% city, "
+         f"{running['energy_price']:.2f} CAD/{running['energy_unit']}"),
+        ("Combined consumption", "–" if running["consumption"] is None
+         else f"{running['consumption']} {running['consumption_unit']}",
+         f"city {running['city_per_100km']} / highway {running['highway_per_100km']} "
+         f"{running['energy_unit']}/100 km"),
+        ("CO₂", f"{running['co2_g_km']:.0f} g/km" if running["co2_g_km"] is not None else "–", ""),
+    ]
+    kpis = data["kpis"]
+    kpi_rows = "".join(
+        f"<tr><td>{_e(label)}</td><td>{_e(kpis.get(key, '–'))}</td>"
+        f"<td>{_e(kpis.get('explanations', {}).get(key, ''))}</td></tr>"
+        for key, label in KPI_LABELS.items()
+    )
+    spec_rows = "".join(f"<tr><td>{_e(k)}</td><td>{_e(v)}</td></tr>"
+                        for k, v in data["specs"].items() if v is not None)
+    price = data["price"]
+    price_html = (f"<p><b>{_e(price['retail_text'])}</b><br>{_e(price['used_text'])}</p>" if price else "")
+    sources = {"ai": "AI", "nrcan": "generated from NRCan data"}
+    return (
+        "<!doctype html><html lang=en><head><meta charset=utf-8>"
+        "<meta name=viewport content=\"width=device-width,initial-scale=1\">"
+        f"<title>{_e(title)} – Car Intelligence Hub</title>"
+        f"<meta name=description content=\"{_e(data['summary']['text'][:160])}\">"
+        f"<link rel=canonical href=\"/vehicles/{_e(data['slug'])}\">"
+        f"<link rel=alternate type=application/json href=\"{_e(json_href)}\">"
+        f"<style>{PAGE_STYLE}</style></head><body>"
+        f"<p class=muted><a href=\"/vehicles/\">All vehicles</a> · <a href=\"/car-search\">Car Search</a></p>"
+        f"<h1>{_e(title)}</h1><p class=muted>{_e(data['display_name'])}</p>"
+        f"<p>{_e(data['summary']['text'])}</p>"
+        "<div class=cards>"
+        + "".join(f"<div class=card>{_e(label)}<b>{_e(value)}</b><span class=muted>{_e(note)}</span></div>"
+                  for label, value, note in cards)
+        + "</div>"
+        f"{price_html}"
+        f"<h2>Scores</h2><p class=muted>{_e(sources[kpis['source']])}</p><table>{kpi_rows}</table>"
+        f"<h2>Specifications</h2><table>{spec_rows}</table>"
+        f"<p class=muted>Source: Natural Resources Canada fuel consumption ratings. {_e(data['data_version'])}</p>"
+        "</body></html>"
+    )
+
+
+def render_index(entries: List[dict], version: str) -> str:
+    by_year: Dict[int, List[dict]] = {}
+    for entry in entries:
+        by_year.setdefault(entry["model_year"], []).append(entry)
+    sections = "".join(
+        f"<h2>{year}</h2><ul>"
+        + "".join(f"<li><a href=\"/vehicles/{_e(e['slug'])}\">{_e(e['title'])}</a></li>"
+                  for e in sorted(by_year[year], key=lambda e: e["title"]))
+        + "</ul>"
+        for year in sorted(by_year, reverse=True)
+    )
+    return (
+        "<!doctype html><html lang=en><head><meta charset=utf-8><title>All vehicles – Car Intelligence Hub</title>"
+        f"<style>{PAGE_STYLE}</style></head><body><h1>All vehicles</h1>"
+        f"<p class=muted>{len(entries):,} vehicles. {_e(version)}</p>{sections}</body></html>"
+    )
+
+
+# ---------- Build ----------
+def _write_hashed(directory: str, stem: str, suffix: str, body: bytes) -> dict:
+    digest = hashlib.sha256(body).hexdigest()[:HASH_CHARS]
+    name = f"{stem}.{digest}{suffix}"
+    path = os.path.join(directory, name)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+    return {"file": name, "etag": digest}
+
+
+def _render_chunk(positions: List[int], directory: str, version: str) -> List[dict]:
+    registry = vehicle_registry()
+    entries = []
+    for position in positions:
+        vehicle = registry.at(position)
+        data = page_data(vehicle, version)
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        as_json = _write_hashed(directory, data["slug"], ".json", body)
+        as_html = _write_hashed(directory, data["slug"], ".html",
+                                render_html(data, f"/vehicles/files/{as_json['file']}").encode("utf-8"))
+        entries.append({"key": vehicle.key, "slug": data["slug"], "model_year": vehicle.year,
+                        "title": f"{vehicle.year} {vehicle.make} {vehicle.model}", "html": as_html,
+                        "json": as_json})
+    return entries
+
+
+def build(workers: Optional[int] = None, directory: str = VEHICLE_PAGES_DIR) -> dict:
+    """Render every vehicle's page with a process pool and swap in the new manifest."""
+    os.makedirs(directory, exist_ok=True)
+    registry = vehicle_registry()            # loaded before the pool forks
+    version = last_updated()
+    positions = list(range(len(registry)))
+    chunks = [positions[i:i + CHUNK_SIZE] for i in range(0, len(positions), CHUNK_SIZE)]
+
+    entries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_entries in pool.map(_render_chunk, chunks, [directory] * len(chunks), [version] * len(chunks)):
+            entries.extend(chunk_entries)
+
+    index = _write_hashed(directory, "index", ".html", render_index(entries, version).encode("utf-8"))
+    manifest = {"data_version": version, "built_at": time.strftime("%Y-%m-%d %H:%M:%S"), "index": index,
+                "pages": {str(e["key"]): {k: e[k] for k in ("slug", "html", "json")} for e in entries}}
+    tmp = os.path.join(directory, f"{MANIFEST_FILE}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(directory, MANIFEST_FILE))
+
+    keep = {index["file"], MANIFEST_FILE}
+    for page in manifest["pages"].values():
+        keep.update((page["html"]["file"], page["json"]["file"]))
+    for name in os.listdir(directory):
+        if name not in keep:
+            os.remove(os.path.join(directory, name))
+    return manifest
+
+
+# ---------- Serving ----------
+_manifest = {"mtime": None, "data": None}
+
+
+def load_manifest(directory: str = VEHICLE_PAGES_DIR) -> Optional[dict]:
+    """The current manifest, re-read when a build replaced it; None before the first build."""
+    path = os.path.join(directory, MANIFEST_FILE)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    if mtime != _manifest["mtime"]:
+        with open(path, "r") as f:
+            _manifest["data"] = json.load(f)
+        _manifest["mtime"] = mtime
+    return _manifest["data"]
+
+
+vehicle_pages = Blueprint("vehicle_pages", __name__, url_prefix="/vehicles")
+
+
+def _send(entry: dict, mimetype: str):
+    return send_file(os.path.join(VEHICLE_PAGES_DIR, entry["file"]), mimetype=mimetype, etag=entry["etag"],
+                     max_age=PAGE_MAX_AGE, conditional=True)
+
+
+@vehicle_pages.route("/")
+def vehicle_index():
+    manifest = load_manifest()
+    if manifest is None:
+        abort(404)
+    return _send(manifest["index"], "text/html")
+
+
+@vehicle_pages.route("/<page>")
+def vehicle_page(page: str):
+    manifest = load_manifest()
+    name, is_json = (page[:-5], True) if page.endswith(".json") else (page, False)
+    key = re.match(r"\d+", name)
+    entry = manifest and key and manifest["pages"].get(key.group())
+    if not entry:
+        abort(404)
+    if name != entry["slug"]:
+        return redirect(f"/vehicles/{entry['slug']}{'.json' if is_json else ''}", code=301)
+    return _send(entry["json"], "application/json") if is_json else _send(entry["html"], "text/html")
+
+
+@vehicle_pages.route("/files/<name>")
+def vehicle_file(name: str):
+    """Content-hashed files: the name changes with the bytes, so they never need revalidating."""
+    path = os.path.join(VEHICLE_PAGES_DIR, os.path.basename(name))
+    if name == MANIFEST_FILE or not os.path.isfile(path):
+        abort(404)
+    mimetype = "application/json" if name.endswith(".json") else "text/html"
+    response = send_file(path, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render static detail pages for every catalog vehicle.")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per CPU)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    manifest = build(args.workers)
+    print(f"{len(manifest['pages']):,} vehicle pages in {time.perf_counter() - start:.1f}s "
+          f"({manifest['data_version']}); {VEHICLE_PAGES_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+One normalized, typed table for every catalog vehicle across the three datasets.
+
+The NRCan files do not share a schema. BEVs are rated in kWh and Le per
+100 km. PHEVs have two fuel types and give their electric consumption as
+text ("2.5 (22.3 kWh/100 km)"). Conventional vehicles are rated in L/100 km
+for one of five fuels. `build_vehicle_table` maps each frame onto the
+columns below in one pass. Consumers can then filter, rank and price every
+powertrain with one vectorized expression, instead of branching on
+`vehicle_type` and scanning each `CACHED_DATA` frame.
+
+    vehicle_key         stable int64 key (`core.data.vehicle_keys`)
+    vehicle_type        powertrain: conventional, phev or bev
+    source_row          row in CACHED_DATA[vehicle_type], for the full record
+    _id, model_year, make, model, vehicle_class, display_name
+    fuel_type           X, Z, D, E, N; B for BEVs; B/X or B/Z for PHEVs
+    hybrid              PHEVs, and conventional hybrids (named so: "RAV4 Hybrid AWD", "Prius")
+    energy_unit         what the owner buys: "L" of fuel, or "kWh"
+    city, highway       rated consumption in energy_unit per 100 km (PHEVs: fuel-only mode)
+    consumption         combined L/100 km, or litre-equivalents (Le) for BEVs
+    energy_city, energy_highway, energy_combined
+                        the same consumption in kWh per 100 km, comparable
+                        across powertrains (fuel at FUEL_KWH_PER_L)
+    electric_kwh        kWh/100 km on electricity (BEVs; PHEVs in charge-depleting mode)
+    co2                 g/km
+    engine_size, cylinders, motor_kw, electric_range (km), recharge_hours
+
+A value that does not apply, such as a BEV's engine size, is NaN. Repeated
+strings are categoricals. Years, ids and row numbers are small integers.
+Rated values stay float64, so they print exactly as published.
+
+The table is built by `core.catalog.CatalogIndex` (its `rows`). It is
+rebuilt when a data refresh drops the catalog.
+"""
+
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from core.costs import annual_energy_cost
+from core.data import VEHICLE_TYPES, vehicle_keys
+
+# kWh per litre of fuel (lower heating value). Gasoline is NRCan's
+# litre-equivalent, so a BEV's Le/100 km times 8.9 is its kWh/100 km. Natural
+# gas vehicles are rated in gasoline litre-equivalents.
+FUEL_KWH_PER_L = {"X": 8.9, "Z": 8.9, "D": 10.0, "E": 6.5, "N": 8.9}
+
+# Conventional rows have no hybrid flag; NRCan puts it in the model name.
+HYBRID_MODEL = r"\bhybrid\b|\bprius\b"
+
+# Source column per table column, for each dataset. Missing entries are NaN.
+SOURCE_COLUMNS = {
+    "conventional": {
+        "city": "city_(l/100_km)", "highway": "highway_(l/100_km)", "consumption": "combined_(l/100_km)",
+        "engine_size": "engine_size_(l)", "cylinders": "cylinders",
+    },
+    "phev": {
+        "city": "city_(l/100_km)", "highway": "highway_(l/100_km)", "consumption": "combined_(l/100_km)",
+        "engine_size": "engine_size_(l)", "cylinders": "cylinders", "motor_kw": "motor_(kw)",
+        "electric_range": "range_1_(km)", "recharge_hours": "recharge_time_(h)",
+    },
+    "bev": {
+        "city": "city_(kwh/100_km)", "highway": "highway_(kwh/100_km)", "consumption": "combined_(le/100_km)",
+        "electric_kwh": "combined_(kwh/100_km)", "motor_kw": "motor_(kw)", "electric_range": "range_(km)",
+        "recharge_hours": "recharge_time_(h)",
+    },
+}
+# PHEV "combined_le/100_km" reads like "2.5 (22.3 kWh/100 km)" or "4.7 ([36.4 kWh + 0.6 L]/100 km)".
+PHEV_ELECTRIC_COLUMN = "combined_le/100_km"
+
+COLUMNS: Dict[str, str] = {
+    "vehicle_key": "int64",
+    "vehicle_type": "category",
+    "source_row": "int32",
+    "_id": "int32",
+    "model_year": "int16",
+    "make": "category",
+    "model": "object",
+    "vehicle_class": "category",
+    "display_name": "object",
+    "fuel_type": "category",
+    "hybrid": "bool",
+    "energy_unit": "category",
+    "city": "float64",
+    "highway": "float64",
+    "consumption": "float64",
+    "energy_city": "float64",
+    "energy_highway": "float64",
+    "energy_combined": "float64",
+    "electric_kwh": "float64",
+    "co2": "float64",
+    "engine_size": "float64",
+    "cylinders": "float64",
+    "motor_kw": "float64",
+    "electric_range": "float64",
+    "recharge_hours": "float64",
+}
+NUMERIC_SOURCES = ("city", "highway", "consumption", "electric_kwh", "engine_size", "cylinders", "motor_kw",
+                   "electric_range", "recharge_hours")
+
+
+def _number(values: pd.Series, pattern: str = r"^\s*([0-9.]+)") -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=float)
+    return pd.to_numeric(values.astype(str).str.extract(pattern, expand=False), errors="coerce").to_numpy(dtype=float)
+
+
+def _normalize(vehicle_type: str, df: pd.DataFrame) -> dict:
+    """Table columns for one dataset frame."""
+    n = len(df)
+    sources = SOURCE_COLUMNS[vehicle_type]
+    columns = {
+        "vehicle_key": vehicle_keys(vehicle_type, df).to_numpy(),
+        "vehicle_type": np.full(n, vehicle_type, dtype=object),
+        "source_row": np.arange(n),
+        "_id": df["_id"].to_numpy(),
+        "model_year": df["model_year"].to_numpy(),
+        "make": df["make"].to_numpy(),
+        "model": df["model"].to_numpy(),
+        "vehicle_class": df["vehicle_class"].to_numpy(),
+        "display_name": df["display_name"].to_numpy(),
+        "co2": _number(df["co2_emissions_(g/km)"]),
+    }
+    for name in NUMERIC_SOURCES:
+        columns[name] = _number(df[sources[name]]) if name in sources else np.full(n, np.nan)
+
+    if vehicle_type == "bev":
+        fuel = np.full(n, "B", dtype=object)
+        kwh_per_unit = np.ones(n)
+        columns["energy_unit"] = np.full(n, "kWh", dtype=object)
+    else:
+        burned = df["fuel_type_2" if vehicle_type == "phev" else "fuel_type"].astype(str)
+        fuel = ("B/" + burned if vehicle_type == "phev" else burned).to_numpy(dtype=object)
+        kwh_per_unit = burned.map(FUEL_KWH_PER_L).to_numpy(dtype=float)
+        columns["energy_unit"] = np.full(n, "L", dtype=object)
+    if vehicle_type == "phev":
+        columns["electric_kwh"] = _number(df[PHEV_ELECTRIC_COLUMN], r"([0-9.]+)\s*kWh")
+    columns["fuel_type"] = fuel
+    if vehicle_type == "conventional":
+        columns["hybrid"] = df["model"].astype(str).str.contains(HYBRID_MODEL, case=False).to_numpy()
+    else:
+        columns["hybrid"] = np.full(n, vehicle_type == "phev")
+
+    columns["energy_city"] = columns["city"] * kwh_per_unit
+    columns["energy_highway"] = columns["highway"] * kwh_per_unit
+    # BEV "consumption" is in Le; their combined kWh is rated directly.
+    columns["energy_combined"] = (columns["electric_kwh"] if vehicle_type == "bev"
+                                  else columns["consumption"] * kwh_per_unit)
+    return columns
+
+
+def build_vehicle_table(frames: dict) -> pd.DataFrame:
+    """Every vehicle of `frames` ({vehicle_type: dataset frame}) in one table, in dataset order."""
+    parts = [_normalize(vt, frames[vt]) for vt in VEHICLE_TYPES]
+    table = pd.DataFrame({
+        name: np.concatenate([part[name] for part in parts]) for name in COLUMNS
+    })
+    table = table.astype({name: dtype for name, dtype in COLUMNS.items() if dtype != "category"})
+    for name, dtype in COLUMNS.items():
+        if dtype == "category":
+            table[name] = table[name].astype("category")
+    table["vehicle_type"] = table["vehicle_type"].cat.set_categories(VEHICLE_TYPES)
+    return table
+
+
+# ---------- Cross-powertrain queries ----------
+def energy_price(table: pd.DataFrame, fuel_price, electricity_price) -> np.ndarray:
+    """Price per `energy_unit` for every row: electricity for BEVs, fuel otherwise."""
+    return np.where((table["energy_unit"] == "kWh").to_numpy(), electricity_price, fuel_price)
+
+
+def annual_costs(table: pd.DataFrame, fuel_price, electricity_price, city_ratio, annual_km) -> np.ndarray:
+    """Annual energy cost in CAD for every row; `city_ratio` is a fraction (0–1)."""
+    return annual_energy_cost(table["city"].to_numpy(), table["highway"].to_numpy(), city_ratio,
+                              energy_price(table, fuel_price, electricity_price), annual_km)
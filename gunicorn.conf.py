@@ -0,0 +1,55 @@
+"""
+Gunicorn settings for the production server.
+
+The workload is dominated by waiting on OpenAI, so we run a few processes with
+many threads each (gthread) rather than many processes. `preload_app` imports
+the app (and parses the CSVs) once in the master so workers share
+`CACHED_DATA` copy-on-write.
+
+Every value can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+from core.memory import rss_bytes
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '10000')}"
+
+# ---------- Workers ----------
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() + 1, 4)))
+# Threads mostly sit idle waiting on LLM responses, so oversubscribe the CPU.
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+
+preload_app = True
+
+# ---------- Recycling ----------
+# A worker whose resident memory passes the budget finishes its in-flight
+# requests and is replaced by a fresh fork of the preloaded master (0 = off).
+# max_requests recycles on a request count as well; the jitter keeps workers
+# from restarting together.
+WORKER_MAX_RSS_MB = float(os.environ.get("WORKER_MAX_RSS_MB", 1024))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+
+def post_request(worker, req, environ, resp):
+    if not WORKER_MAX_RSS_MB or not worker.alive:
+        return
+    rss_mb = rss_bytes() / 1024 ** 2
+    if rss_mb > WORKER_MAX_RSS_MB:
+        worker.log.warning("worker %s at %.0f MB RSS (budget %.0f MB); recycling", worker.pid, rss_mb,
+                           WORKER_MAX_RSS_MB)
+        worker.alive = False
+
+# ---------- Timeouts ----------
+# Three sequential LLM calls can take a while; keep the worker alive for them.
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+
+# ---------- Logging ----------
+accesslog = "-"
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
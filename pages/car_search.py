@@ -2,9 +2,9 @@
 CarWise AI — Dash (Step 2.6: Minor UI Fixes + Better Reset Behavior)
 """
 
-import os, json, re
 import pandas as pd
-from dash import Dash, html, dcc, Input, Output, State, no_update, callback
+import plotly.graph_objects as go
+from dash import Dash, html, dcc, Input, Output, State, no_update, callback, clientside_callback
 from dotenv import load_dotenv
 
 # car_app/pages/car_search.py
@@ -14,58 +14,29 @@ register_page(__name__, path="/car-search", name="Car Search")
 
 # ---------- Config ----------
 load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
-
-DATA_DIR = "data"
-DEFAULT_ANNUAL_DISTANCE = 15000
-DEFAULT_FUEL_PRICE = 1.80
-DEFAULT_ELECTRICITY_PRICE = 0.14
-
-# ---------- Load local datasets ----------
-def load_vehicle_dataframe(vehicle_type: str) -> pd.DataFrame:
-    path = os.path.join(DATA_DIR, f"{vehicle_type}.csv")
-    return pd.read_csv(path)
-
-CACHED_DATA = {vt: load_vehicle_dataframe(vt) for vt in ["conventional", "phev", "bev"]}
-
-# ---------- Timestamp ----------
-LAST_UPDATED_PATH = os.path.join(DATA_DIR, "last_updated.txt")
-if os.path.exists(LAST_UPDATED_PATH):
-    with open(LAST_UPDATED_PATH, "r") as f:
-        LAST_UPDATED = f.read().strip()
-else:
-    LAST_UPDATED = "Data Last updated: Unknown"
-
-# ---------- OpenAI ----------
-try:
-    from openai import OpenAI
-    openai_client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
-except Exception:
-    openai_client = None
-
-def get_vehicle_summary(make: str, model: str, year: str) -> str:
-    if not openai_client:
-        return f"The {year} {make} {model} is a popular model. (No API key configured)"
-    prompt = (
-        f"You are an automotive advisor for Canadian buyers. Act like a car nerd. "
-        f"In 2–3 sentences, summarize the {year} {make} {model} focusing on the general public view, performance, reliability, "
-        f"and everyday usability — what it's good for and what it's not ideal for. "
-        f"Keep it neutral, concise, and friendly."
-    )
-    try:
-        resp = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-        )
-        return resp.choices[0].message.content.strip()
-    except Exception as e:
-        return f"(Summary unavailable: {e})"
-    
 
-def get_vehicle_price(make: str, model: str, year: str):
+# ---------- Local datasets (loaded once in core.data) ----------
+from core.data import last_updated
+from core.catalog import catalog_index
+from core.costs import (DEFAULT_ANNUAL_KM, DEFAULT_CITY_RATIO, DEFAULT_ELECTRICITY_PRICE, DEFAULT_FUEL_PRICE,
+                        vehicle_coefficients)
+from core.jobs import new_request_token, supersede, ensure_current
+from core.memo import memoized_callback
+from core.records import vehicle_registry
+from core.similar import SIMILAR_MODES, similar_to
+from core.tco import DRIVERS, Scenario, simulate
+from core.admission import admit
+from core.llm import llm
+
+# ---------- LLM ----------
+# core.llm picks the backend (OpenAI, a local server, or data-derived templates) and fails over.
+def get_vehicle_summary(make: str, model: str, year: str, ticket=None) -> str:
+    return llm().summary(year, make, model, ticket=ticket)
+
+
+def get_vehicle_price(make: str, model: str, year: str, ticket=None):
     """
-    Uses GPT to estimate both:
+    Estimates both:
       - Retail price (current or discontinued MSRP)
       - Second-hand price range (min–max CAD)
     Returns a dict:
@@ -74,99 +45,16 @@ def get_vehicle_price(make: str, model: str, year: str):
         "used_text": "Used Market: $18,000–$28,000 CAD"
       }
     """
-    if not openai_client:
-        return {"retail_text": "Price unavailable (no API key).", "used_text": ""}
-
-    prompt = (
-        f"You are an automotive market analyst. For the {year} {make} {model}, "
-        f"give two brief price lines in Canadian dollars:\n"
-        f"1. Retail Price: if still sold new, give 'Retail Price: $XX,XXX CAD'; "
-        f"if discontinued, give 'Retail Price (Discontinued): $XX,XXX CAD'.\n"
-        f"2. Used Market: give a reasonable used market range (e.g. '$15,000–$25,000 CAD'), "
-        f"based on typical Canadian listings, condition, and mileage. "
-        f"If too new or unavailable second-hand, write 'Used Market: unavailable'.\n"
-        f"Be concise, formatted as plain text with exactly two lines."
-    )
-    try:
-        resp = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-        )
-        lines = [line.strip() for line in resp.choices[0].message.content.split("\n") if line.strip()]
-        retail = lines[0] if len(lines) > 0 else "Retail Price: unavailable"
-        used = lines[1] if len(lines) > 1 else "Used Market: unavailable"
-        return {"retail_text": retail, "used_text": used}
-    except Exception as e:
-        return {"retail_text": f"(Price unavailable: {e})", "used_text": ""}
-
+    return llm().price(year, make, model, ticket=ticket)
 
 
-def get_vehicle_kpis(make: str, model: str, year: str, price_context: str):
+def get_vehicle_kpis(make: str, model: str, year: str, price_context: str, ticket=None):
     """
-    Uses GPT to provide 1–10 scores for key KPIs: Performance, Value, Reliability, Eco-Friendliness.
+    1–10 scores for key KPIs: Performance, Value, Reliability, Eco-Friendliness.
     Accepts a full price context string (e.g., 'Retail Price: $40,000 | Used Market: $20,000–$25,000').
     """
-    if not openai_client:
-        return None
-
-    prompt = (
-        f"You are an automotive expert reviewing the {year} {make} {model}. "
-        f"Rate it on a 1–10 scale for (can be float like 8.5, 9.5, 4.5):\n"
-        f"- Performance (acceleration, handling, top speed)\n"
-        f"- Value for Money (price vs quality, efficiency, features)\n"
-        f"- Reliability (mechanical dependability, repair frequency, maintenance cost)\n"
-        f"- Eco-Friendliness (fuel economy AND CO₂ emissions)\n\n"
-
-        f"Interpretation guide:\n"
-        f"7 = average for its class, 8–9 = excellent, 10 = exceptional or class-leading, "
-        f"5–6 = below average, 1–4 = poor. Be realistic and fair — do not exaggerate.\n\n"
-
-        f"Performance:\n"
-        f"10 → supercar / hypercar (0–100 km/h under 3.0s, top speed >300 km/h)\n"
-        f"8–9 → high-performance sports cars (0–100 km/h 3.5–4.0s)\n"
-        f"7 → sporty or strong performance\n"
-        f"5–6 → typical everyday vehicle\n"
-        f"1–4 → slow or underpowered.\n\n"
-
-        f"Reliability:\n"
-        f"10 → extremely dependable (e.g., Toyota, Lexus, Volvo)\n"
-        f"7–8 → good reliability with minor or infrequent issues (e.g., premium or exotic cars like Porsche, Lamborghini — "
-        f"high build quality but costly parts)\n"
-        f"5–6 → average reliability\n"
-        f"1–4 → poor reliability or frequent major repairs.\n\n"
-
-        f"Eco-Friendliness:\n"
-        f"10 → zero tailpipe emissions (EV)\n"
-        f"7–9 → hybrids and very efficient gas vehicles\n"
-        f"5–6 → moderate fuel use (around 8–10 L/100 km)\n"
-        f"1–4 → inefficient or high CO₂ vehicles (>12 L/100 km or >250 g/km CO₂).\n\n"
-
-        f"Always include numeric details in explanations where possible: engine size (L), cylinder count, "
-        f"horsepower, 0–100 km/h acceleration, top speed, fuel economy (L/100 km or mpg), and CO₂ emissions (g/km). "
-        f"If exact data isn't available, estimate realistically based on vehicle type and class.\n\n"
-
-        f"Keep explanations short (one sentence, two at most), factual, and neutral — no marketing tone.\n\n"
-
-        f"Return only a valid JSON object. Example:\n"
-        f'{{"performance": 10, "value": 6, "reliability": 7, "eco": 3, '
-        f'"explanations": {{"performance": "5.2L V10, 0–100 km/h in 2.9s, top 310 km/h.", '
-        f'"value": "Very expensive but extreme performance.", '
-        f'"reliability": "High-quality engineering but costly servicing.", '
-        f'"eco": "13.5 L/100 km, 320 g/km CO₂."}}}}'
-    )
-    try:
-        resp = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-        )
-        return json.loads(resp.choices[0].message.content.strip())
-    except Exception as e:
-        return {"error": str(e)}
-    
+    return llm().kpis(year, make, model, price_context, ticket=ticket)
 
-# ---------- Dash Layout ----------
 # app = Dash(__name__)
 # app.title = "CarWise AI — MVP"
 
@@ -176,95 +64,151 @@ vehicle_options = [
     {"label": "Battery Electric (BEV)", "value": "bev"},
 ]
 
-layout = html.Div(
-    style={"maxWidth": 960, "margin": "40px auto", "fontFamily": "system-ui, sans-serif"},
-    children=[
-        html.H1("Car Search"),
-        html.P("Explore detailed car profiles and estimated annual fuel costs."),
-        html.P(LAST_UPDATED, style={"color": "#666", "fontStyle": "italic"}),
-
-        # ---------- Selection ----------
-        html.Div([
-            html.Label("Vehicle Type:"),
-            dcc.Dropdown(id="vehicle-type", options=vehicle_options, value="conventional", clearable=False),
-        ]),
-        html.Br(),
-        html.Div([
-            html.Label("Model Year:"),
-            dcc.Dropdown(id="year-dropdown", placeholder="Select a year"),
-        ]),
-        html.Br(),
-        html.Div([
-            html.Label("Make:"),
-            dcc.Dropdown(id="make-dropdown", placeholder="Select a make"),
-        ]),
-        html.Br(),
-        html.Div([
-            html.Label("Vehicle Class:"),
-            dcc.Dropdown(id="class-dropdown", placeholder="Select a vehicle class"),
-        ]),
-        html.Br(),
-        html.Div([
-            html.Label("Model:"),
-            dcc.Dropdown(id="model-dropdown", placeholder="Select a model"),
-        ]),
-        html.Br(),
-        html.Button("Get Summary", id="go", n_clicks=0),
-        html.Hr(),
-
-        html.Div(id="summary-block"),
-        html.Div(id="price-block", style={"marginTop": "20px"}),
-        html.Div(id="kpi-block", style={"marginTop": "20px"}),
-
-        # ---------- Estimator ----------
-        html.Div(
-            id="fuel-section",
-            style={"display": "none"},
-            children=[
-                html.H3("Annual Energy Cost Estimator"),
-                html.Label("City driving ratio (%)"),
-                dcc.Slider(
-                    id="city-ratio",
-                    min=0,
-                    max=100,
-                    step=5,
-                    value=80,
-                    marks=None,
-                    tooltip={"placement": "bottom"},
-                ),
-                html.Br(),
-                html.Label(id="price-label"),
-                dcc.Input(
-                    id="energy-price",
-                    type="number",
-                    value=DEFAULT_FUEL_PRICE,
-                    step=0.01,
-                    style={"width": "150px", "marginLeft": "8px"},
-                ),
-                html.P(
-                    id="price-default-note",
-                    style={"color": "#666", "fontSize": 13, "marginTop": "2px"},
-                ),
-                html.Br(),
-                html.Label("Annual distance (km)"),
-                dcc.Input(
-                    id="annual-distance",
-                    type="number",
-                    value=DEFAULT_ANNUAL_DISTANCE,
-                    step=500,
-                    style={"width": "150px", "marginLeft": "8px"},
-                ),
-                html.P(
-                    f"Default is {DEFAULT_ANNUAL_DISTANCE:,} km/year",
-                    style={"color": "#666", "fontSize": 13, "marginTop": "2px"},
-                ),
-                html.Div(id="fuel-cost-output", style={"marginTop": "12px", "fontWeight": "600"}),
-            ],
-        ),
-
-        dcc.Store(id="session-cache", storage_type="memory"),
-    ],
-)
+def layout(**kwargs):
+    # A function so the "last updated" line follows live data refreshes.
+    return html.Div(
+        style={"maxWidth": 960, "margin": "40px auto", "fontFamily": "system-ui, sans-serif"},
+        children=[
+            html.H1("Car Search"),
+            html.P("Explore detailed car profiles and estimated annual fuel costs."),
+            html.P(last_updated(), style={"color": "#666", "fontStyle": "italic"}),
+
+            # ---------- Selection ----------
+            html.Div([
+                html.Label("Vehicle Type:"),
+                dcc.Dropdown(id="vehicle-type", options=vehicle_options, value="conventional", clearable=False),
+            ]),
+            html.Br(),
+            html.Div([
+                html.Label("Model Year:"),
+                dcc.Dropdown(id="year-dropdown", placeholder="Select a year"),
+            ]),
+            html.Br(),
+            html.Div([
+                html.Label("Make:"),
+                dcc.Dropdown(id="make-dropdown", placeholder="Select a make"),
+            ]),
+            html.Br(),
+            html.Div([
+                html.Label("Vehicle Class:"),
+                dcc.Dropdown(id="class-dropdown", placeholder="Select a vehicle class"),
+            ]),
+            html.Br(),
+            html.Div([
+                html.Label("Model:"),
+                dcc.Dropdown(id="model-dropdown", placeholder="Select a model"),
+            ]),
+            html.Br(),
+            html.Button("Get Summary", id="go", n_clicks=0),
+            html.Div(id="generate-status", style={"color": "#666", "marginTop": "8px"}),
+            html.Hr(),
+
+            html.Div(id="summary-block"),
+            html.Div(id="price-block", style={"marginTop": "20px"}),
+            html.Div(id="kpi-block", style={"marginTop": "20px"}),
+
+            # ---------- Estimator ----------
+            html.Div(
+                id="fuel-section",
+                style={"display": "none"},
+                children=[
+                    html.H3("Annual Energy Cost Estimator"),
+                    html.Label("City driving ratio (%)"),
+                    dcc.Slider(
+                        id="city-ratio",
+                        min=0,
+                        max=100,
+                        step=5,
+                        value=DEFAULT_CITY_RATIO,
+                        marks=None,
+                        tooltip={"placement": "bottom"},
+                    ),
+                    html.Br(),
+                    html.Label(id="price-label"),
+                    dcc.Input(
+                        id="energy-price",
+                        type="number",
+                        value=DEFAULT_FUEL_PRICE,
+                        step=0.01,
+                        style={"width": "150px", "marginLeft": "8px"},
+                    ),
+                    html.P(
+                        id="price-default-note",
+                        style={"color": "#666", "fontSize": 13, "marginTop": "2px"},
+                    ),
+                    html.Br(),
+                    html.Label("Annual distance (km)"),
+                    dcc.Input(
+                        id="annual-distance",
+                        type="number",
+                        value=DEFAULT_ANNUAL_KM,
+                        step=500,
+                        style={"width": "150px", "marginLeft": "8px"},
+                    ),
+                    html.P(
+                        f"Default is {DEFAULT_ANNUAL_KM:,} km/year",
+                        style={"color": "#666", "fontSize": 13, "marginTop": "2px"},
+                    ),
+                    html.Div(id="fuel-cost-output", style={"marginTop": "12px", "fontWeight": "600"}),
+                ],
+            ),
+
+            # ---------- Similar vehicles ----------
+            html.Div(
+                id="similar-section",
+                style={"display": "none"},
+                children=[
+                    html.H3("Similar Vehicles"),
+                    dcc.RadioItems(
+                        id="similar-mode",
+                        options=[{"label": label, "value": mode} for mode, label in SIMILAR_MODES.items()],
+                        value="like",
+                        inline=True,
+                        inputStyle={"marginRight": "6px", "marginLeft": "14px"},
+                    ),
+                    html.Div(id="similar-block", style={"marginTop": "12px"}),
+                ],
+            ),
+
+            # ---------- Cost of ownership ----------
+            html.Div(
+                id="tco-section",
+                style={"display": "none"},
+                children=[
+                    html.H3("Energy Cost Over the Years"),
+                    html.P(
+                        "10,000 simulated futures with uncertain energy prices, yearly distance "
+                        "and city share, starting from the price and distance above.",
+                        style={"color": "#666", "fontSize": 13},
+                    ),
+                    html.Label("Years"),
+                    dcc.Slider(id="tco-years", min=1, max=15, step=1, value=8, marks=None,
+                               tooltip={"placement": "bottom"}),
+                    html.Label("City share range (%)"),
+                    dcc.RangeSlider(id="tco-city-range", min=0, max=100, step=5, value=[60, 90], marks=None,
+                                    tooltip={"placement": "bottom"}),
+                    html.Label("Fuel price growth (%/year)"),
+                    dcc.Input(id="tco-fuel-growth", type="number", value=2, step=0.5,
+                              style={"width": "80px", "marginLeft": "8px", "marginRight": "20px"}),
+                    html.Label("Electricity price growth (%/year)"),
+                    dcc.Input(id="tco-electricity-growth", type="number", value=2, step=0.5,
+                              style={"width": "80px", "marginLeft": "8px"}),
+                    dcc.Checklist(
+                        id="tco-compare",
+                        options=[{"label": "Compare with the similar vehicles", "value": "compare"}],
+                        value=[],
+                        inputStyle={"marginRight": "6px"},
+                        style={"marginTop": "10px"},
+                    ),
+                    dcc.Graph(id="tco-bands"),
+                    dcc.Graph(id="tco-sensitivity"),
+                ],
+            ),
+
+            dcc.Store(id="session-cache", storage_type="memory"),
+            dcc.Store(id="selection-token", storage_type="memory"),
+        ],
+    )
 
 # ---------- Callbacks ----------
 
@@ -280,32 +224,53 @@ def reset_dropdowns_on_dataset_change(vehicle_type):
     return None, None, None, None
 
 
+# Version the selection: every change issues a new token and supersedes the
+# previous one, so in-flight summary jobs for the old vehicle stop early.
 @callback(
+    Output("selection-token", "data"),
+    Output("summary-block", "children", allow_duplicate=True),
+    Output("price-block", "children", allow_duplicate=True),
+    Output("kpi-block", "children", allow_duplicate=True),
+    Output("session-cache", "data", allow_duplicate=True),
+    Output("fuel-section", "style", allow_duplicate=True),
+    Input("vehicle-type", "value"),
+    Input("year-dropdown", "value"),
+    Input("make-dropdown", "value"),
+    Input("class-dropdown", "value"),
+    Input("model-dropdown", "value"),
+    State("selection-token", "data"),
+    prevent_initial_call=True,
+)
+def version_selection(vehicle_type, year, make, vehicle_class, model, previous):
+    if previous:
+        supersede(previous.get("token"))
+    selection = {"token": new_request_token(), "selection": [vehicle_type, year, make, vehicle_class, model]}
+    return selection, "", "", "", None, {"display": "none"}
+
+
+@memoized_callback(
     Output("year-dropdown", "options"),
     Input("vehicle-type", "value"),
 )
 def update_years(vehicle_type):
-    df = CACHED_DATA.get(vehicle_type, pd.DataFrame())
-    if "model_year" in df.columns:
-        years = sorted(df["model_year"].dropna().unique().tolist())
-        return [{"label": str(y), "value": str(y)} for y in years]
-    return []
+    if not vehicle_type:
+        return []
+    years = catalog_index().distinct("model_year", vehicle_type=vehicle_type)
+    return [{"label": str(y), "value": str(y)} for y in years]
 
 
-@callback(
+@memoized_callback(
     Output("make-dropdown", "options"),
     Input("year-dropdown", "value"),
     State("vehicle-type", "value"),
 )
 def update_makes(year, vehicle_type):
-    if not year:
+    if not (year and vehicle_type):
         return []
-    df = CACHED_DATA.get(vehicle_type, pd.DataFrame())
-    df = df[df["model_year"].astype(str) == str(year)]
-    makes = sorted(df["make"].dropna().unique().tolist()) if "make" in df.columns else []
+    makes = catalog_index().distinct("make", vehicle_type=vehicle_type, year=year)
     return [{"label": m, "value": m} for m in makes]
 
-@callback(
+@memoized_callback(
     Output("class-dropdown", "options"),
     Input("make-dropdown", "value"),
     State("year-dropdown", "value"),
@@ -313,17 +278,13 @@ def update_makes(year, vehicle_type):
 )
 def update_vehicle_classes(make, year, vehicle_type):
     """Populate available vehicle classes for the chosen year & make."""
-    if not (make and year):
+    if not (make and year and vehicle_type):
         return []
-    df = CACHED_DATA.get(vehicle_type, pd.DataFrame())
-    df = df[(df["model_year"].astype(str) == str(year)) & (df["make"] == make)]
-    if "vehicle_class" in df.columns:
-        classes = sorted(df["vehicle_class"].dropna().unique().tolist())
-        return [{"label": c, "value": c} for c in classes]
-    return []
+    classes = catalog_index().distinct("vehicle_class", vehicle_type=vehicle_type, year=year, make=make)
+    return [{"label": c, "value": c} for c in classes]
 
 
-@callback(
+@memoized_callback(
     Output("model-dropdown", "options"),
     Input("class-dropdown", "value"),
     State("make-dropdown", "value"),
@@ -332,13 +293,10 @@ def update_vehicle_classes(make, year, vehicle_type):
 )
 def update_models(vehicle_class, make, year, vehicle_type):
     """Populate model dropdown filtered by year, make, and vehicle class."""
-    if not (make and year):
+    if not (make and year and vehicle_type):
         return []
-    df = CACHED_DATA.get(vehicle_type, pd.DataFrame())
-    df = df[(df["model_year"].astype(str) == str(year)) & (df["make"] == make)]
-    if vehicle_class:
-        df = df[df["vehicle_class"] == vehicle_class]
-    models = sorted(df["model"].dropna().unique().tolist()) if "model" in df.columns else []
+    models = catalog_index().distinct("model", vehicle_type=vehicle_type, year=year, make=make,
+                                      vehicle_class=vehicle_class)
     return [{"label": m, "value": m} for m in models]
 
 
@@ -356,25 +314,55 @@ def update_models(vehicle_class, make, year, vehicle_type):
     State("year-dropdown", "value"),
     State("make-dropdown", "value"),
     State("model-dropdown", "value"),
+    State("selection-token", "data"),
     prevent_initial_call=True,
+    # LLM calls run as a background job; changing the selection cancels it.
+    background=True,
+    running=[(Output("go", "disabled"), True, False)],
+    progress=[Output("generate-status", "children")],
+    progress_default=[""],
+    cancel=[
+        Input("vehicle-type", "value"),
+        Input("year-dropdown", "value"),
+        Input("make-dropdown", "value"),
+        Input("class-dropdown", "value"),
+        Input("model-dropdown", "value"),
+    ],
 )
-def handle_generate(n, vehicle_type, year, make, model):
+def handle_generate(set_progress, n, vehicle_type, year, make, model, selection):
     if not (year and make and model):
         return (
             html.P("Please select Year, Make, and Model."),
             "", "", {"display": "none"}, no_update, "", no_update, ""
         )
+    token = (selection or {}).get("token")
+    # A queued job may start after the user already moved on: skip even the first call.
+    ensure_current(token)
+
+    # Under overload the ticket is shed and the tasks come from cached or data-derived answers.
+    with admit("generate") as ticket:
+        set_progress("Writing summary… (1/3)")
+        summary_text = get_vehicle_summary(make, model, year, ticket)
+
+        ensure_current(token)
+        set_progress("Estimating prices… (2/3)")
+        price_info = get_vehicle_price(make, model, year, ticket)
+        # Use price_info context for better "value" estimation
+        price_context = f"{price_info['retail_text']} | {price_info['used_text']}"
+
+        ensure_current(token)
+        set_progress("Scoring vehicle… (3/3)")
+        kpi_data = get_vehicle_kpis(make, model, year, price_context, ticket)
 
     # --- Summary
-    summary_text = get_vehicle_summary(make, model, year)
     summary_children = [
         html.H3(f"{year} {make} {model}"),
         html.P(summary_text)
     ]
+    if ticket.degraded:
+        summary_children.append(html.P(ticket.notice(), style={"color": "#8a6d3b", "fontSize": 13}))
 
-     # --- Price
-    price_info = get_vehicle_price(make, model, year)
-
+    # --- Price
     price_block = html.Div([
         html.H4("Price Estimates"),
         html.P(price_info["retail_text"], style={"fontWeight": "600", "marginBottom": "4px"}),
@@ -382,10 +370,6 @@ def handle_generate(n, vehicle_type, year, make, model):
     ])
 
     # --- KPIs
-    # Use price_info context for better "value" estimation
-    price_context = f"{price_info['retail_text']} | {price_info['used_text']}"
-    kpi_data = get_vehicle_kpis(make, model, year, price_context)
-
     def color_for_score(score: float) -> str:
         """Return color hex based on score range."""
         try:
@@ -464,7 +448,15 @@ def handle_generate(n, vehicle_type, year, make, model):
         default_note = f"Default is {DEFAULT_FUEL_PRICE:.2f} CAD/L"
         price_value = DEFAULT_FUEL_PRICE
 
-    cache_payload = {"vehicle_type": vehicle_type, "year": year, "make": make, "model": model}
+    cache_payload = {
+        "vehicle_type": vehicle_type, "year": year, "make": make, "model": model, "token": token,
+        # Consumption coefficients for the clientside cost estimator, or what it shows without them.
+        "coefficients": vehicle_coefficients(vehicle_type, year, make, model),
+        "unavailable": energy_unavailable_text(vehicle_type, year, make, model),
+    }
+
+    # Late result for a selection the user already left: discard it.
+    ensure_current(token)
 
     return (
         summary_children,
@@ -478,47 +470,178 @@ def handle_generate(n, vehicle_type, year, make, model):
     )
 
 
-@callback(
+def energy_unavailable_text(vehicle_type, year, make, model) -> str:
+    """Estimator message for a vehicle that is missing or has no usable consumption."""
+    if vehicle_registry().find(vehicle_type, year, make, model) is None:
+        return "Energy data unavailable."
+    if vehicle_type == "bev":
+        return "Electricity data unavailable."
+    return "Fuel data unavailable."
+
+
+# Slider drags and keystrokes are priced in the browser from the coefficients
+# stored in session-cache; everything the estimator needs is already there.
+clientside_callback(
+    """
+    function(cityRatio, energyPrice, annualDistance, cache) {
+        const noUpdate = window.dash_clientside.no_update;
+        if (!cache) {
+            return "";
+        }
+        const coef = cache.coefficients;
+        if (!coef) {
+            return cache.unavailable || "Energy data unavailable.";
+        }
+        if (cityRatio == null || energyPrice == null || annualDistance == null) {
+            return noUpdate;
+        }
+        const ratio = cityRatio / 100;
+        const cost = (annualDistance / 100) * (ratio * coef.city + (1 - ratio) * coef.highway) * energyPrice;
+        const amount = Math.round(cost).toLocaleString("en-US");
+        const price = Number(energyPrice).toFixed(2);
+        if (coef.unit === "kWh") {
+            return `Estimated annual charging cost: $${amount} CAD (at ${price} CAD/kWh)`;
+        }
+        return `Estimated annual fuel cost: $${amount} CAD (at ${price} CAD/L)`;
+    }
+    """,
     Output("fuel-cost-output", "children"),
     Input("city-ratio", "value"),
     Input("energy-price", "value"),
     Input("annual-distance", "value"),
-    State("session-cache", "data"),
+    Input("session-cache", "data"),
+)
+
+
+# Nearest neighbours on spec vectors (core.similar): no LLM call, so this
+# runs inline and follows the mode toggle instantly.
+@callback(
+    Output("similar-section", "style"),
+    Output("similar-block", "children"),
+    Input("session-cache", "data"),
+    Input("similar-mode", "value"),
 )
-def update_energy_cost(city_ratio, energy_price, annual_distance, cache):
+def update_similar(cache, mode):
     if not cache:
-        return ""
-    vt, year, make, model = cache["vehicle_type"], cache["year"], cache["make"], cache["model"]
-    df = CACHED_DATA.get(vt, pd.DataFrame())
-    df = df[(df["model_year"].astype(str) == str(year)) & (df["make"] == make) & (df["model"] == model)]
-    if df.empty:
-        return "Energy data unavailable."
+        return {"display": "none"}, ""
+    registry = vehicle_registry()
+    vehicle = registry.find(cache["vehicle_type"], cache["year"], cache["make"], cache["model"])
+    if vehicle is None:
+        return {"display": "none"}, ""
+
+    matches = similar_to(vehicle.position, k=5, mode=mode)
+    if not len(matches):
+        return {"display": "block"}, html.P("No similar vehicles found for this filter.", style={"color": "#666"})
+
+    cards = []
+    for p in matches:
+        match = registry.at(p)
+        # BEVs are rated in kWh; everything else in litres of fuel.
+        rated = match.energy_combined if match.unit == "kWh" else match.consumption
+        cards.append(html.Div(
+            [
+                html.Div(match.display_name, style={"fontWeight": "600"}),
+                html.Div(
+                    f"{rated:.1f} {match.unit}/100 km • ≈ ${match.annual_cost:,.0f} CAD/year • CO₂ {match.co2:.0f} g/km",
+                    style={"color": "#555", "fontSize": "0.9em", "marginTop": "4px"},
+                ),
+            ],
+            style={"border": "1px solid #eaeaea", "borderRadius": "10px", "padding": "10px 14px",
+                   "marginBottom": "8px", "backgroundColor": "#fdfdfd"},
+        ))
+    note = html.P(
+        f"Annual energy cost at {DEFAULT_ANNUAL_KM:,} km, {DEFAULT_CITY_RATIO}% city and default prices. "
+        f"This vehicle: ≈ ${vehicle.annual_cost:,.0f} CAD/year, CO₂ {vehicle.co2:.0f} g/km.",
+        style={"color": "#666", "fontSize": 13},
+    )
+    return {"display": "block"}, [note, *cards]
 
-    city_ratio = city_ratio / 100
-    highway_ratio = 1 - city_ratio
 
-    if vt == "bev":
-        try:
-            city_kwh = float(df["city_(kwh/100_km)"].iloc[0])
-            highway_kwh = float(df["highway_(kwh/100_km)"].iloc[0])
-        except Exception:
-            return "Electricity data unavailable."
+# ---------- Cost of ownership ----------
+TCO_COLORS = ["#2c3e50", "#e67e22", "#27ae60", "#8e44ad"]
 
-        annual_cost = (annual_distance / 100) * (
-            city_ratio * city_kwh * energy_price + highway_ratio * highway_kwh * energy_price
-        )
-        return f"Estimated annual charging cost: ${annual_cost:,.0f} CAD (at {energy_price:.2f} CAD/kWh)"
 
-    try:
-        city_l = float(df["city_(l/100_km)"].iloc[0])
-        highway_l = float(df["highway_(l/100_km)"].iloc[0])
-    except Exception:
-        return "Fuel data unavailable."
+def _rgba(hex_color: str, alpha: float) -> str:
+    r, g, b = (int(hex_color[i:i + 2], 16) for i in (1, 3, 5))
+    return f"rgba({r},{g},{b},{alpha})"
+
+
+@callback(
+    Output("tco-section", "style"),
+    Output("tco-bands", "figure"),
+    Output("tco-sensitivity", "figure"),
+    Input("session-cache", "data"),
+    Input("tco-years", "value"),
+    Input("tco-city-range", "value"),
+    Input("tco-fuel-growth", "value"),
+    Input("tco-electricity-growth", "value"),
+    Input("tco-compare", "value"),
+    Input("similar-mode", "value"),
+    Input("energy-price", "value"),
+    Input("annual-distance", "value"),
+)
+def update_tco(cache, years, city_range, fuel_growth, electricity_growth, compare, mode, energy_price,
+               annual_distance):
+    if not cache:
+        return {"display": "none"}, no_update, no_update
+    registry = vehicle_registry()
+    vehicle = registry.find(cache["vehicle_type"], cache["year"], cache["make"], cache["model"])
+    if vehicle is None or pd.isna(vehicle.city) or pd.isna(vehicle.highway):
+        return {"display": "none"}, no_update, no_update
+
+    vehicles = [vehicle]
+    if compare:
+        vehicles += [registry.at(p) for p in similar_to(vehicle.position, k=3, mode=mode)]
+        vehicles = [v for v in vehicles if not (pd.isna(v.city) or pd.isna(v.highway))]
+
+    # Today's price for the selected vehicle's energy comes from the estimator input.
+    is_bev = vehicle.vehicle_type == "bev"
+    price = energy_price if energy_price and energy_price > 0 else None
+    scenario = Scenario(
+        years=years or 8,
+        fuel_price=price if price and not is_bev else DEFAULT_FUEL_PRICE,
+        electricity_price=price if price and is_bev else DEFAULT_ELECTRICITY_PRICE,
+        fuel_growth=(fuel_growth or 0) / 100,
+        electricity_growth=(electricity_growth or 0) / 100,
+        annual_km=annual_distance if annual_distance and annual_distance > 0 else DEFAULT_ANNUAL_KM,
+        city_ratio=tuple(v / 100 for v in (city_range or [60, 90])),
+    )
+    result = simulate([v.city for v in vehicles], [v.highway for v in vehicles],
+                      [v.vehicle_type == "bev" for v in vehicles], scenario)
+    p5, p25, p50, p75, p95 = result.bands()
+    x = list(range(1, p50.shape[1] + 1))
+
+    bands = go.Figure()
+    for i, v in enumerate(vehicles):
+        color = TCO_COLORS[i % len(TCO_COLORS)]
+        name = v.display_name if len(v.display_name) <= 45 else v.display_name[:44] + "…"
+        for low, high, alpha in ((p5, p95, 0.12), (p25, p75, 0.25)):
+            bands.add_trace(go.Scatter(x=x, y=low[i], mode="lines", line={"width": 0}, showlegend=False,
+                                       hoverinfo="skip", legendgroup=str(i)))
+            bands.add_trace(go.Scatter(x=x, y=high[i], mode="lines", line={"width": 0}, fill="tonexty",
+                                       fillcolor=_rgba(color, alpha), showlegend=False, hoverinfo="skip",
+                                       legendgroup=str(i)))
+        bands.add_trace(go.Scatter(x=x, y=p50[i], mode="lines+markers", name=name, line={"color": color},
+                                   legendgroup=str(i), hovertemplate="Year %{x}: $%{y:,.0f} CAD<extra></extra>"))
+    bands.update_layout(
+        title="Cumulative energy cost: median, 25–75% and 5–95% of futures",
+        xaxis_title="Year", yaxis_title="CAD", legend={"orientation": "h", "y": -0.25},
+        margin={"t": 50, "l": 60, "r": 20},
+    )
 
-    annual_fuel_cost = (annual_distance / 100) * (
-        city_ratio * city_l * energy_price + highway_ratio * highway_l * energy_price
+    swings = result.sensitivity()
+    names = [v.display_name[:30] for v in vehicles]
+    sensitivity = go.Figure(go.Heatmap(
+        z=[[swings[driver][i] for driver in DRIVERS] for i in range(len(vehicles))],
+        x=list(DRIVERS), y=names, colorscale="Oranges",
+        text=[[f"${swings[driver][i]:,.0f}" for driver in DRIVERS] for i in range(len(vehicles))],
+        texttemplate="%{text}", hovertemplate="%{y}<br>%{x}: %{text}<extra></extra>", showscale=False,
+    ))
+    sensitivity.update_layout(
+        title=f"What moves the {len(x)}-year cost: 10th → 90th percentile of each driver",
+        yaxis={"autorange": "reversed"}, height=140 + 45 * len(vehicles), margin={"t": 50, "l": 220, "r": 20},
     )
-    return f"Estimated annual fuel cost: ${annual_fuel_cost:,.0f} CAD (at {energy_price:.2f} CAD/L)"
+    return {"display": "block"}, bands, sensitivity
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,155 @@
+import base64
+import io
+
+from dash import html, dcc, callback, Input, Output, State, no_update, register_page
+
+from core.costs import DEFAULT_ELECTRICITY_PRICE, DEFAULT_FUEL_PRICE
+from core.fleet import (
+    combine_summaries,
+    iter_estimates,
+    summarize,
+)
+
+register_page(__name__, path="/fleet", name="Fleet Calculator")
+
+PREVIEW_ROWS = 10
+PREVIEW_COLUMNS = ["display_name", "annual_km", "city_ratio", "annual_energy", "energy_unit",
+                   "annual_cost_cad", "annual_co2_kg"]
+
+EXAMPLE_CSV = """year,make,model,_id,annual_km,city_ratio
+2022,Toyota,RAV4 Sport utility vehicle: Small 2.5L 4 Cyl Automatic 8-Gear,,20000,60
+2020,,,25628,12000,80"""
+
+
+# --- Layout ---
+layout = html.Div(
+    [
+        html.H2(
+            "🚚 Fleet Calculator",
+            style={"textAlign": "center", "fontWeight": "700", "fontSize": "2.2rem", "color": "#2c3e50"},
+        ),
+        html.P(
+            "Upload a CSV of your fleet to estimate the annual energy cost and CO₂ of every vehicle at once.",
+            style={"textAlign": "center", "fontSize": "1.1rem", "marginBottom": "20px", "color": "#555"},
+        ),
+        html.Div(
+            [
+                html.P("Identify each vehicle by year, make and model (as shown in Car Search), by _id (optionally "
+                       "with year), or by vehicle_key. Optional columns: annual_km (default 15,000) and "
+                       "city_ratio in percent (default 80)."),
+                html.Pre(EXAMPLE_CSV, style={"backgroundColor": "#f8f9fa", "padding": "10px", "borderRadius": "8px"}),
+                html.P("Large files can also be POSTed to /fleet/estimate.csv, which streams the results back.",
+                       style={"color": "#666", "fontSize": 13}),
+            ],
+            style={"textAlign": "left", "maxWidth": "750px", "margin": "0 auto 20px auto"},
+        ),
+
+        html.Div(
+            [
+                html.Label("Fuel price (CAD per litre):"),
+                dcc.Input(id="fleet-fuel-price", type="number", value=DEFAULT_FUEL_PRICE, step=0.01,
+                          style={"width": "120px", "marginLeft": "8px", "marginRight": "24px"}),
+                html.Label("Electricity price (CAD per kWh):"),
+                dcc.Input(id="fleet-electricity-price", type="number", value=DEFAULT_ELECTRICITY_PRICE, step=0.01,
+                          style={"width": "120px", "marginLeft": "8px"}),
+            ],
+            style={"marginBottom": "16px"},
+        ),
+        dcc.Upload(
+            id="fleet-upload",
+            children=html.Div(["Drag and drop or ", html.A("select a fleet CSV")]),
+            multiple=False,
+            accept=".csv,text/csv",
+            style={
+                "border": "2px dashed #bbb",
+                "borderRadius": "12px",
+                "padding": "30px",
+                "backgroundColor": "#fafafa",
+                "cursor": "pointer",
+            },
+        ),
+        html.Div(id="fleet-filename", style={"color": "#666", "marginTop": "8px"}),
+        html.Button("Calculate & Download", id="fleet-go", n_clicks=0, style={"marginTop": "16px"}),
+
+        dcc.Loading(html.Div(id="fleet-summary", style={"marginTop": "24px"})),
+        dcc.Download(id="fleet-download"),
+    ],
+    style={"padding": "30px", "backgroundColor": "#ffffff", "fontFamily": "Inter, system-ui, sans-serif"},
+)
+
+
+# --- Helpers ---
+def render_summary(summary, preview):
+    stats = [
+        ("Vehicles", f"{summary['vehicles']:,}"),
+        ("Matched", f"{summary['matched']:,}"),
+        ("Annual energy cost", f"${summary['annual_cost_cad']:,.0f} CAD"),
+        ("Annual CO₂", f"{summary['annual_co2_kg'] / 1000:,.1f} t"),
+    ]
+    cards = [
+        html.Div(
+            [html.Div(label, style={"color": "#777", "fontSize": "0.9rem"}), html.H4(value, style={"margin": "4px 0"})],
+            style={"border": "1px solid #eaeaea", "borderRadius": "12px", "padding": "12px 16px",
+                   "flex": "1 1 180px", "backgroundColor": "#fdfdfd"},
+        )
+        for label, value in stats
+    ]
+    notes = []
+    if summary["unmatched"]:
+        notes.append(html.P(f"{summary['unmatched']:,} rows did not match a catalog vehicle; "
+                            "they are flagged with matched=False in the download.", style={"color": "#c0392b"}))
+
+    header = html.Tr([html.Th(c) for c in PREVIEW_COLUMNS])
+    body = [html.Tr([html.Td(row[c]) for c in PREVIEW_COLUMNS]) for row in preview]
+    table = html.Table([html.Thead(header), html.Tbody(body)],
+                       style={"width": "100%", "fontSize": "0.85rem", "marginTop": "16px", "textAlign": "left"})
+
+    return [html.Div(cards, style={"display": "flex", "gap": "12px", "flexWrap": "wrap"}), *notes,
+            html.H5(f"First {len(preview)} rows", style={"marginTop": "20px"}), table]
+
+
+# --- Callbacks ---
+@callback(
+    Output("fleet-filename", "children"),
+    Input("fleet-upload", "filename"),
+)
+def show_filename(filename):
+    return f"Selected: {filename}" if filename else ""
+
+
+@callback(
+    Output("fleet-summary", "children"),
+    Output("fleet-download", "data"),
+    Input("fleet-go", "n_clicks"),
+    State("fleet-upload", "contents"),
+    State("fleet-upload", "filename"),
+    State("fleet-fuel-price", "value"),
+    State("fleet-electricity-price", "value"),
+    prevent_initial_call=True,
+)
+def calculate_fleet(n, contents, filename, fuel_price, electricity_price):
+    if not contents:
+        return html.P("Please upload a fleet CSV first."), no_update
+
+    _, encoded = contents.split(",", 1)
+    source = io.BytesIO(base64.b64decode(encoded))
+    fuel_price = fuel_price if fuel_price is not None else DEFAULT_FUEL_PRICE
+    electricity_price = electricity_price if electricity_price is not None else DEFAULT_ELECTRICITY_PRICE
+
+    # Chunks are summarized and serialized as they come, so only one chunk
+    # of estimates is held in memory at a time.
+    out, summaries, preview = io.StringIO(), [], []
+    try:
+        for i, result in enumerate(iter_estimates(source, fuel_price, electricity_price)):
+            summaries.append(summarize(result))
+            if len(preview) < PREVIEW_ROWS:
+                preview.extend(result[PREVIEW_COLUMNS].head(PREVIEW_ROWS - len(preview)).to_dict("records"))
+            result.to_csv(out, index=False, header=(i == 0))
+    except Exception as e:
+        return html.P(f"Could not read the fleet file: {e}", style={"color": "#c0392b"}), no_update
+
+    name = (filename or "fleet.csv").rsplit(".", 1)[0]
+    return (
+        render_summary(combine_summaries(summaries), preview),
+        dcc.send_string(out.getvalue(), f"{name}_estimates.csv"),
+    )
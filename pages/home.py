@@ -75,7 +75,22 @@ layout = html.Div(
                     style={"textAlign": "left", "maxWidth": "700px", "margin": "auto", "marginBottom": "30px"},
                 ),
 
-                # 3️⃣ Find Your Car (LLM assistant)
+                # 3️⃣ Market Analysis
+                html.Div(
+                    [
+                        html.H3("📈 Market Analysis"),
+                        html.P(
+                            "Follow how CO₂ emissions, fuel consumption and the share of electric and plug-in hybrid "
+                            "models have changed from 2012 to 2025, by make, vehicle class and fuel type."
+                        ),
+                        html.P(
+                            "👉 Tip: Pick a breakdown to compare classes or fuel types, then drill down into a single year."
+                        ),
+                    ],
+                    style={"textAlign": "left", "maxWidth": "700px", "margin": "auto", "marginBottom": "30px"},
+                ),
+
+                # 4️⃣ Find Your Car (LLM assistant)
                 html.Div(
                     [
                         html.H3("🤖 Find Your Car (AI Assistant)"),
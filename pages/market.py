@@ -0,0 +1,168 @@
+import plotly.graph_objects as go
+from dash import html, dcc, Input, Output, register_page
+
+from core.cube import FUEL_LABELS, dimension_values, slice_cube
+from core.memo import memoized_callback
+
+register_page(__name__, path="/market-analysis", name="Market Analysis")
+
+# All charts read from the precomputed cube in core/cube.py; nothing here
+# aggregates the raw datasets.
+
+METRICS = {
+    "co2_mean": "Average CO₂ (g/km)",
+    "co2_p50": "Median CO₂ (g/km)",
+    "co2_p90": "90th percentile CO₂ (g/km)",
+    "consumption_mean": "Average consumption (L or Le/100 km)",
+    "bev_share": "Share of battery electric (BEV)",
+    "phev_share": "Share of plug-in hybrids (PHEV)",
+    "count": "Number of models",
+}
+SHARE_METRICS = {"bev_share", "phev_share"}
+
+BREAKDOWNS = {
+    "": "No breakdown",
+    "vehicle_class": "Vehicle class",
+    "fuel_type": "Fuel type",
+    "make": "Make",
+}
+MAX_SERIES = 8   # keep breakdown charts readable
+
+
+def _options(dim):
+    values = dimension_values(dim)
+    if dim == "fuel_type":
+        return [{"label": FUEL_LABELS.get(v, v), "value": v} for v in values]
+    return [{"label": str(v), "value": v} for v in values]
+
+
+def _label(dim, value):
+    return FUEL_LABELS.get(value, value) if dim == "fuel_type" else str(value)
+
+
+def _format_axis(fig, metric):
+    fig.update_layout(
+        margin={"l": 40, "r": 20, "t": 40, "b": 40},
+        plot_bgcolor="#ffffff",
+        legend={"orientation": "h", "y": -0.2},
+        yaxis_title=METRICS[metric],
+    )
+    if metric in SHARE_METRICS:
+        fig.update_yaxes(tickformat=".0%")
+    return fig
+
+
+# --- Layout ---
+def layout(**kwargs):
+    years = dimension_values("model_year")
+    return html.Div(
+        [
+            html.H2(
+                "📈 Market Analysis",
+                style={"textAlign": "center", "fontWeight": "700", "fontSize": "2.2rem", "color": "#2c3e50"},
+            ),
+            html.P(
+                "Trends in efficiency, emissions and electrification across model years. "
+                "Conventional vehicles are covered from 2015; plug-in hybrids and EVs from 2012.",
+                style={"textAlign": "center", "fontSize": "1.1rem", "marginBottom": "30px", "color": "#555"},
+            ),
+
+            # Controls
+            html.Div(
+                [
+                    html.Div([
+                        html.Label("Metric"),
+                        dcc.Dropdown(id="market-metric", options=[{"label": v, "value": k} for k, v in METRICS.items()],
+                                     value="co2_mean", clearable=False),
+                    ], style={"flex": "1 1 260px"}),
+                    html.Div([
+                        html.Label("Break down by"),
+                        dcc.Dropdown(id="market-breakdown", options=[{"label": v, "value": k} for k, v in BREAKDOWNS.items()],
+                                     value="", clearable=False),
+                    ], style={"flex": "1 1 200px"}),
+                ],
+                style={"display": "flex", "gap": "16px", "flexWrap": "wrap", "textAlign": "left"},
+            ),
+            html.Div(
+                [
+                    html.Div([
+                        html.Label("Make"),
+                        dcc.Dropdown(id="market-make", options=_options("make"), placeholder="All makes"),
+                    ], style={"flex": "1 1 200px"}),
+                    html.Div([
+                        html.Label("Vehicle class"),
+                        dcc.Dropdown(id="market-class", options=_options("vehicle_class"), placeholder="All classes"),
+                    ], style={"flex": "1 1 200px"}),
+                    html.Div([
+                        html.Label("Fuel type"),
+                        dcc.Dropdown(id="market-fuel", options=_options("fuel_type"), placeholder="All fuel types"),
+                    ], style={"flex": "1 1 200px"}),
+                ],
+                style={"display": "flex", "gap": "16px", "flexWrap": "wrap", "textAlign": "left", "marginTop": "12px"},
+            ),
+
+            dcc.Graph(id="market-trend", style={"marginTop": "20px"}),
+
+            # Drill-down for one year
+            html.Div(
+                [
+                    html.Label("Drill down into model year:"),
+                    dcc.Dropdown(id="market-year", options=[{"label": str(y), "value": y} for y in years],
+                                 value=years[-1], clearable=False, style={"width": "200px"}),
+                ],
+                style={"display": "flex", "alignItems": "center", "gap": "12px", "justifyContent": "center",
+                       "marginTop": "20px"},
+            ),
+            dcc.Graph(id="market-drilldown"),
+        ],
+        style={"padding": "30px", "backgroundColor": "#ffffff", "fontFamily": "Inter, system-ui, sans-serif"},
+    )
+
+
+# --- Callbacks ---
+@memoized_callback(
+    Output("market-trend", "figure"),
+    Input("market-metric", "value"),
+    Input("market-breakdown", "value"),
+    Input("market-make", "value"),
+    Input("market-class", "value"),
+    Input("market-fuel", "value"),
+)
+def update_trend(metric, breakdown, make, vehicle_class, fuel_type):
+    filters = {"make": make, "vehicle_class": vehicle_class, "fuel_type": fuel_type}
+    group_by = ["model_year"] + ([breakdown] if breakdown else [])
+    cells = slice_cube(group_by, filters)
+
+    fig = go.Figure()
+    if breakdown:
+        # Largest series first; the rest would only clutter the chart.
+        totals = cells.groupby(breakdown, observed=True)["count"].sum().nlargest(MAX_SERIES)
+        for value in totals.index:
+            series = cells[cells[breakdown] == value]
+            fig.add_trace(go.Scatter(x=series["model_year"], y=series[metric], mode="lines+markers",
+                                     name=_label(breakdown, value)))
+    else:
+        fig.add_trace(go.Scatter(x=cells["model_year"], y=cells[metric], mode="lines+markers", name=METRICS[metric]))
+
+    fig.update_layout(title=f"{METRICS[metric]} by model year")
+    return _format_axis(fig, metric)
+
+
+@memoized_callback(
+    Output("market-drilldown", "figure"),
+    Input("market-year", "value"),
+    Input("market-metric", "value"),
+    Input("market-breakdown", "value"),
+    Input("market-make", "value"),
+    Input("market-class", "value"),
+    Input("market-fuel", "value"),
+)
+def update_drilldown(year, metric, breakdown, make, vehicle_class, fuel_type):
+    # Without an explicit breakdown, compare makes within the year.
+    dim = breakdown or "make"
+    filters = {"model_year": year, "make": make, "vehicle_class": vehicle_class, "fuel_type": fuel_type}
+    cells = slice_cube([dim], filters).sort_values(metric, ascending=False).head(20)
+
+    fig = go.Figure(go.Bar(x=[_label(dim, v) for v in cells[dim]], y=cells[metric], marker_color="#2c3e50"))
+    fig.update_layout(title=f"{METRICS[metric]} in {year} by {BREAKDOWNS[dim].lower()}")
+    return _format_axis(fig, metric)
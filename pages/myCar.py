@@ -8,70 +8,57 @@
 # ])
 
 # myCar.py
-import os
 import json
 import re
 from typing import List, Dict, Any, Optional
 
-from dash import no_update
+from dash import Patch, no_update
 from dash import html, dcc, Input, Output, State, callback, register_page
-from openai import OpenAI
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-register_page(__name__, path="/myCar", name="Find My Car")
-
-# --------------------------
-# Enhanced System Prompt
-# --------------------------
-SYSTEM_PROMPT = """
-You are CarAdvisor — a specialized automotive consultant who helps users choose, compare, and inspect cars for purchase in a natural multi-turn chat.
-
-You must:
-1. Extract and remember user preferences (seats, performance, use case, price, fuel type, brand, drive type, transmission, range, maintenance, cargo space, climate).
-2. If any information is missing, ask the most relevant 1–2 clarifying questions.
-3. When ready, provide EXACTLY 5 recommendations in this JSON format:
-
-{
-  "recommendations": [
-    {
-      "rank": 1,
-      "model": "Toyota RAV4 Hybrid",
-      "manufacturer": "Toyota",
-      "year": 2025,
-      "category": "SUV",
-      "fuel_type": "Hybrid Gasoline",
-      "price_range": "Used: $25,000–$35,000 | New: $38,000–$45,000",
-      "seats": 5,
-      "transmission": "Automatic",
-      "engine": "2.5L I4 Hybrid",
-      "max_speed": "180 km/h",
-      "fuel_consumption": "5.8 L/100 km",
-      "region_availability": ["North America", "Europe", "Asia"],
-      "rationale": "Reliable, efficient family SUV ideal for city and long-range travel."
-    },
-    ...
-  ]
-}
+from core.admission import admit
+from core.llm import llm
+from core.prompts import CHAT_SYSTEM
+from core.records import vehicle_registry
+from core.embeddings import chat_candidates
 
-Guidelines:
-- Always include `price_range`, `seats`, `transmission`, `engine`, `max_speed`, and `fuel_consumption` (or electric consumption if EV).
-- Be realistic and concise. You may estimate reasonable ranges if unknown.
-- If comparing multiple cars, use short comparison summaries.
-- If unclear about user intent, ask follow-up questions before listing.
+register_page(__name__, path="/myCar", name="Find My Car")
 
-Tone: friendly, expert, and professional.
-"""
+CANDIDATE_COUNT = 10
+POWERTRAIN_LABELS = {"conventional": "gas/diesel", "phev": "plug-in hybrid", "bev": "electric"}
 
 # --------------------------
 # Helper Functions
 # --------------------------
-def call_llm(messages: List[Dict[str, str]]) -> str:
-    resp = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.7,
-        messages=messages
-    )
-    return resp.choices[0].message.content.strip()
+def call_llm(messages: List[Dict[str, str]], ticket=None) -> str:
+    # OpenAI, a local model or catalog-only picks, whichever is healthy (core.llm).
+    return llm().chat(messages, ticket=ticket)
+
+def catalog_candidates(conv: List[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """
+    System note listing real catalog vehicles that fit what the user has asked
+    for so far (spec-vector neighbours fused with embedding hits, see
+    core.embeddings.chat_candidates), retrieved locally before the LLM call
+    so it picks from actual NRCan models instead of inventing them.
+    """
+    user_text = " ".join(m["content"] for m in conv if m["role"] == "user")
+    positions = chat_candidates(user_text, k=CANDIDATE_COUNT)
+    if not len(positions):
+        return None
+
+    registry = vehicle_registry()
+    lines = []
+    for v in map(registry.at, positions):
+        unit = "Le/100 km" if v.vehicle_type == "bev" else "L/100 km"
+        lines.append(
+            f"- {v.display_name} ({POWERTRAIN_LABELS[v.vehicle_type]}; "
+            f"{v.consumption:.1f} {unit} combined; CO2 {v.co2:.0f} g/km; "
+            f"~${v.annual_cost:,.0f} CAD/year energy)"
+        )
+    return {
+        "role": "system",
+        "content": "Real vehicles from the Canadian NRCan fuel consumption catalog that match the request so far. "
+                   "Prefer these when recommending, and use their consumption figures:\n" + "\n".join(lines),
+    }
 
 def extract_json_recommendations(text: str) -> Optional[List[Dict[str, Any]]]:
     match = re.search(r"\{.*\}", text, flags=re.DOTALL)
@@ -83,30 +70,30 @@ def extract_json_recommendations(text: str) -> Optional[List[Dict[str, Any]]]:
     except Exception:
         return None
 
+def render_bubble(msg: Dict[str, str]) -> Any:
+    align = "right" if msg["role"] == "user" else "left"
+    color = "#e8f0fe" if msg["role"] == "user" else "#ffffff"
+    return html.Div(
+        msg["content"],
+        style={
+            "textAlign": align,
+            "backgroundColor": color,
+            "padding": "10px 14px",
+            "borderRadius": "12px",
+            "margin": "8px 0",
+            "border": "1px solid #ddd",
+            "maxWidth": "75%",
+            "alignSelf": "flex-end" if align == "right" else "flex-start",
+            "whiteSpace": "pre-wrap",
+        },
+    )
+
+def render_notice(text: str) -> Any:
+    return html.Div(text, style={"color": "#8a6d3b", "fontSize": 13, "margin": "0 0 8px 4px",
+                                 "alignSelf": "flex-start"})
+
 def render_chat(history: List[Dict[str, str]]) -> List[Any]:
-    bubbles = []
-    for msg in history:
-        if msg["role"] == "system":
-            continue
-        align = "right" if msg["role"] == "user" else "left"
-        color = "#e8f0fe" if msg["role"] == "user" else "#ffffff"
-        bubbles.append(
-            html.Div(
-                msg["content"],
-                style={
-                    "textAlign": align,
-                    "backgroundColor": color,
-                    "padding": "10px 14px",
-                    "borderRadius": "12px",
-                    "margin": "8px 0",
-                    "border": "1px solid #ddd",
-                    "maxWidth": "75%",
-                    "alignSelf": "flex-end" if align == "right" else "flex-start",
-                    "whiteSpace": "pre-wrap",
-                },
-            )
-        )
-    return bubbles
+    return [render_bubble(msg) for msg in history if msg["role"] != "system"]
 
 def render_recommendation_cards(recs: List[Dict[str, Any]]) -> List[Any]:
     cards = []
@@ -159,6 +146,8 @@ INITIAL_ASSISTANT = (
     "for example, a fast sedan, family SUV, or eco-friendly commuter. "
     "I’ll ask follow-ups if needed and then show you my top 5 picks."
 )
+INITIAL_CONVERSATION = [{"role": "assistant", "content": INITIAL_ASSISTANT}]
+SYSTEM_MESSAGE = {"role": "system", "content": CHAT_SYSTEM}
 
 layout = html.Div(
     [
@@ -174,6 +163,7 @@ layout = html.Div(
             children=[
                 html.Div(
                     id="chat-history",
+                    children=render_chat(INITIAL_CONVERSATION),
                     style={
                         "maxWidth": "800px",
                         "width": "100%",
@@ -200,19 +190,16 @@ layout = html.Div(
                     ],
                     style={"display": "flex", "justifyContent": "center", "alignItems": "center", "marginTop": "12px"},
                 ),
+                html.Div(id="chat-status", style={"textAlign": "center", "color": "#666", "marginTop": "8px"}),
             ],
         ),
 
         html.H4("Recommendations", style={"textAlign": "center", "marginTop": "40px"}),
         html.Div(id="recs-container", style={"maxWidth": "800px", "margin": "0 auto"}),
 
-        dcc.Store(
-            id="conv-store",
-            data=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "assistant", "content": INITIAL_ASSISTANT},
-            ],
-        ),
+        # The conversation without the system prompt, which is added server-side
+        # (it is the same for everyone and would otherwise ride along on every turn).
+        dcc.Store(id="conv-store", data=INITIAL_CONVERSATION),
     ],
     style={
         "display": "flex",
@@ -234,21 +221,41 @@ layout = html.Div(
     State("user-input", "value"),
     State("conv-store", "data"),
     prevent_initial_call=True,
+    # The LLM call runs as a background job so web workers stay responsive.
+    background=True,
+    running=[(Output("send-btn", "disabled"), True, False)],
+    progress=[Output("chat-status", "children")],
+    progress_default=[""],
 )
-def chat_logic(n_clicks, user_msg, conv):
+def chat_logic(set_progress, n_clicks, user_msg, conv):
+    # Append-only: each turn sends the two new bubbles and messages as Patch
+    # operations instead of re-sending the whole chat and conversation.
     if not user_msg:
-        return html.Div(render_chat(conv)), no_update, conv, ""
+        return no_update, no_update, no_update, ""
 
-    conv.append({"role": "user", "content": user_msg})
-    llm_text = call_llm(conv)
+    user = {"role": "user", "content": user_msg}
+    conv = conv + [user]
+    set_progress("CarAdvisor is thinking…")
+    candidates = catalog_candidates(conv)
+    messages = [SYSTEM_MESSAGE, *conv]
+    with admit("chat") as ticket:
+        llm_text = call_llm(messages + [candidates] if candidates else messages, ticket)
     recs = extract_json_recommendations(llm_text)
 
     if recs:
-        conv.append({"role": "assistant", "content": "Here are my top 5 suggestions for you!"})
-        chat_content = render_chat(conv)
+        reply = "Here are my top 5 suggestions for you!"
         rec_cards = render_recommendation_cards(recs)
-        return chat_content, rec_cards, conv, ""
     else:
-        conv.append({"role": "assistant", "content": llm_text})
-        return render_chat(conv), no_update, conv, ""
+        reply = llm_text
+        rec_cards = no_update
+    assistant = {"role": "assistant", "content": reply}
+
+    history, store = Patch(), Patch()
+    history.extend([render_bubble(user), render_bubble(assistant)])
+    # The shed notice is shown under the reply only; kept out of conv-store, it is
+    # never sent back to the LLM and does not change the next turn's dedupe key.
+    if ticket.degraded:
+        history.append(render_notice(ticket.notice()))
+    store.extend([user, assistant])
+    return history, rec_cards, store, ""
 
@@ -1,7 +1,11 @@
-import pandas as pd
-import os
+import math
 import re
-from dash import html, dcc, callback, Input, Output, register_page
+from dash import html, dcc, Input, Output, register_page
+
+from core.awards import award_matches
+from core.data import load_rankings
+from core.memo import memoized_callback
+from core.records import awards_from_frame, vehicle_registry
 
 register_page(__name__, path="/rankings", name="Industry Leaders")
 
@@ -11,13 +15,17 @@ register_page(__name__, path="/rankings", name="Industry Leaders")
 # ])
 
 # Load dataset once (not inside the callback)
-CURRENT_DIR = os.path.dirname(__file__)                         # Get path of current file, without file name pages/
-DATA_DIR = os.path.join(CURRENT_DIR, "..", "data")              # .. is go one up, to fuel_project and add data with join
-df = pd.read_csv(os.path.join(DATA_DIR, "car_rankings.csv"))    # fuel_project/data/'file_name.csv'
+df = load_rankings()
 
 # Get unique years for the dropdown
 years = sorted(df["year"].unique(), reverse=True)
 
+# year -> [(category, [Award, ...]), ...], categories sorted, awards in file order
+AWARDS_BY_YEAR = {}
+for award in awards_from_frame(df):
+    AWARDS_BY_YEAR.setdefault(award.year, {}).setdefault(award.category, []).append(award)
+AWARDS_BY_YEAR = {year: sorted(groups.items()) for year, groups in AWARDS_BY_YEAR.items()}
+
 # --- Category Icons ---
 CATEGORY_ICONS = {
     "Best SUV": "🚙",
@@ -36,6 +44,23 @@ def clean_model_name(model, year):
     return re.sub(rf"\b{year_str}\s+", "", model).strip()
 
 
+# --- Helper: NRCan facts for an award matched to the catalog (python -m core.awards build) ---
+def vehicle_facts(vehicle, approximate: bool):
+    unit = "Le/100 km" if vehicle.vehicle_type == "bev" else "L/100 km"
+    facts = []
+    if not math.isnan(vehicle.consumption):
+        facts.append(f"{vehicle.consumption:.1f} {unit}")
+    if not math.isnan(vehicle.co2):
+        facts.append(f"CO₂ {vehicle.co2:.0f} g/km")
+    if not math.isnan(vehicle.annual_cost):
+        facts.append(f"≈ ${vehicle.annual_cost:,.0f} CAD/year")
+    return [
+        html.P(" • ".join(facts), style={"color": "#2c3e50", "fontSize": "0.9rem", "margin": "8px 0 2px 0"}),
+        html.P(f"{'Closest NRCan match (trim not listed)' if approximate else 'NRCan match'}: {vehicle.display_name}",
+               style={"color": "#999", "fontSize": "0.8rem", "margin": "0"}),
+    ]
+
+
 # --- Layout ---
 layout = html.Div(
     [
@@ -82,26 +107,29 @@ layout = html.Div(
 
 
 # --- Callback ---
-@callback(
+@memoized_callback(
     Output("rankings-content", "children"),
     Input("year-dropdown", "value")
 )
 def display_rankings(selected_year):
-    filtered = df[df["year"] == selected_year]
     sections = []
+    registry = vehicle_registry()
+    matches = award_matches()
 
-    for i, (category, group) in enumerate(filtered.groupby("category")):
+    for i, (category, group) in enumerate(AWARDS_BY_YEAR.get(selected_year, [])):
         bg_color = "#f9fafc" if i % 2 == 0 else "#ffffff"
         icon = CATEGORY_ICONS.get(category, "🚘")
 
         car_cards = []
-        for _, row in group.iterrows():
-            model_name = clean_model_name(row["model"], row["year"])
+        for award in group:
+            model_name = clean_model_name(award.model, award.year)
+            match = matches.get((award.year, award.manufacturer, award.model))
+            vehicle = registry.get(match.vehicle_key) if match else None
 
             card = html.Div(
                 [
                     html.Div(
-                        f"#{int(row['rank'])}",
+                        f"#{award.rank}",
                         style={
                             "fontWeight": "600",
                             "color": "#888",
@@ -110,7 +138,7 @@ def display_rankings(selected_year):
                         },
                     ),
                     html.H4(
-                        f"{model_name} — {row['manufacturer']}",
+                        f"{model_name} — {award.manufacturer}",
                         style={
                             "margin": "4px 0",
                             "fontWeight": "700",
@@ -118,7 +146,7 @@ def display_rankings(selected_year):
                         },
                     ),
                     html.P(
-                        f"Awarded by: {row['source']}" if pd.notna(row["source"]) else "",
+                        f"Awarded by: {award.source}" if award.source else "",
                         style={
                             "color": "#444",
                             "fontSize": "0.9rem",
@@ -127,13 +155,14 @@ def display_rankings(selected_year):
                         },
                     ),
                     html.P(
-                        row["rationale"],
+                        award.rationale,
                         style={
                             "color": "#555",
                             "fontSize": "0.95rem",
                             "marginBottom": "0",
                         },
                     ),
+                    *(vehicle_facts(vehicle, match.approximate) if vehicle is not None else []),
                 ],
                 style={
                     "border": "1px solid #eaeaea",
@@ -172,34 +201,3 @@ def display_rankings(selected_year):
         sections.append(section)
 
     return sections
-
-
-# --- Add card hover animation via CSS ---
-from dash import Dash
-
-Dash.index_string = """
-<!DOCTYPE html>
-<html>
-    <head>
-        {%metas%}
-        <title>{%title%}</title>
-        {%favicon%}
-        {%css%}
-        <style>
-            .car-card:hover {
-                transform: translateY(-3px);
-                box-shadow: 0 4px 10px rgba(0,0,0,0.08);
-                background-color: #ffffff;
-            }
-        </style>
-    </head>
-    <body>
-        {%app_entry%}
-        <footer>
-            {%config%}
-            {%scripts%}
-            {%renderer%}
-        </footer>
-    </body>
-</html>
-"""
\ No newline at end of file
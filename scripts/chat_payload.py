@@ -0,0 +1,107 @@
+"""
+Bytes per chat turn on Find Your Car, full re-render vs Patch updates.
+
+    python scripts/chat_payload.py [--turns 30]
+
+Plays a scripted conversation through the offline template advisor (no API
+key needed). Each turn is serialized twice, as Dash would send it:
+
+  before   chat-history = every bubble, conv-store = the whole conversation
+           including the system prompt, sent up as State and back as output
+  after    chat-history and conv-store as Patch "extend" operations (two
+           bubbles, two messages); State no longer carries the system prompt
+
+The recommendation cards are replaced on every turn that has them, in both
+versions, and are included in the numbers.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from plotly.utils import PlotlyJSONEncoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402,F401  (registers the pages)
+from dash import Patch, no_update  # noqa: E402
+
+from core.llm import TemplateBackend  # noqa: E402
+from pages.myCar import (INITIAL_CONVERSATION, SYSTEM_MESSAGE, extract_json_recommendations,  # noqa: E402
+                         render_bubble, render_chat, render_recommendation_cards)
+
+USER_TURNS = [
+    "Hi!",
+    "I'm looking for a family SUV.",
+    "Hybrid would be nice, we drive a lot on the highway.",
+    "Something from Toyota or Honda.",
+    "Actually electric could work too.",
+    "What about a pickup truck instead?",
+    "Fuel efficient sedan for commuting.",
+]
+
+
+def size(outputs: dict) -> int:
+    """Bytes of a multi-output callback response body; no_update outputs are left out."""
+    response = {key: {prop: value} for (key, prop), value in outputs.items() if value is not no_update}
+    return len(json.dumps({"multi": True, "response": response}, cls=PlotlyJSONEncoder).encode("utf-8"))
+
+
+def request_size(user_msg: str, conv: list) -> int:
+    return len(json.dumps({"state": [user_msg, conv]}).encode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=30)
+    args = parser.parse_args()
+
+    advisor = TemplateBackend()
+    conv = list(INITIAL_CONVERSATION)
+    totals = {"before": [0, 0], "after": [0, 0]}
+    chat_only = {"before": 0, "after": 0}      # chat-history + conv-store, without the cards
+    print(f"{'turn':>4} {'before ↑':>10} {'before ↓':>10} {'after ↑':>9} {'after ↓':>9}")
+    for turn in range(1, args.turns + 1):
+        user_msg = USER_TURNS[(turn - 1) % len(USER_TURNS)]
+        user = {"role": "user", "content": user_msg}
+        reply = advisor.chat([SYSTEM_MESSAGE, *conv, user])
+        recs = extract_json_recommendations(reply)
+        assistant = {"role": "assistant", "content": "Here are my top 5 suggestions for you!" if recs else reply}
+        cards = render_recommendation_cards(recs) if recs else no_update
+
+        old_conv = [SYSTEM_MESSAGE, *conv]
+        before_up = request_size(user_msg, old_conv)
+        old_conv = old_conv + [user, assistant]
+        before_down = size({("chat-history", "children"): render_chat(old_conv), ("recs-container", "children"): cards,
+                            ("conv-store", "data"): old_conv, ("user-input", "value"): ""})
+
+        after_up = request_size(user_msg, conv)
+        history, store = Patch(), Patch()
+        history.extend([render_bubble(user), render_bubble(assistant)])
+        store.extend([user, assistant])
+        after_down = size({("chat-history", "children"): history, ("recs-container", "children"): cards,
+                           ("conv-store", "data"): store, ("user-input", "value"): ""})
+
+        chat_only["before"] += size({("chat-history", "children"): render_chat(old_conv),
+                                     ("conv-store", "data"): old_conv})
+        chat_only["after"] += size({("chat-history", "children"): history, ("conv-store", "data"): store})
+
+        conv += [user, assistant]
+        for key, up, down in (("before", before_up, before_down), ("after", after_up, after_down)):
+            totals[key][0] += up
+            totals[key][1] += down
+        if turn in (1, 2, 5, 10, 20, args.turns):
+            print(f"{turn:>4} {before_up:>10,} {before_down:>10,} {after_up:>9,} {after_down:>9,}")
+
+    (bu, bd), (au, ad) = totals["before"], totals["after"]
+    print(f"\n{args.turns} turns, total bytes: before {bu + bd:,} (↑ {bu:,} ↓ {bd:,}), "
+          f"after {au + ad:,} (↑ {au:,} ↓ {ad:,})")
+    print(f"response bytes per turn: {bd / args.turns:,.0f} -> {ad / args.turns:,.0f} "
+          f"({bd / max(ad, 1):.1f}x less)")
+    print(f"chat-history + conv-store per turn: {chat_only['before'] / args.turns:,.0f} -> "
+          f"{chat_only['after'] / args.turns:,.0f} ({chat_only['before'] / max(chat_only['after'], 1):.1f}x less)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Recall and latency benchmark for the vehicle embedding index (core.embeddings).
+
+    python -m core.embeddings build
+    python scripts/embedding_benchmark.py
+
+Reports:
+  * search latency for batches of queries, memory-mapped float16 vs in-memory float32
+  * float16 recall@k against exact float32 search (hashing provider only; it re-embeds locally)
+  * name recall@k: "<make> <model> <year>" finds that vehicle
+  * intent precision@k for labelled requests ("electric pickup truck", ...), for the
+    embedding index alone, spec-vector k-NN alone (core.similar) and the fused chat candidates
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.catalog import catalog_index  # noqa: E402
+from core.embeddings import chat_candidates, describe_vehicles, embedding_index  # noqa: E402
+from core.similar import RECENT_YEARS, candidates_for_text, model_family, similarity_index  # noqa: E402
+
+
+def intents(rows, raw):
+    cls = rows["vehicle_class"].astype(str)
+    vt = rows["vehicle_type"].astype(str)
+    model = rows["model"].astype(str).str.lower()
+    class_median = raw.groupby([vt.to_numpy(), cls.to_numpy()])["consumption"].transform("median")
+    efficient = (raw["consumption"] <= class_median).to_numpy()
+    power = np.where(vt == "conventional", raw["engine_size"], raw["motor_kw"])
+    powerful = power >= np.nanmedian(power[(cls == "Two-seater").to_numpy()])
+    suv = cls.str.startswith("Sport utility").to_numpy()
+    pickup = cls.str.startswith("Pickup").to_numpy()
+    small = cls.isin(["Compact", "Subcompact", "Minicompact"]).to_numpy()
+    return {
+        "electric pickup truck": (vt == "bev").to_numpy() & pickup,
+        "family SUV with great mileage": suv & efficient,
+        "plug-in hybrid SUV": (vt == "phev").to_numpy() & suv,
+        "AWD wagon for winter": cls.str.startswith("Station wagon").to_numpy()
+                                & model.str.contains(r"\b(?:awd|4wd|4matic|xdrive|quattro)\b").to_numpy(),
+        "small efficient commuter car": small & efficient,
+        "powerful two-seater sports car": (cls == "Two-seater").to_numpy() & powerful,
+        "minivan for a big family": (cls == "Minivan").to_numpy(),
+        "manual hatchback": small & model.str.contains("manual").to_numpy(),
+        "electric sedan": (vt == "bev").to_numpy() & cls.isin(["Compact", "Mid-size", "Full-size"]).to_numpy(),
+        "hybrid pickup": pickup & model.str.contains("hybrid").to_numpy(),
+    }
+
+
+def distinct(similar, positions, k):
+    _, first = np.unique(similar.family_codes[positions], return_index=True)
+    return positions[np.sort(first)][:k]
+
+
+def timed(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=300, help="vehicles sampled for name recall")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    k = args.k
+
+    index = embedding_index()
+    if index is None:
+        raise SystemExit("No embedding index; run `python -m core.embeddings build` first.")
+    catalog = catalog_index()
+    similar = similarity_index()
+    rows, raw = catalog.rows, similar.raw
+    rng = np.random.default_rng(args.seed)
+    print(f"index: {index.meta['provider']}, {len(index.matrix):,} x {index.matrix.shape[1]} float16 "
+          f"({index.matrix.nbytes / 1e6:.1f} MB, memory-mapped)")
+
+    # --- Latency
+    labelled = intents(rows, raw)
+    texts = list(labelled)
+    in_memory = np.asarray(index.matrix, dtype=np.float32)
+    print("\nlatency (cosine top-k over the whole catalog)")
+    for batch in (1, 16, 128):
+        queries = index.embedder.embed([texts[i % len(texts)] for i in range(batch)])
+        repeat = max(3, 200 // batch)
+        t_f16 = timed(lambda: index.search(queries, k), repeat)
+        t_f32 = timed(lambda: np.argsort(-(queries @ in_memory.T), axis=1)[:, :k], repeat)
+        print(f"  batch {batch:>3}: float16 mmap {t_f16 * 1000:7.2f} ms ({t_f16 / batch * 1000:.3f} ms/query)   "
+              f"float32 in-memory full sort {t_f32 * 1000:7.2f} ms")
+    t_embed = timed(lambda: index.embedder.embed([texts[0]]), 20)
+    print(f"  query embedding ({index.meta['provider']}): {t_embed * 1000:.2f} ms")
+
+    # --- float16 vs float32
+    if index.meta["provider"] == "hashing":
+        described = describe_vehicles()
+        exact = index.embedder.embed(described["text"].tolist())
+        queries = index.embedder.embed(texts + described["text"].sample(200, random_state=args.seed).tolist())
+        truth = np.argsort(-(queries @ exact.T), axis=1)[:, :k]
+        got, _ = index.search(queries, k)
+        overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, got)])
+        print(f"\nfloat16 recall@{k} vs exact float32: {overlap:.3f} over {len(queries)} queries")
+
+    # --- Name recall
+    recent = (similar.years > similar.years.max() - RECENT_YEARS)
+    sample = rng.choice(np.flatnonzero(recent), size=min(args.samples, int(recent.sum())), replace=False)
+    family = model_family(rows["model"]).to_numpy()
+    make = rows["make"].astype(str).to_numpy()
+    years = similar.years
+    queries = [f"{make[p]} {family[p]} {years[p]}" for p in sample]
+    found = index.query(queries, k)
+    hits = [np.any((make[f] == make[p]) & (family[f] == family[p]) & (years[f] == years[p])) for f, p in zip(found, sample)]
+    print(f"\nname recall@{k} ('<make> <model> <year>'): {np.mean(hits):.3f} over {len(sample)} vehicles")
+
+    # --- Intent precision
+    print(f"\nintent precision@{k}, one result per model family, recent model years")
+    print(f"  {'':<34} embed  k-NN  fused")
+    totals = np.zeros(3)
+    for text, relevant in labelled.items():
+        lists = [
+            distinct(similar, index.query([text], k * 10, catalog_mask=recent)[0], k),
+            candidates_for_text(text, k),
+            chat_candidates(text, k),
+        ]
+        precision = [relevant[p].mean() if len(p) else 0.0 for p in lists]
+        totals += precision
+        print(f"  {text:<34} " + "  ".join(f"{v:.2f}" for v in precision))
+    means = totals / len(labelled)
+    print(f"  {'mean':<34} " + "  ".join(f"{v:.2f}" for v in means))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Tiny closed-loop load tester (stdlib only).
+
+Compare the dev server against gunicorn, e.g.:
+
+    python app.py                                  # dev server on :10000
+    gunicorn wsgi:server -c gunicorn.conf.py       # production server on :10000
+    python scripts/loadtest.py http://127.0.0.1:10000/_dash-layout -c 32 -n 2000
+"""
+
+import argparse
+import statistics
+import threading
+import time
+import urllib.request
+
+
+def run(url: str, concurrency: int, total: int, timeout: float):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        nonlocal errors
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=timeout) as resp:
+                    resp.read()
+                ok = True
+            except Exception:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    return latencies, errors, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("url")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    latencies, errors, wall = run(args.url, args.concurrency, args.requests, args.timeout)
+    if not latencies:
+        print(f"all {errors} requests failed")
+        return
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+    print(f"requests: {len(latencies)} ok, {errors} failed in {wall:.2f}s ({len(latencies) / wall:.1f} req/s)")
+    print(f"latency ms: p50={pct(0.50):.1f} p95={pct(0.95):.1f} p99={pct(0.99):.1f} "
+          f"mean={statistics.mean(latencies) * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    main()
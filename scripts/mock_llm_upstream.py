@@ -0,0 +1,92 @@
+"""
+Mock OpenAI-compatible upstream for load tests: answers after a fixed delay.
+
+    python scripts/mock_llm_upstream.py [--port 8766] [--latency 2.0] [--jitter 0.2]
+
+Serves POST /v1/chat/completions on one event loop. It waits about
+`--latency` seconds (log-normal, `--jitter` spread), then returns a
+well-formed completion with a usage block: a price JSON when a
+response_format is requested, KPI JSON or a summary for those system
+prompts (core.prompts), text otherwise.
+No tokens are generated, so thousands of requests can be in flight at once.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.prompts import KPIS_SYSTEM, SUMMARY_SYSTEM  # noqa: E402
+from core.sidecar import serve_json  # noqa: E402
+
+PRICE_ANSWER = {"retail_price_cad": 42_000, "discontinued": False, "used_min_cad": 24_000, "used_max_cad": 33_000,
+                "confidence": "high"}
+KPI_ANSWER = {"performance": 7, "value": 7.5, "reliability": 8, "eco": 6.5,
+              "explanations": {"performance": "Mock answer.", "value": "Mock answer.",
+                               "reliability": "Mock answer.", "eco": "Mock answer."}}
+
+
+def answer(request: dict) -> str:
+    if request.get("response_format"):
+        return json.dumps(PRICE_ANSWER)
+    system = request["messages"][0]["content"]
+    if system == KPIS_SYSTEM:
+        return json.dumps(KPI_ANSWER)
+    if system == SUMMARY_SYSTEM:
+        return "A practical, efficient vehicle; this is a mock summary."
+    return "Happy to help. What body style and powertrain are you looking for? (mock)"
+
+
+def make_handler(latency: float, jitter: float):
+    ids = itertools.count(1)
+    stats = {"requests": 0, "inflight": 0, "peak_inflight": 0}
+
+    async def handle(method: str, path: str, body: bytes):
+        if method == "GET" and path == "/metrics":
+            return 200, stats
+        if method != "POST" or not path.endswith("/chat/completions"):
+            return 404, {"error": {"message": f"no route for {method} {path}"}}
+        request = json.loads(body)
+        stats["requests"] += 1
+        stats["inflight"] += 1
+        stats["peak_inflight"] = max(stats["peak_inflight"], stats["inflight"])
+        try:
+            await asyncio.sleep(latency * math.exp(random.gauss(-jitter ** 2 / 2, jitter)))
+        finally:
+            stats["inflight"] -= 1
+        prompt_tokens = sum(len(m["content"]) for m in request["messages"]) // 4
+        return 200, {
+            "id": f"chatcmpl-mock-{next(ids)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": answer(request)}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 60,
+                      "total_tokens": prompt_tokens + 60,
+                      "prompt_tokens_details": {"cached_tokens": prompt_tokens // 128 * 128}},
+        }
+
+    return handle
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=2.0, help="median seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.2, help="std of the log latency")
+    args = parser.parse_args()
+    print(f"mock upstream on http://{args.host}:{args.port}/v1 ({args.latency}s per completion)", flush=True)
+    asyncio.run(serve_json(make_handler(args.latency, args.jitter), args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
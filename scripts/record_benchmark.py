@@ -0,0 +1,119 @@
+"""
+Per-callback cost of vehicle lookups: pandas rows vs core.records.
+
+    python scripts/record_benchmark.py
+
+For each rendering path it compares the pandas access the callbacks used to
+do (boolean masks + `.iloc[0]`, `.iat` per column, `groupby` + `iterrows`)
+with the registry/record version, and reports
+
+  * mean latency per call
+  * peak memory allocated during one call (tracemalloc), i.e. the temporaries
+
+CPython has no allocation counter, so the peak allocated bytes per call is the
+allocation measure. Dash component construction is left out; it is the same
+on both sides.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.data import CACHED_DATA, load_rankings  # noqa: E402
+from core.records import awards_from_frame, vehicle_registry  # noqa: E402
+from core.similar import similar_to, similarity_index  # noqa: E402
+
+
+def measure(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    latency = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latency, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    registry = vehicle_registry()
+    similar = similarity_index()
+    rows = registry.catalog.rows
+    rng = np.random.default_rng(args.seed)
+    picks = [registry.at(int(p)) for p in rng.choice(len(registry), size=50, replace=False)]
+    selections = [(v.vehicle_type, v.year, v.make, v.model) for v in picks]
+    neighbours = [similar_to(v.position, k=5) for v in picks[:10]]
+    rankings = load_rankings()
+    awards = awards_from_frame(rankings)
+    by_year = {}
+    for award in awards:
+        by_year.setdefault(award.year, {}).setdefault(award.category, []).append(award)
+    year = int(rankings["year"].max())
+
+    # --- Old: what the callbacks did
+    def select_pandas():
+        for vt, y, make, model in selections:
+            df = CACHED_DATA[vt]
+            match = df[(df["model_year"] == y) & (df["make"] == make) & (df["model"] == model)]
+            match["display_name"].iloc[0]
+
+    def similar_cards_pandas():
+        for matches in neighbours:
+            for p in matches:
+                (rows["display_name"].iat[p], similar.annual_cost[p], similar.co2[p],
+                 "kWh" if registry.catalog.is_bev[p] else "L")
+
+    def rankings_pandas():
+        filtered = rankings[rankings["year"] == year]
+        for _, group in filtered.groupby("category"):
+            for _, row in group.iterrows():
+                (row["model"], row["year"], int(row["rank"]), row["manufacturer"], row["source"], row["rationale"])
+
+    # --- New: core.records
+    def select_registry():
+        for selection in selections:
+            registry.find(*selection).display_name
+
+    def similar_cards_registry():
+        for matches in neighbours:
+            for v in map(registry.at, matches):
+                (v.display_name, v.annual_cost, v.co2, v.unit)
+
+    def rankings_records():
+        for _, group in sorted(by_year.get(year, {}).items()):
+            for a in group:
+                (a.model, a.year, a.rank, a.manufacturer, a.source, a.rationale)
+
+    cases = [
+        (f"select {len(selections)} vehicles (Car Search)", select_pandas, select_registry),
+        (f"similar cards, {len(neighbours)} x 5 (Car Search)", similar_cards_pandas, similar_cards_registry),
+        (f"rankings for {year} (Industry Leaders)", rankings_pandas, rankings_records),
+    ]
+    print(f"registry: {len(registry):,} vehicles")
+    print(f"{'':<44} {'pandas':>22} {'records':>22} {'speedup':>8}")
+    for label, old, new in cases:
+        t_old, m_old = measure(old, args.repeat)
+        t_new, m_new = measure(new, args.repeat)
+        print(f"{label:<44} {t_old * 1e3:9.3f} ms {m_old / 1024:8.1f} KB "
+              f"{t_new * 1e3:9.3f} ms {m_new / 1024:8.1f} KB {t_old / t_new:7.1f}x")
+
+    start = time.perf_counter()
+    type(registry)(registry.catalog)
+    print(f"\nregistry build: {(time.perf_counter() - start) * 1000:.0f} ms (once per data refresh)")
+
+
+if __name__ == "__main__":
+    main()
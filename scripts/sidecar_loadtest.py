@@ -0,0 +1,135 @@
+"""
+Concurrent LLM requests through the async sidecar, against the mock upstream.
+
+    python scripts/sidecar_loadtest.py [--concurrency 500] [--requests 2000] [--latency 2.0]
+    python scripts/sidecar_loadtest.py --sidecar http://127.0.0.1:8765      # an already running sidecar
+
+Starts `scripts/mock_llm_upstream.py` and `python -m core.sidecar` (one
+process each, metrics in a temporary job cache), then keeps `--concurrency`
+requests open at a time until `--requests` are done. Each request is a
+distinct vehicle, so none are merged. With a purely waiting upstream the
+ideal wall time is requests / concurrency x latency; the report compares
+against it and shows the sidecar's peak in-flight count, RSS and threads.
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+POOL_SIZE = 50
+TASK_ARGS = {
+    "summary": lambda i: [2024, "Mockmake", f"Model {i}"],
+    "price": lambda i: [2024, "Mockmake", f"Model {i}"],
+    "kpis": lambda i: [2024, "Mockmake", f"Model {i}", "Retail Price: $42,000 CAD | Used Market: unavailable"],
+    "chat": lambda i: [[{"role": "user", "content": f"Looking for a family SUV, request {i}"}]],
+}
+
+
+def _proc_status(pid: int) -> dict:
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                fields[name] = value.strip()
+    except OSError:
+        pass
+    return fields
+
+
+async def _wait_ready(client: httpx.AsyncClient, url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url)).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def run(sidecar: str, task: str, concurrency: int, total: int) -> dict:
+    # Small pools, one per group of workers, for the same reason as SIDECAR_POOL_SIZE.
+    limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+    clients = [httpx.AsyncClient(limits=limits, timeout=120) for _ in range(math.ceil(concurrency / POOL_SIZE))]
+    client = clients[0]
+    try:
+        await _wait_ready(client, f"{sidecar}/healthz")
+        queue = iter(range(total))
+        latencies, errors = [], 0
+
+        async def worker(client):
+            nonlocal errors
+            for i in queue:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(f"{sidecar}/v1/{task}", json={"args": TASK_ARGS[task](i)})
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(clients[w // POOL_SIZE]) for w in range(concurrency)))
+        wall = time.perf_counter() - started
+        metrics = (await client.get(f"{sidecar}/metrics")).json()
+    finally:
+        for c in clients:
+            await c.aclose()
+    return {"wall": wall, "latencies": np.asarray(latencies), "errors": errors, "metrics": metrics}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=2.0, help="mock upstream seconds per completion")
+    parser.add_argument("--task", choices=sorted(TASK_ARGS), default="summary")
+    parser.add_argument("--sidecar", help="URL of a running sidecar (skips starting the mock and sidecar)")
+    args = parser.parse_args()
+
+    procs, sidecar = [], args.sidecar
+    if sidecar is None:
+        cache_dir = tempfile.mkdtemp(prefix="sidecar-loadtest-")
+        env = {**os.environ, "JOB_CACHE_DIR": cache_dir, "LOG_LEVEL": "WARNING",
+               "SIDECAR_UPSTREAM_URL": "http://127.0.0.1:8766/v1", "SIDECAR_PORT": "8765"}
+        procs.append(subprocess.Popen([sys.executable, "scripts/mock_llm_upstream.py", "--port", "8766",
+                                       "--latency", str(args.latency)], cwd=ROOT, env=env,
+                                      stdout=subprocess.DEVNULL))
+        procs.append(subprocess.Popen([sys.executable, "-m", "core.sidecar"], cwd=ROOT, env=env))
+        sidecar = "http://127.0.0.1:8765"
+    try:
+        result = asyncio.run(run(sidecar, args.task, args.concurrency, args.requests))
+        status = _proc_status(procs[-1].pid) if procs else {}
+    finally:
+        for proc in procs:
+            proc.terminate()
+
+    latencies, metrics = result["latencies"], result["metrics"]
+    p50, p95, p99 = (np.percentile(latencies, [50, 95, 99]) if len(latencies) else np.zeros(3))
+    ideal = args.requests / args.concurrency * args.latency
+    print(f"{args.requests:,} {args.task} requests, {args.concurrency} concurrent, "
+          f"upstream {args.latency:.1f}s per completion")
+    print(f"wall {result['wall']:.1f}s (ideal {ideal:.1f}s), {len(latencies) / result['wall']:.0f} req/s, "
+          f"errors {result['errors']}")
+    print(f"latency p50 {p50:.2f}s, p95 {p95:.2f}s, p99 {p99:.2f}s")
+    print(f"sidecar: peak {metrics['peak_inflight']} upstream calls in flight, {metrics['requests']:,} requests, "
+          f"{metrics['failures']} failures"
+          + (f", RSS {status.get('VmRSS', '?')}, {status.get('Threads', '?')} threads" if status else ""))
+
+
+if __name__ == "__main__":
+    main()
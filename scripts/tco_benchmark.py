@@ -0,0 +1,62 @@
+"""
+Latency of the energy cost-of-ownership Monte Carlo (core.tco).
+
+    python scripts/tco_benchmark.py [--vehicles 5] [--draws 10000] [--years 10]
+
+Picks random catalog vehicles and times `simulate` + `bands` + `sensitivity`,
+i.e. everything the Car Search chart callback computes before building the
+figures. The interactive budget is 100 ms.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.records import vehicle_registry  # noqa: E402
+from core.tco import Scenario, simulate  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--vehicles", type=int, default=5)
+    parser.add_argument("--draws", type=int, default=10_000)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    registry = vehicle_registry()
+    rng = np.random.default_rng(args.seed)
+    usable = [v for v in registry.vehicles if not (np.isnan(v.city) or np.isnan(v.highway))]
+    picks = [usable[i] for i in rng.choice(len(usable), size=args.vehicles, replace=False)]
+    city = [v.city for v in picks]
+    highway = [v.highway for v in picks]
+    is_bev = [v.vehicle_type == "bev" for v in picks]
+    scenario = Scenario(years=args.years, draws=args.draws)
+
+    def run():
+        result = simulate(city, highway, is_bev, scenario)
+        return result, result.bands(), result.sensitivity()
+
+    run()
+    timings = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        result, bands, _ = run()
+        timings.append(time.perf_counter() - start)
+    p50, p95 = np.percentile(timings, [50, 95]) * 1000
+
+    print(f"{args.vehicles} vehicles x {args.draws:,} draws x {args.years} years "
+          f"= {result.yearly.size:,} cells")
+    print(f"simulate + bands + sensitivity: p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+    for v, median, low, high in zip(picks, bands[2, :, -1], bands[0, :, -1], bands[-1, :, -1]):
+        print(f"  {v.display_name[:60]:<60} ${median:>9,.0f}  (5–95%: ${low:,.0f}–${high:,.0f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""
+Production WSGI entry point.
+
+    gunicorn wsgi:server -c gunicorn.conf.py
+"""
+
+from app import app, server  # noqa: F401